@@ -0,0 +1,68 @@
+"""Measures the cold start import time of the package's entry modules, each in a
+fresh interpreter, and which heavy dependencies they load.
+
+Run from the repository root with: python -m benchmarks.importTime
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT_PATH = Path(__file__).parent.parent
+
+# Dependencies which should only be imported by the features which need them
+HEAVY_MODULES = ("tensorflow", "keras", "pandas", "matplotlib", "scipy")
+
+# Modules usable without any heavy dependency, and their import time budget in
+# seconds. The budget leaves room for slow machines, importing tensorflow
+# alone takes several seconds.
+LIGHTWEIGHT_MODULES = {
+    "gridGamesAi.tictactoe.scoringAgent": 1.0,
+    "gridGamesAi.pentago.scoringAgent": 1.0,
+    "gridGamesAi.pentago.go_interface": 1.0,
+    "gridGamesAi.ngo.gameState": 1.0,
+    "gridGamesAi.minimax": 1.0,
+    "gridGamesAi.numpyInference": 1.0,
+    "gridGamesAi.modelRegistry": 1.0,
+    "gridGamesAi.tournament": 1.0,
+    "gridGamesAi.mcts": 1.0,
+    "gridGamesAi.tablebase": 1.0,
+    "gridGamesAi.gameLog": 1.0,
+}
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+nativeLoaded = False
+if sys.platform.startswith("linux"):
+    with open("/proc/self/maps") as maps:
+        nativeLoaded = "_goPentago" in maps.read()
+print(json.dumps([seconds, heavy, nativeLoaded]))
+"""
+
+def measureImport(module: str) -> Tuple[float, List[str], bool]:
+    """Seconds to import module in a fresh interpreter, the heavy modules it
+    loaded and whether the go shared library was loaded"""
+    result = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=ROOT_PATH,
+    )
+    if result.returncode != 0:
+        # Show why, rather than only the exit status of the interpreter
+        raise ImportError(f"Importing {module} failed:\n{result.stderr.strip()}")
+    seconds, heavy, nativeLoaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return seconds, heavy, nativeLoaded
+
+def main():
+    for module, budget in LIGHTWEIGHT_MODULES.items():
+        seconds, heavy, nativeLoaded = measureImport(module)
+        loaded = ", ".join(heavy + (["go library"] if nativeLoaded else [])) or "-"
+        print(f"{module:<40} {seconds*1000:7.0f}ms  budget {budget*1000:5.0f}ms  loads: {loaded}")
+
+if __name__ == "__main__":
+    main()
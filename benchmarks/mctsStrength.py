@@ -0,0 +1,66 @@
+"""Plays MCTSAgent against MinimaxAgent(agent, 1), with the same and 4 times the
+time per move, on ngo 4x4 with the latest alpha model. Scored with tensorflow as
+in ngo_render.py, or exported to numpy with --numpy.
+
+Run from the repository root with: python -m benchmarks.mctsStrength
+"""
+
+import sys
+from time import perf_counter
+
+from benchmarks.suite import uncached
+from gridGamesAi.mcts import MCTSAgent
+from gridGamesAi.minimax import MinimaxAgent
+from gridGamesAi.modelRegistry import ModelRegistry
+from gridGamesAi.ngo.modelManager import ModelManager
+from gridGamesAi.ngo.gameState import NgoGameRunner
+from gridGamesAi.paths import NGO_MODELS_DIR
+from gridGamesAi.tournament import NgoOpenings, playGame
+
+class TimedAgent:
+    """Wraps an agent, totalling the time spent in its moves. The agent is given
+    an uncached copy of each position, so it doesn't reuse next moves or scores
+    its opponent's search cached on the game states."""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.seconds = 0.0
+        self.moves = 0
+
+    def move(self, gameState):
+        start = perf_counter()
+        nextState = self.agent.move(uncached(gameState))
+        self.seconds += perf_counter() - start
+        self.moves += 1
+        return nextState
+
+def main(n_openings: int = 20, numpy: bool = False):
+    runner = NgoGameRunner(2, 4, True)
+    model = ModelManager(NGO_MODELS_DIR / "alpha_4x4_with_rotation", runner)
+    if numpy:
+        scoringAgent = ModelRegistry(model.ml_agent_class).agent(model.get_sorted_model_paths()[-1])
+    else:
+        model.load_latest_model()
+        scoringAgent = model.ml_agent
+    openings = NgoOpenings(runner.size_quadrant, runner.win_line_length, runner.rotation_enabled, 2)
+
+    minimax = TimedAgent(MinimaxAgent(scoringAgent, 1))
+    for opening in range(n_openings):
+        playGame(minimax, minimax, openings(opening))
+    secondsPerMove = minimax.seconds / minimax.moves
+
+    print(f"MinimaxAgent depth 1: {secondsPerMove*1000:.1f}ms per move")
+    for budget in (1, 4):
+        mcts = TimedAgent(MCTSAgent(scoringAgent, max_seconds=budget * secondsPerMove))
+        minimax = TimedAgent(MinimaxAgent(scoringAgent, 1))
+        score = 0.0
+        for opening in range(n_openings):
+            score += playGame(mcts, minimax, openings(opening))[0]
+            score += 1 - playGame(minimax, mcts, openings(opening))[0]
+        print(
+            f"MCTSAgent with {budget}x the time ({mcts.seconds/mcts.moves*1000:.1f}ms per move): "
+            f"{score} - {2*n_openings - score}"
+        )
+
+if __name__ == "__main__":
+    main(numpy="--numpy" in sys.argv)
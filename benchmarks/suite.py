@@ -0,0 +1,392 @@
+"""Throughput benchmarks of the game engines, searches and td models, written as
+JSON so runs on different commits can be compared.
+
+Run from the repository root with:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json
+
+Each benchmark prepares fresh inputs (eg. positions with no cached next moves
+or scores) outside the timed section, then counts the units it processed, eg.
+children expanded or nodes searched. Rates are units per second of the median
+run. --compare reports each rate relative to a previous results file and exits
+with status 1 when any is below the threshold.
+
+A benchmark which raises, or a game or model whose benchmarks can't be built (eg.
+failing to import), is listed under "errors" in the results and the others still
+run. The exit status is then 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+from dataclasses import asdict, dataclass, field
+from functools import cached_property, partial
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+ROOT_PATH = Path(__file__).parent.parent
+
+@dataclass
+class Benchmark:
+    """prepare: untimed, returns the input of run
+    run: timed, returns the number of units processed"""
+    name: str
+    unit: str
+    prepare: Callable[[], Any]
+    run: Callable[[Any], int]
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    unit: str
+    count: int
+    seconds: List[float] = field(default_factory=list)
+
+    @property
+    def median_seconds(self) -> float:
+        return statistics.median(self.seconds)
+
+    @property
+    def rate(self) -> float:
+        """Units per second of the median run"""
+        return self.count / self.median_seconds
+
+    def asDict(self) -> Dict[str, Any]:
+        return {**asdict(self), "median_seconds": self.median_seconds, "rate": self.rate}
+
+def measure(benchmark: Benchmark, repeats: int) -> BenchmarkResult:
+    """Runs benchmark once to warm up, then repeats times"""
+    benchmark.run(benchmark.prepare())
+    result = None
+    for _ in range(repeats):
+        inputs = benchmark.prepare()
+        start = perf_counter()
+        count = benchmark.run(inputs)
+        seconds = perf_counter() - start
+        if result is None:
+            result = BenchmarkResult(benchmark.name, benchmark.unit, count)
+        result.seconds.append(seconds)
+    return result
+
+def uncached(gameState):
+    """Copy of gameState without its cached properties (eg. next_moves and win
+    detection) or saved scores"""
+    fresh = copy.copy(gameState)
+    for cls in type(gameState).__mro__:
+        for name, attribute in vars(cls).items():
+            if isinstance(attribute, cached_property):
+                fresh.__dict__.pop(name, None)
+    # The ngo constructor takes the win information of children from the batched
+    # evaluation of their parent's next moves
+    fresh.__dict__.pop("_winInfo", None)
+    if "savedScores" in fresh.__dict__:
+        fresh.savedScores = {}
+    return fresh
+
+def samplePositions(start, n_games: int, seed: int = 0) -> List:
+    """Positions which aren't ended games, from random games"""
+    rng = np.random.default_rng(seed)
+    positions = []
+    for _ in range(n_games):
+        gameState = start
+        while not gameState.isEnd:
+            positions.append(gameState)
+            next_moves = gameState.next_moves
+            gameState = next_moves[rng.integers(len(next_moves))]
+    return [uncached(gameState) for gameState in positions]
+
+def _expand(positions) -> int:
+    return sum(len(gameState.next_moves) for gameState in positions)
+
+def _detectWins(positions) -> int:
+    for gameState in positions:
+        gameState.isEnd
+    return len(positions)
+
+def _scoreEach(scoringAgent):
+    def run(positions) -> int:
+        for gameState in positions:
+            scoringAgent.score(gameState)
+        return len(positions)
+    return run
+
+def _scoreMany(scoringAgent):
+    def run(positions) -> int:
+        scoringAgent.score_many(positions)
+        return len(positions)
+    return run
+
+def _repeatedCalls(func: Callable[[Any], Any], calls: int) -> Callable[[Any], int]:
+    """Run of a benchmark calling func calls times, for calls too short to time alone"""
+    def run(inputs) -> int:
+        for _ in range(calls):
+            func(inputs)
+        return calls
+    return run
+
+def _freshPositions(positions, scoringAgent=None):
+    def prepare():
+        if hasattr(scoringAgent, "resetCache"):
+            scoringAgent.resetCache()
+        return [uncached(gameState) for gameState in positions]
+    return prepare
+
+def _ticTacToe():
+    from gridGamesAi.tictactoe.gameState import TicTacToeGameState
+    from gridGamesAi.tictactoe.scoringAgent import TicTacToeManualScoringAgent
+    return TicTacToeGameState(), TicTacToeManualScoringAgent(), 200
+
+def _ngo(win_line_length: int, size_board: int, n_games: int):
+    from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+    from gridGamesAi.ngo.scoringAgent import NgoNaiveScoringAgent
+    runner = NgoGameRunner(win_line_length, size_board, True)
+    return NgoGameState(None, None, runner), NgoNaiveScoringAgent(), n_games
+
+def _pentago():
+    from gridGamesAi.pentago.gameState import PentagoGameState
+    from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
+    return PentagoGameState(), PentagoNaiveScoringAgent(), 5
+
+# Starting position, naive scoring agent and number of random games to sample
+# positions from, of each game
+GAMES: Dict[str, Callable[[], Tuple[Any, Any, int]]] = {
+    "tictactoe": _ticTacToe,
+    "ngo 4x4": partial(_ngo, 2, 4, 20),
+    "ngo 6x6": partial(_ngo, 3, 5, 5),
+    "pentago": _pentago,
+}
+
+def gameBenchmarks(game: str) -> List[Benchmark]:
+    """next_moves expansion, win detection and naive scoring of game"""
+    start, scoringAgent, n_games = GAMES[game]()
+    positions = samplePositions(start, n_games)
+    return [
+        Benchmark(f"{game}/next_moves", "children", _freshPositions(positions), _expand),
+        Benchmark(f"{game}/win detection", "positions", _freshPositions(positions), _detectWins),
+        Benchmark(
+            f"{game}/naive score", "positions",
+            _freshPositions(positions, scoringAgent), _scoreEach(scoringAgent)
+        ),
+        Benchmark(
+            f"{game}/naive score_many", "positions",
+            _freshPositions(positions, scoringAgent), _scoreMany(scoringAgent)
+        ),
+    ]
+
+def _searchBenchmark(agentClass, scoringAgent, depth: int, game: str, positions: List) -> Benchmark:
+    def prepare():
+        if hasattr(scoringAgent, "resetCache"):
+            scoringAgent.resetCache()
+        return agentClass(scoringAgent, depth), [uncached(gameState) for gameState in positions]
+
+    def run(inputs) -> int:
+        agent, positions = inputs
+        for gameState in positions:
+            agent.move(gameState)
+        return agent.search.nodes
+
+    return Benchmark(f"{game}/{agentClass.__name__} depth {depth}", "nodes", prepare, run)
+
+SEARCH_DEPTHS = {"tictactoe": (8, 3), "ngo 4x4": (3, 1), "ngo 6x6": (2, 1), "pentago": (2, 1)}
+
+def searchBenchmarks(game: str) -> List[Benchmark]:
+    """Nodes per second of the minimax agents at fixed depths, from midgame
+    positions of game"""
+    from gridGamesAi.minimax import MinimaxAgent, PruningAgent
+    start, scoringAgent, _ = GAMES[game]()
+    positions = samplePositions(start, 1, seed=1)
+    positions = positions[len(positions)//3:][:4]
+    pruningDepth, minimaxDepth = SEARCH_DEPTHS[game]
+    return [
+        _searchBenchmark(PruningAgent, scoringAgent, pruningDepth, game, positions),
+        _searchBenchmark(MinimaxAgent, scoringAgent, minimaxDepth, game, positions),
+    ]
+
+def _ngoTDModel():
+    from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+    from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent
+    start = NgoGameState(None, None, NgoGameRunner(3, 5, True))
+    agent = Ngo_TD_Agent(None, start.gameRunner)
+    return agent, start, agent.model_score_many
+
+def _pentagoTDModel():
+    from gridGamesAi.pentago.gameState import PentagoGameState
+    from gridGamesAi.pentago.temporal_difference_model import Pentago_TD_Agent
+    agent = Pentago_TD_Agent(None, True)
+    return agent, PentagoGameState(), agent._score_many
+
+# td agent, starting position and batch scoring function of each td model
+TD_MODELS: Dict[str, Callable[[], Tuple[Any, Any, Callable]]] = {
+    "ngo 6x6": _ngoTDModel,
+    "pentago": _pentagoTDModel,
+}
+
+def tdBenchmarks(game: str) -> List[Benchmark]:
+    """Latency of scoring with game's td model, with tensorflow and exported to
+    numpy. Imports tensorflow."""
+    from gridGamesAi.numpyInference import DenseNetwork, NumpyTDScoringAgent
+    agent, start, scoreMany = TD_MODELS[game]()
+    positions = samplePositions(start, 1)
+    children = positions[len(positions)//2].next_moves
+    numpyAgent = NumpyTDScoringAgent(
+        DenseNetwork.fromKerasModel(agent.td_model), agent.modelInputEncoding
+    )
+    benchmarks = []
+    for batch in (children[:1], children):
+        benchmarks += [
+            Benchmark(
+                f"{game}/td score batch {len(batch)}", "calls",
+                lambda batch=batch: batch, _repeatedCalls(scoreMany, 50),
+            ),
+            Benchmark(
+                f"{game}/numpy td score batch {len(batch)}", "calls",
+                lambda batch=batch: np.stack([gameState.asNumpy() for gameState in batch]),
+                _repeatedCalls(numpyAgent.model_score_arrays, 50),
+            ),
+        ]
+    return benchmarks
+
+def tdTrainingBenchmarks() -> List[Benchmark]:
+    """Latency of ngo td training steps, game by game and from a replay buffer.
+    Imports tensorflow."""
+    from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+    from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent, SelfPlayGame
+    ngoStart = NgoGameState(None, None, NgoGameRunner(3, 5, True))
+    agent = Ngo_TD_Agent(None, ngoStart.gameRunner)
+    movesSequence = samplePositions(ngoStart, 1)
+    while not movesSequence[-1].isEnd:
+        movesSequence.append(movesSequence[-1].next_moves[0])
+    selfPlayGame = SelfPlayGame.fromMovesSequence(movesSequence)
+
+    learnerAgent = Ngo_TD_Agent(None, ngoStart.gameRunner)
+    learnerAgent.create_td_learner(batch_size=256)
+    for _ in range(256 // len(movesSequence) + 1):
+        learnerAgent.td_learner.buffer.add(
+            selfPlayGame.states[:-1], np.zeros(len(movesSequence) - 1)
+        )
+
+    return [
+        Benchmark(
+            f"ngo 6x6/td update {len(movesSequence)} positions", "updates",
+            lambda: selfPlayGame, _repeatedCalls(agent.train_td_from_self_play_game, 10)
+        ),
+        Benchmark(
+            "ngo 6x6/replay learner step batch 256", "steps",
+            lambda: 1, _repeatedCalls(learnerAgent.td_learner.train, 50)
+        ),
+    ]
+
+# The benchmarks of each suite, in groups built separately (eg. one per game), so
+# a game which fails to build doesn't stop the others
+SUITES: Dict[str, Dict[str, Callable[[], List[Benchmark]]]] = {
+    "games": {game: partial(gameBenchmarks, game) for game in GAMES},
+    "search": {game: partial(searchBenchmarks, game) for game in GAMES},
+    "td": {
+        **{game: partial(tdBenchmarks, game) for game in TD_MODELS},
+        "ngo 6x6 training": tdTrainingBenchmarks,
+    },
+}
+
+def gitCommit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=ROOT_PATH, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def runSuites(
+    suites: List[str], repeats: int = 5, nameFilter: str | None = None, verbose: bool = True
+) -> Dict[str, Any]:
+    """Runs the benchmarks of suites whose names contain nameFilter, returning the
+    results with details of the commit and machine they were measured on.
+    Benchmarks, or groups of them, which raise are listed in "errors" by name."""
+    results = []
+    errors = []
+
+    def recordError(name: str, error: Exception):
+        errors.append({"name": name, "error": f"{type(error).__name__}: {error}"})
+        if verbose:
+            print(f"{name:<44} failed: {type(error).__name__}: {error}")
+
+    for suite in suites:
+        for group, makeBenchmarks in SUITES[suite].items():
+            try:
+                benchmarks = makeBenchmarks()
+            except Exception as error:
+                recordError(f"{suite}/{group}", error)
+                continue
+            for benchmark in benchmarks:
+                if nameFilter is not None and nameFilter not in benchmark.name:
+                    continue
+                try:
+                    result = measure(benchmark, repeats)
+                except Exception as error:
+                    recordError(benchmark.name, error)
+                    continue
+                results.append(result.asDict())
+                if verbose:
+                    print(f"{result.name:<44} {result.rate:14,.1f} {result.unit}/s")
+    return {
+        "commit": gitCommit(),
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+        "errors": errors,
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.8) -> List[str]:
+    """Names of the benchmarks whose rate fell below threshold times their rate
+    in baseline, printing the ratio of each benchmark in both"""
+    baselineRates = {result["name"]: result["rate"] for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        if result["name"] not in baselineRates:
+            continue
+        ratio = result["rate"] / baselineRates[result["name"]]
+        flag = ""
+        if ratio < threshold:
+            regressions.append(result["name"])
+            flag = "  REGRESSION"
+        print(f"{result['name']:<44} x{ratio:6.2f}{flag}")
+    return regressions
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", action="append", choices=list(SUITES),
+        help="suites to run, default all")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="JSON results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.8,
+        help="rate relative to --compare below which a benchmark has regressed")
+    args = parser.parse_args(argv)
+
+    results = runSuites(args.suite or list(SUITES), args.repeats, args.filter)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    status = 1 if results["errors"] else 0
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Compares eager and graph mode scoring and TD updates of the td agents.
+
+Run from the repository root with: python -m benchmarks.tdInference
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent, SelfPlayGame
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.pentago.temporal_difference_model import Pentago_TD_Agent
+
+def timePerCall(func, repeats: int) -> float:
+    func()
+    start = perf_counter()
+    for _ in range(repeats):
+        func()
+    return (perf_counter() - start) / repeats
+
+def randomGame(gameState, rng: np.random.Generator):
+    movesSequence = [gameState]
+    while not movesSequence[-1].isEnd:
+        next_moves = movesSequence[-1].next_moves
+        movesSequence.append(next_moves[rng.integers(len(next_moves))])
+    return movesSequence
+
+def benchmarkNgo(graphMode: bool, repeats: int):
+    runner = NgoGameRunner(3, 5, True)
+    agent = Ngo_TD_Agent(None, runner, graphMode=graphMode)
+    movesSequence = randomGame(NgoGameState.fairVariant(runner), np.random.default_rng(0))
+    game = SelfPlayGame.fromMovesSequence(movesSequence)
+    nextStates = movesSequence[len(movesSequence)//2].next_moves
+    return {
+        "score 1": timePerCall(lambda: agent.model_score_many(nextStates[:1]), repeats),
+        f"score {len(nextStates)}": timePerCall(lambda: agent.model_score_many(nextStates), repeats),
+        f"td update, {len(movesSequence)} positions": timePerCall(
+            lambda: agent.train_td_from_self_play_game(game), repeats
+        ),
+    }
+
+def benchmarkPentago(graphMode: bool, repeats: int):
+    agent = Pentago_TD_Agent(None, True, graphMode=graphMode)
+    movesSequence = randomGame(PentagoGameState(), np.random.default_rng(0))
+    nextStates = movesSequence[len(movesSequence)//2].next_moves
+    tensors = [agent._modelInputState(gs).asTensor() for gs in movesSequence]
+    scores = np.array(agent._score_many(movesSequence))
+    agent.td_model.batch_size = 1
+    return {
+        "score 1": timePerCall(lambda: agent._score_many(nextStates[:1]), repeats),
+        f"score {len(nextStates)}": timePerCall(lambda: agent._score_many(nextStates), repeats),
+        f"td update, {len(movesSequence)} positions": timePerCall(
+            lambda: agent.td_model.train_td_from_sequential_states(
+                tensors, scores, agent._td_gradients
+            ),
+            repeats
+        ),
+    }
+
+def main(repeats: int = 20):
+    for name, benchmark in [("ngo 6x6", benchmarkNgo), ("pentago", benchmarkPentago)]:
+        eager, graph = benchmark(False, repeats), benchmark(True, repeats)
+        print(name)
+        for key in eager:
+            print(
+                f"    {key:<28} eager {eager[key]*1000:8.2f}ms"
+                f"    graph {graph[key]*1000:8.2f}ms    x{eager[key]/graph[key]:.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -23,8 +23,11 @@ typedef struct { const char *p; ptrdiff_t n; } _GoString_;
 
 #include <stdlib.h>
 typedef float (*Score) (int*);
+typedef void (*ScoreBatch) (int*, int, float*);
 extern int* C_Minimax_Move(int* grid, int grid_size, int depth, Score score);
 extern int* Go_Self_Play(int* grid, int grid_size, int depth, Score score);
+extern int* C_Minimax_Move_Batched(int* grid, int grid_size, int depth, ScoreBatch score);
+extern int* Go_Self_Play_Batched(int* grid, int grid_size, int depth, ScoreBatch score);
 extern void free_arr_int(int* p);
 
 #line 1 "cgo-generated-wrapper"
@@ -79,6 +82,8 @@ extern "C" {
 
 extern __declspec(dllexport) int* Go_Self_Play(int* grid, int grid_size, int depth, Score score);
 extern __declspec(dllexport) int* C_Minimax_Move(int* grid, int grid_size, int depth, Score score);
+extern __declspec(dllexport) int* Go_Self_Play_Batched(int* grid, int grid_size, int depth, ScoreBatch score);
+extern __declspec(dllexport) int* C_Minimax_Move_Batched(int* grid, int grid_size, int depth, ScoreBatch score);
 extern __declspec(dllexport) void free_arr_int(int* p);
 
 #ifdef __cplusplus
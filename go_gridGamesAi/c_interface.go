@@ -3,8 +3,11 @@ package main
 /*
 #include <stdlib.h>
 typedef float (*Score) (int*);
+typedef void (*ScoreBatch) (int*, int, float*);
 extern int* C_Minimax_Move(int* grid, int grid_size, int depth, Score score);
 extern int* Go_Self_Play(int* grid, int grid_size, int depth, Score score);
+extern int* C_Minimax_Move_Batched(int* grid, int grid_size, int depth, ScoreBatch score);
+extern int* Go_Self_Play_Batched(int* grid, int grid_size, int depth, ScoreBatch score);
 extern void free_arr_int(int* p);
 */
 import "C"
@@ -15,6 +18,8 @@ import (
 
 type score_func func(grid_arr [74]int) float32
 
+type batch_score_func func(grid_arrs [][74]int) []float32
+
 func arr_int_c_to_go(arr_c *C.int, size int) []int {
 	var slice []int = make([]int, 0, size)
 	for _, c_int := range unsafe.Slice(arr_c, size) {
@@ -81,6 +86,62 @@ func Minimax_Move(gs *gameState.GameState, depth int, score score_func) *gameSta
 	return best
 }
 
+// collectLeaves appends the grid arrays of the leaves of the minimax search below
+// gs to leaves, returning a function which computes the same value as Minimax
+// from the scores of the leaves
+func collectLeaves(gs *gameState.GameState, depth int, leaves *[][74]int) func(scores []float32) float32 {
+	if gs.IsWin() || gs.IsDraw() || depth == 0 {
+		index := len(*leaves)
+		*leaves = append(*leaves, gs.AsArray())
+		if gs.Turn.Last_player_to_move == 1 {
+			return func(scores []float32) float32 { return -scores[index] }
+		}
+		return func(scores []float32) float32 { return scores[index] }
+	}
+	gs_next := *gs.GetNext()
+	children := make([]func(scores []float32) float32, len(gs_next))
+	for i, this := range gs_next {
+		children[i] = collectLeaves(this, depth-1, leaves)
+	}
+	negate := gs.Turn.Current_turn_step == 0
+	return func(scores []float32) float32 {
+		var best_score float32 = -2
+		for _, child := range children {
+			score_this := child(scores)
+			if score_this > best_score {
+				best_score = score_this
+			}
+		}
+		if negate {
+			return -best_score
+		}
+		return best_score
+	}
+}
+
+// Minimax_Move_Batched selects the same move as Minimax_Move, scoring all the
+// leaves of the search with a single call of score
+func Minimax_Move_Batched(gs *gameState.GameState, depth int, score batch_score_func) *gameState.GameState {
+	gs_next := *gs.GetNext()
+	var leaves [][74]int
+	children := make([]func(scores []float32) float32, len(gs_next))
+	for i, this := range gs_next {
+		children[i] = collectLeaves(this, depth, &leaves)
+	}
+	scores := score(leaves)
+
+	var best *gameState.GameState
+	var best_score float32 = -2
+	for i, this := range gs_next {
+		this_score := children[i](scores)
+		if this_score > best_score {
+			best = this
+			best_score = this_score
+		}
+	}
+	return best
+}
+
 //export Go_Self_Play
 func Go_Self_Play(grid *C.int, grid_size C.int, depth C.int, score C.Score) *C.int {
 	go_score, gs := _parse(score, grid, grid_size)
@@ -103,13 +164,43 @@ func C_Minimax_Move(grid *C.int, grid_size C.int, depth C.int, score C.Score) *C
 	return c_arr
 }
 
+//export Go_Self_Play_Batched
+func Go_Self_Play_Batched(grid *C.int, grid_size C.int, depth C.int, score C.ScoreBatch) *C.int {
+	go_score, gs := _parseBatched(score, grid, grid_size)
+	var moves [][74]int = [][74]int{gs.AsArray()}
+	for !gs.IsWin() && !gs.IsDraw() {
+		gs = Minimax_Move_Batched(gs, int(depth), go_score)
+		moves = append(moves, gs.AsArray())
+	}
+	c_arr := arr_arr_74_int_go_to_c(moves)
+	return c_arr
+}
+
+//export C_Minimax_Move_Batched
+func C_Minimax_Move_Batched(grid *C.int, grid_size C.int, depth C.int, score C.ScoreBatch) *C.int {
+	go_score, gs := _parseBatched(score, grid, grid_size)
+	new_gs := Minimax_Move_Batched(gs, int(depth), go_score)
+	c_arr := arr_74_int_go_to_c(new_gs.AsArray())
+	return c_arr
+}
+
+func _parseBatched(score C.ScoreBatch, grid *C.int, grid_size C.int) (batch_score_func, *gameState.GameState) {
+	go_score := func(grid_arrs [][74]int) []float32 {
+		return goBatchCallback(score, grid_arrs)
+	}
+	return go_score, _parseGameState(grid, grid_size)
+}
+
 func _parse(score C.Score, grid *C.int, grid_size C.int) (score_func, *gameState.GameState) {
 	go_score := go_score_factory(score)
+	return go_score, _parseGameState(grid, grid_size)
+}
+
+func _parseGameState(grid *C.int, grid_size C.int) *gameState.GameState {
 	grid_go := arr_int_c_to_go(grid, int(grid_size))
 	var arr [74]int
 	copy(arr[:], grid_go)
-	gs := gameState.GameStateFromArray(arr)
-	return go_score, gs
+	return gameState.GameStateFromArray(arr)
 }
 
 func go_score_factory(score C.Score) score_func {
@@ -4,13 +4,46 @@ package main
 #include <stdlib.h>
 #include <stdio.h>
 typedef float (*Score) (int*);
+typedef void (*ScoreBatch) (int*, int, float*);
 float makeMyCallback(Score f, int* arr_grid){
 	return f(arr_grid);
 };
+void makeBatchCallback(ScoreBatch f, int* arr_grids, int n, float* out){
+	f(arr_grids, n, out);
+};
 */
 import "C"
 
+import "unsafe"
+
 func goCallback(score C.Score, grid *C.int) float32 {
 	r := C.makeMyCallback(score, grid)
 	return float32(r)
 }
+
+// goBatchCallback scores all the grid arrays with a single call to the python
+// callback, which reads the grids from, and writes the scores to, contiguous
+// C buffers
+func goBatchCallback(score C.ScoreBatch, grids [][74]int) []float32 {
+	n := len(grids)
+	scores := make([]float32, n)
+	if n == 0 {
+		return scores
+	}
+	c_grids := C.malloc(C.size_t(n*74) * C.size_t(unsafe.Sizeof(C.int(0))))
+	c_scores := C.malloc(C.size_t(n) * C.size_t(unsafe.Sizeof(C.float(0))))
+	defer C.free(c_grids)
+	defer C.free(c_scores)
+
+	grids_view := unsafe.Slice((*C.int)(c_grids), n*74)
+	for i, grid := range grids {
+		for j, v := range grid {
+			grids_view[i*74+j] = C.int(v)
+		}
+	}
+	C.makeBatchCallback(score, (*C.int)(c_grids), C.int(n), (*C.float)(c_scores))
+	for i, v := range unsafe.Slice((*C.float)(c_scores), n) {
+		scores[i] = float32(v)
+	}
+	return scores
+}
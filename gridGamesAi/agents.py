@@ -14,8 +14,8 @@ class AbstractAgent(ABC):
 class RandomAgent(AbstractAgent):
     """An agent which randomly chosses to play a valid move in a game from the 
     set of available valid moves"""
-    def __init__(self):
-        self.rng = np.random.default_rng()
+    def __init__(self, rng: np.random.Generator | None = None):
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def move(self, gameState: AbstractGameState) -> AbstractGameState:
         return self.rng.choice(
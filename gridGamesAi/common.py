@@ -66,6 +66,27 @@ def baseScoreStrategy(gameState: AbstractGameState, notEndScoreStrategy: Callabl
     
     return notEndScoreStrategy(gameState)
 
+def baseScoreStrategyMany(
+    gameStates: List[AbstractGameState], notEndScoreManyStrategy: Callable
+) -> List[float]:
+    """Batch version of baseScoreStrategy.
+
+    notEndScoreManyStrategy: a strategy which will score a list of the game states 
+    which are not wins or draws in a single call
+    """
+    scores = [None] * len(gameStates)
+    not_end_indices = []
+    for i, gameState in enumerate(gameStates):
+        if gameState.isEnd:
+            scores[i] = baseScoreStrategy(gameState, None)
+        else:
+            not_end_indices.append(i)
+    if not_end_indices:
+        not_end_scores = notEndScoreManyStrategy([gameStates[i] for i in not_end_indices])
+        for i, score in zip(not_end_indices, not_end_scores):
+            scores[i] = score
+    return scores
+
 def handle_wins_draws(func: Callable) -> Callable:
     """Decorates a scoring function to handle wins and draws correctly"""
     @functools.wraps(func)
@@ -0,0 +1,223 @@
+"""Append-only binary log of played games, eg. self play games kept for
+re-training, analysis or deduplication without playing them again.
+
+A log at path is three files next to each other:
+    <path>.json: format version, width of the positions and free form metadata
+        (eg. the runner configuration)
+    <path>.plies: every position of every game as its asNumpy() array, whose
+        values are all 0 or 1, packed to bits, one fixed size row per position
+    <path>.games: one fixed size record per game (GAME_DTYPE), giving its
+        positions' first row and count, end score, total moves and model version
+
+A game's positions are written before its record, so a log cut off while
+writing (eg. by a crash) only loses that game: readers ignore incomplete
+trailing rows and records, and writers truncate them before appending. Readers
+memory map both files, so only the games read are loaded.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+
+from .common import AbstractGameState
+
+FORMAT_VERSION = 1
+
+GAME_DTYPE = np.dtype([
+    ("first_ply", "<u8"),
+    ("plies", "<u4"),
+    ("end_score", "<f4"),
+    ("total_moves", "<u4"),
+    ("model_version", "<u4"),
+])
+
+def _logPath(path: Path, suffix: str) -> Path:
+    path = Path(path)
+    return path.parent / (path.name + suffix)
+
+def endScore(gameState: AbstractGameState) -> float:
+    """1 if player 0 won the ended game, -1 if player 1 won and 0 for a draw"""
+    if gameState.winPlayer is None:
+        return 0.0
+    return 1.0 if gameState.winPlayer == 0 else -1.0
+
+@dataclass
+class GameRecord:
+    """A logged game, with the fields of SelfPlayGame so it can be trained on.
+
+    states: asNumpy() of each position, from the root to the end of the game
+    end_score: score of the final position (1, -1 or 0)
+    total_moves: total moves made in the game by its end
+    model_version: version (eg. training calls) of the model which played it
+    """
+    states: np.ndarray
+    end_score: float
+    total_moves: int
+    model_version: int
+
+class GameLogWriter:
+    """Appends games to the log at path, creating it if needed.
+
+    width: length of the positions' asNumpy() arrays
+    metadata: json serializable description of the games, saved when the log is
+        created
+    """
+
+    def __init__(self, path: Path, width: int, metadata: Dict | None = None):
+        self.path = Path(path)
+        self.width = width
+        self.rowBytes = (width + 7) // 8
+        metaPath = _logPath(self.path, ".json")
+        if metaPath.exists():
+            with open(metaPath) as f:
+                meta = json.load(f)
+            if meta["version"] != FORMAT_VERSION or meta["width"] != width:
+                raise ValueError(f"{self.path} is a log of positions of width {meta['width']}")
+            self.metadata = meta["metadata"]
+        else:
+            self.metadata = metadata or {}
+            with open(metaPath, "w") as f:
+                json.dump({"version": FORMAT_VERSION, "width": width, "metadata": self.metadata}, f)
+
+        gamesPath, pliesPath = _logPath(self.path, ".games"), _logPath(self.path, ".plies")
+        games = _completeGames(gamesPath, _rowCount(pliesPath, self.rowBytes))
+        self.games = len(games)
+        self.rows = int(games["first_ply"][-1] + games["plies"][-1]) if len(games) else 0
+        del games
+        self._games = open(gamesPath, "ab")
+        self._plies = open(pliesPath, "ab")
+        # Drop whatever was written after the last complete game
+        self._games.truncate(self.games * GAME_DTYPE.itemsize)
+        self._plies.truncate(self.rows * self.rowBytes)
+
+    def __enter__(self) -> GameLogWriter:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._plies.close()
+        self._games.close()
+
+    def append(self, states: np.ndarray, end_score: float, total_moves: int, model_version: int = 0):
+        """Appends a game given as the stacked asNumpy() arrays of its positions"""
+        states = np.asarray(states)
+        if states.ndim != 2 or states.shape[1] != self.width:
+            raise ValueError(f"Expected positions of width {self.width}, got shape {states.shape}")
+        if np.any((states != 0) & (states != 1)):
+            raise ValueError("Only positions of 0s and 1s can be logged")
+        self._plies.write(np.packbits(states.astype(np.uint8), axis=1).tobytes())
+        self._plies.flush()
+        record = np.array(
+            [(self.rows, len(states), end_score, total_moves, model_version)], dtype=GAME_DTYPE
+        )
+        self._games.write(record.tobytes())
+        self._games.flush()
+        self.rows += len(states)
+        self.games += 1
+
+    def appendMovesSequence(self, movesSequence: List[AbstractGameState], model_version: int = 0):
+        """Appends a game given as its positions, from the root to the end"""
+        self.append(
+            np.stack([gameState.asNumpy() for gameState in movesSequence]),
+            endScore(movesSequence[-1]),
+            int(movesSequence[-1].turnTracker.total_moves),
+            model_version,
+        )
+
+class GameRecorder:
+    """Game.onStateChange callback logging the game once it ends, eg.
+    Game(agents, start, GameRecorder(writer, start)). onStateChange is called
+    after recording, eg. to also render the game."""
+
+    def __init__(self,
+        writer: GameLogWriter,
+        startingState: AbstractGameState,
+        model_version: int = 0,
+        onStateChange: Callable[[AbstractGameState], None] | None = None,
+    ):
+        self.writer = writer
+        self.movesSequence = [startingState]
+        self.model_version = model_version
+        self.onStateChange = onStateChange
+
+    def __call__(self, gameState: AbstractGameState):
+        self.movesSequence.append(gameState)
+        if gameState.isEnd:
+            self.writer.appendMovesSequence(self.movesSequence, self.model_version)
+        if self.onStateChange is not None:
+            self.onStateChange(gameState)
+
+def _rowCount(path: Path, rowBytes: int) -> int:
+    return path.stat().st_size // rowBytes if path.exists() else 0
+
+def _completeGames(gamesPath: Path, rows: int) -> np.ndarray:
+    """Memory mapped records of the games whose positions are all in the first
+    rows of the plies"""
+    n = _rowCount(gamesPath, GAME_DTYPE.itemsize)
+    if n == 0:
+        return np.zeros(0, dtype=GAME_DTYPE)
+    games = np.memmap(gamesPath, dtype=GAME_DTYPE, mode="r", shape=(n,))
+    complete = games["first_ply"] + games["plies"] <= rows
+    # Records are appended in order, so the complete games are a prefix
+    return games if np.all(complete) else games[:int(np.argmin(complete))]
+
+class GameLogReader:
+    """Memory mapped reader of the complete games of a log"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(_logPath(self.path, ".json")) as f:
+            meta = json.load(f)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported game log version {meta['version']}")
+        self.width = meta["width"]
+        self.metadata = meta["metadata"]
+        rowBytes = (self.width + 7) // 8
+
+        pliesPath = _logPath(self.path, ".plies")
+        rows = _rowCount(pliesPath, rowBytes)
+        if rows:
+            self.plies = np.memmap(pliesPath, dtype=np.uint8, mode="r", shape=(rows, rowBytes))
+        else:
+            self.plies = np.zeros((0, rowBytes), dtype=np.uint8)
+        self.games = _completeGames(_logPath(self.path, ".games"), rows)
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def __getitem__(self, index: int) -> GameRecord:
+        game = self.games[index]
+        return GameRecord(
+            self.states(index), float(game["end_score"]), int(game["total_moves"]), int(game["model_version"])
+        )
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def _rows(self, index: int) -> np.ndarray:
+        first = int(self.games["first_ply"][index])
+        return self.plies[first:first + int(self.games["plies"][index])]
+
+    def states(self, index: int) -> np.ndarray:
+        """asNumpy() arrays of the positions of a game"""
+        return np.unpackbits(self._rows(index), axis=1, count=self.width).astype(np.int32)
+
+    def uniqueGames(self) -> np.ndarray:
+        """Indices of the first of each distinct game, in order"""
+        seen = set()
+        unique = []
+        for index in range(len(self)):
+            digest = hashlib.blake2b(self._rows(index).tobytes(), digest_size=16).digest()
+            if digest not in seen:
+                seen.add(digest)
+                unique.append(index)
+        return np.array(unique, dtype=np.int64)
@@ -0,0 +1,320 @@
+"""Monte Carlo tree search guided by a scoring agent.
+
+Node statistics are kept in a NodeStore of parallel arrays rather than objects
+per node. Game states are only kept for the leaves still to be expanded: once a
+node's next moves are added to the tree its state is dropped.
+
+Every next move of the root is expanded first, in one batch, which is the search
+of MinimaxAgent(scoringAgent, 1) with a single score_many call. Each iteration
+then selects up to batchSize leaves with PUCT, applying a virtual loss
+along each selected path so the leaves of a batch differ. The leaves are then
+expanded together, scoring all their next moves in a single score_many call. A
+next move's score is both its value until it has been visited and, through a
+softmax, its prior probability. A leaf's backed up value is that of its best
+scored next move, a one move search.
+
+Scores and values are from player 0's perspective (positive favours player 0),
+as with the scoring agents, and are negated when selecting for player 1.
+"""
+
+from __future__ import annotations
+
+from math import sqrt
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .agents import AbstractAgent
+from .common import AbstractGameState
+from .scoringAgents import AbstractScoringAgent
+
+class NodeStore:
+    """Search tree nodes as indices into parallel arrays. The children of a node
+    are stored contiguously from firstChild, in next_moves order. Node 0 is the
+    root."""
+
+    FIELDS = {
+        "parent": np.int32,
+        "firstChild": np.int32,
+        "nChildren": np.int32,
+        "player": np.int8,
+        "terminal": np.bool_,
+        "zobristHash": np.uint64,
+        "score": np.float64,
+        "prior": np.float64,
+        "visits": np.float64,
+        "valueSum": np.float64,
+    }
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        # Game states of the nodes which haven't been expanded
+        self.states: Dict[int, AbstractGameState] = {}
+
+    @property
+    def capacity(self) -> int:
+        return len(self.parent)
+
+    def add(self, gameStates: List[AbstractGameState], parent: int = -1) -> int:
+        """Adds unexpanded nodes for gameStates, returning the index of the first"""
+        first, n = self.size, len(gameStates)
+        if first + n > self.capacity:
+            capacity = max(2 * self.capacity, first + n)
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                grown = np.zeros(capacity, dtype=array.dtype)
+                grown[:first] = array[:first]
+                setattr(self, name, grown)
+        nodes = slice(first, first + n)
+        self.parent[nodes] = parent
+        self.firstChild[nodes] = -1
+        self.nChildren[nodes] = 0
+        self.player[nodes] = [gameState.current_player for gameState in gameStates]
+        self.terminal[nodes] = [gameState.isEnd for gameState in gameStates]
+        self.zobristHash[nodes] = [gameState.zobristHash for gameState in gameStates]
+        self.score[nodes] = 0
+        self.prior[nodes] = 0
+        self.visits[nodes] = 0
+        self.valueSum[nodes] = 0
+        for i, gameState in enumerate(gameStates):
+            if not gameState.isEnd:
+                self.states[first + i] = gameState
+        self.size += n
+        return first
+
+    def children(self, node: int) -> range:
+        first = self.firstChild[node]
+        return range(first, first + self.nChildren[node]) if first >= 0 else range(0)
+
+    def find(self, zobristHash: int, player: int) -> int | None:
+        """Shallowest node with zobristHash and player to move"""
+        matches = np.flatnonzero(
+            (self.zobristHash[:self.size] == np.uint64(zobristHash)) & (self.player[:self.size] == player)
+        )
+        if len(matches) == 0:
+            return None
+        return int(min(matches, key=self.depth))
+
+    def depth(self, node: int) -> int:
+        depth = 0
+        while self.parent[node] >= 0:
+            node = self.parent[node]
+            depth += 1
+        return depth
+
+    def subtree(self, root: int) -> NodeStore:
+        """Copy of the subtree under root, with root as node 0"""
+        order = [root]
+        for node in order:
+            order.extend(self.children(node))
+        order = np.array(order)
+        newIndex = np.full(self.size, -1, dtype=np.int32)
+        newIndex[order] = np.arange(len(order))
+
+        store = NodeStore(max(2 * len(order), 1024))
+        store.size = len(order)
+        for name in self.FIELDS:
+            getattr(store, name)[:len(order)] = getattr(self, name)[order]
+        # Children of a node are added to order together, so stay contiguous
+        firstChild = self.firstChild[order]
+        store.firstChild[:len(order)] = np.where(firstChild >= 0, newIndex[firstChild], -1)
+        store.parent[:len(order)] = newIndex[self.parent[order]]
+        store.parent[0] = -1
+        store.states = {
+            int(newIndex[node]): gameState
+            for node, gameState in self.states.items() if newIndex[node] >= 0
+        }
+        return store
+
+class MCTSAgent(AbstractAgent):
+    """Selects moves by Monte Carlo tree search, with leaves evaluated in batches
+    by scoringAgent.
+
+    simulations: leaves selected for each move, when max_seconds is None
+    max_seconds: time budget for each move, instead of a number of simulations
+    batchSize: leaves selected before expanding and scoring them together
+    c_puct: weight of the exploration term of PUCT
+    virtualLoss: visits, each lost, added to the nodes of a selected path until
+        its leaf is scored
+    priorTemperature: temperature of the softmax of scores giving priors
+    reuseTree: keep the subtree of the position reached between moves
+
+    Counters of the last move:
+        simulationsRun: leaves selected
+        scoreCalls: score_many calls made
+    """
+
+    def __init__(self,
+        scoringAgent: AbstractScoringAgent,
+        simulations: int = 400,
+        max_seconds: float | None = None,
+        batchSize: int = 16,
+        c_puct: float = 1.5,
+        virtualLoss: float = 1.0,
+        priorTemperature: float = 0.25,
+        reuseTree: bool = True,
+    ):
+        self.scoringAgent = scoringAgent
+        self.simulations = simulations
+        self.max_seconds = max_seconds
+        self.batchSize = batchSize
+        self.c_puct = c_puct
+        self.virtualLoss = virtualLoss
+        self.priorTemperature = priorTemperature
+        self.reuseTree = reuseTree
+        self.store: NodeStore | None = None
+        self.simulationsRun = 0
+        self.scoreCalls = 0
+
+    def move(self, gameState: AbstractGameState) -> AbstractGameState:
+        deadline = None if self.max_seconds is None else perf_counter() + self.max_seconds
+        self._setRoot(gameState)
+        store = self.store
+        self.simulationsRun = 0
+        self.scoreCalls = 0
+        if store.firstChild[0] < 0:
+            self._expand([0])
+        self._expandRootChildren()
+
+        batchSeconds = 0.0
+        while not self._solved():
+            if deadline is None:
+                n = min(self.batchSize, self.simulations - self.simulationsRun)
+                if n <= 0:
+                    break
+            else:
+                # Don't start a batch expected to finish after the deadline,
+                # unless none has been run
+                n = self.batchSize
+                if self.simulationsRun > 0 and perf_counter() + batchSeconds > deadline:
+                    break
+            start = perf_counter()
+            self._simulateBatch(n)
+            batchSeconds = perf_counter() - start
+
+        children = store.children(0)
+        sign = _playerSign(store.player[0])
+        values = sign * _values(
+            store.visits[children], store.valueSum[children], store.score[children]
+        )
+        # Most visited, then best valued
+        best = int(np.lexsort((-values, -store.visits[children]))[0])
+        return gameState.next_moves[best]
+
+    def _setRoot(self, gameState: AbstractGameState):
+        store = self.store
+        if self.reuseTree and store is not None:
+            node = store.find(gameState.zobristHash, gameState.current_player)
+            if node is not None:
+                if node != 0:
+                    store = store.subtree(node)
+                store.states[0] = gameState
+                self.store = store
+                return
+        self.store = NodeStore()
+        self.store.add([gameState])
+
+    def _solved(self) -> bool:
+        """Whether a next move of the root is a known win for the player to move"""
+        children = self.store.children(0)
+        store = self.store
+        wins = store.terminal[children] & (
+            _playerSign(store.player[0]) * store.score[children] == 1
+        )
+        return bool(np.any(wins))
+
+    def _select(self) -> List[int]:
+        """Path from the root to a leaf by PUCT, with virtual loss applied to it"""
+        store = self.store
+        node, path = 0, [0]
+        while store.firstChild[node] >= 0 and not store.terminal[node]:
+            first = store.firstChild[node]
+            children = slice(first, first + store.nChildren[node])
+            sign = _playerSign(store.player[node])
+            visits = store.visits[children]
+            q = sign * _values(visits, store.valueSum[children], store.score[children])
+            u = self.c_puct * sqrt(store.visits[node] + 1) * store.prior[children] / (1 + visits)
+            child = first + int(np.argmax(q + u))
+            store.visits[child] += self.virtualLoss
+            store.valueSum[child] -= sign * self.virtualLoss
+            node = child
+            path.append(node)
+        return path
+
+    def _simulateBatch(self, n: int):
+        self._evaluatePaths([self._select() for _ in range(n)])
+
+    def _expandRootChildren(self):
+        """Visits every unvisited next move of the root, expanding them in a single
+        batch, so each is valued by its best scored next move (or its final score)
+        before PUCT selection starts"""
+        store = self.store
+        paths = []
+        for child in store.children(0):
+            if store.firstChild[child] < 0 and store.visits[child] == 0:
+                sign = _playerSign(store.player[0])
+                store.visits[child] += self.virtualLoss
+                store.valueSum[child] -= sign * self.virtualLoss
+                paths.append([0, child])
+        self._evaluatePaths(paths)
+
+    def _evaluatePaths(self, paths: List[List[int]]):
+        """Expands and scores the leaves of paths selected with virtual loss, then
+        backs up their values"""
+        store = self.store
+        leaves = list(dict.fromkeys(
+            path[-1] for path in paths if not store.terminal[path[-1]]
+        ))
+        leafValues = self._expand(leaves)
+
+        for path in paths:
+            leaf = path[-1]
+            value = store.score[leaf] if store.terminal[leaf] else leafValues[leaf]
+            for parent, node in zip(path, path[1:]):
+                store.visits[node] -= self.virtualLoss
+                store.valueSum[node] += _playerSign(store.player[parent]) * self.virtualLoss
+            store.visits[path] += 1
+            store.valueSum[path] += value
+        self.simulationsRun += len(paths)
+
+    def _expand(self, leaves: List[int]) -> Dict[int, float]:
+        """Adds the next moves of leaves to the tree and scores them in a single
+        score_many call, returning the value of each leaf"""
+        store = self.store
+        if not leaves:
+            return {}
+        blocks: List[Tuple[int, int]] = []
+        nextStates = []
+        for leaf in leaves:
+            next_moves = store.states.pop(leaf).next_moves
+            first = store.add(next_moves, leaf)
+            store.firstChild[leaf] = first
+            store.nChildren[leaf] = len(next_moves)
+            blocks.append((first, len(next_moves)))
+            nextStates += next_moves
+
+        scores = np.asarray(self.scoringAgent.score_many(nextStates), dtype=np.float64)
+        self.scoreCalls += 1
+
+        values = {}
+        offset = 0
+        for leaf, (first, n) in zip(leaves, blocks):
+            leafScores = scores[offset:offset + n]
+            offset += n
+            store.score[first:first + n] = leafScores
+            sign = _playerSign(store.player[leaf])
+            logits = sign * leafScores / self.priorTemperature
+            priors = np.exp(logits - np.max(logits))
+            store.prior[first:first + n] = priors / np.sum(priors)
+            values[leaf] = sign * np.max(sign * leafScores)
+        return values
+
+def _values(visits: np.ndarray, valueSum: np.ndarray, score: np.ndarray) -> np.ndarray:
+    """Mean backed up values, or scores of unvisited nodes"""
+    return np.where(visits > 0, valueSum / np.maximum(visits, 1), score)
+
+def _playerSign(player: int) -> int:
+    return 1 if player == 0 else -1
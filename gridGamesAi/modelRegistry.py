@@ -0,0 +1,158 @@
+"""Cache of scoring agents for saved td model checkpoints, for sweeping many
+checkpoints (eg. comparing or rating them) without deserializing each keras
+model every time it's used.
+
+The first time a checkpoint is used, its weights are exported next to it as a
+flat weights file (see NumpyTDScoringAgent.saveFlat), which is re-exported if
+the checkpoint is saved again. Later uses memory map the flat file, and a
+bounded number of the most recently used agents are kept loaded.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .numpyInference import INPUT_ENCODINGS, NumpyTDScoringAgent, exportTDAgent
+
+def flatWeightsPath(checkpointPath: Path) -> Path:
+    """Path of the flat weights file of a checkpoint, eg. 16000 -> 16000.weights.npy"""
+    checkpointPath = Path(checkpointPath)
+    return checkpointPath.parent / (checkpointPath.name + ".weights.npy")
+
+def _modifiedTime(checkpointPath: Path) -> float:
+    savedModel = checkpointPath / "saved_model.pb"
+    if savedModel.exists():
+        return savedModel.stat().st_mtime
+    return checkpointPath.stat().st_mtime
+
+class ModelRegistry:
+    """Bounded LRU cache of NumpyTDScoringAgents, keyed by checkpoint path.
+
+    agentClass: td agent class which loads the checkpoints when exporting them,
+        eg. Ngo_TD_Agent
+    maxLoaded: number of agents kept loaded
+    """
+
+    def __init__(self, agentClass, maxLoaded: int = 16):
+        self.agentClass = agentClass
+        self.maxLoaded = maxLoaded
+        self._agents: OrderedDict[Path, Tuple[float, NumpyTDScoringAgent]] = OrderedDict()
+        self.exports = 0
+        self.loads = 0
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, checkpointPath: Path) -> bool:
+        return Path(checkpointPath).resolve() in self._agents
+
+    def agent(self, checkpointPath: Path) -> NumpyTDScoringAgent:
+        """Scoring agent for the checkpoint, exporting its flat weights if they're
+        missing or older than the checkpoint"""
+        checkpointPath = Path(checkpointPath).resolve()
+        modified = _modifiedTime(checkpointPath)
+
+        cached = self._agents.get(checkpointPath)
+        if cached is not None and cached[0] == modified:
+            self._agents.move_to_end(checkpointPath)
+            return cached[1]
+
+        agent = NumpyTDScoringAgent.loadFlat(self.export(checkpointPath))
+        self.loads += 1
+
+        self._agents[checkpointPath] = (modified, agent)
+        self._agents.move_to_end(checkpointPath)
+        while len(self._agents) > self.maxLoaded:
+            self._agents.popitem(last=False)
+        return agent
+
+    def export(self, checkpointPath: Path) -> Path:
+        """Path of the checkpoint's flat weights, exporting them first if they're
+        missing or older than the checkpoint"""
+        checkpointPath = Path(checkpointPath).resolve()
+        weightsPath = flatWeightsPath(checkpointPath)
+        if not weightsPath.exists() or weightsPath.stat().st_mtime < _modifiedTime(checkpointPath):
+            exportTDAgent(self.agentClass(checkpointPath), weightsPath)
+            self.exports += 1
+        return weightsPath
+
+    def clear(self):
+        self._agents.clear()
+
+    def meanSquareErrors(self,
+        checkpointPaths: List[Path], arrays: np.ndarray, expected: np.ndarray, n_workers: int = 0
+    ) -> Dict[Path, float]:
+        """Mean square error of each checkpoint's model scores of positions, given
+        as stacked asNumpy() arrays, against their expected scores. Each checkpoint
+        scores all the positions in one batch.
+
+        n_workers: spawned processes the checkpoints are spread over, or 0 to rate
+            them in this process. Workers only load the flat weights, exported here
+            beforehand, but each reimports the main module, so they're only worth
+            it for sweeps of many checkpoints or positions.
+        """
+        checkpointPaths = [Path(path) for path in checkpointPaths]
+        weightsPaths = [self.export(path) for path in checkpointPaths]
+        n_workers = min(n_workers, len(checkpointPaths))
+        if n_workers == 0:
+            errors = []
+            inputs = {}
+            for path in checkpointPaths:
+                agent = self.agent(path)
+                if agent.inputEncoding not in inputs:
+                    inputs[agent.inputEncoding] = INPUT_ENCODINGS[agent.inputEncoding](arrays)
+                errors.append(_meanSquareError(agent, inputs[agent.inputEncoding], expected))
+            return dict(zip(checkpointPaths, errors))
+
+        tasks = [weightsPaths[i::n_workers] for i in range(n_workers)]
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_initRatingWorker,
+            initargs=(arrays, expected),
+        ) as executor:
+            errors = {
+                weightsPath: error
+                for task, taskErrors in zip(tasks, executor.map(_flatMeanSquareErrors, tasks))
+                for weightsPath, error in zip(task, taskErrors)
+            }
+        return {path: errors[weightsPath] for path, weightsPath in zip(checkpointPaths, weightsPaths)}
+
+def _meanSquareError(agent: NumpyTDScoringAgent, inputs: np.ndarray, expected: np.ndarray) -> float:
+    return float(np.mean((agent.network(inputs) - expected) ** 2))
+
+_ratingArrays: np.ndarray | None = None
+_ratingExpected: np.ndarray | None = None
+# Model inputs of the rating arrays, by input encoding
+_ratingInputs: Dict[str, np.ndarray] = {}
+
+def _initRatingWorker(arrays: np.ndarray, expected: np.ndarray):
+    global _ratingArrays, _ratingExpected
+    _ratingArrays, _ratingExpected = arrays, expected
+    _ratingInputs.clear()
+
+def _flatMeanSquareErrors(weightsPaths: List[Path]) -> List[float]:
+    errors = []
+    for path in weightsPaths:
+        agent = NumpyTDScoringAgent.loadFlat(path)
+        inputs = _ratingInputs.get(agent.inputEncoding)
+        if inputs is None:
+            inputs = _ratingInputs[agent.inputEncoding] = INPUT_ENCODINGS[agent.inputEncoding](_ratingArrays)
+        errors.append(_meanSquareError(agent, inputs, _ratingExpected))
+    return errors
+
+_sharedRegistries: Dict[type, ModelRegistry] = {}
+
+def sharedRegistry(agentClass) -> ModelRegistry:
+    """Registry of agentClass checkpoints shared by the whole process, eg. by the
+    agents built in each tournament worker"""
+    registry = _sharedRegistries.get(agentClass)
+    if registry is None:
+        registry = _sharedRegistries[agentClass] = ModelRegistry(agentClass)
+    return registry
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Set
+
+from .common import AbstractGameState
+from .scoringAgents import AbstractScoringAgent
+
+class _NodeOrder:
+    """Ordering information for the next moves of a single position"""
+    __slots__ = ("moveKeys", "keyToIndex", "scoredOrder")
+
+    def __init__(self, moveKeys: List[int]):
+        self.moveKeys = moveKeys
+        self.keyToIndex = {key: i for i, key in enumerate(moveKeys)}
+        self.scoredOrder: List[int] | None = None
+
+class MoveOrdering:
+    """Orders the next moves of positions for alpha-beta search.
+
+    Moves are tried in the order: the transposition table move, killer moves (moves
+    which caused a cutoff at the same depth in a sibling position), then the
+    remaining moves by descending score for the player to move, with ties broken
+    by the history heuristic. The remaining moves are only scored once the first
+    moves fail to cause a cutoff, and the order is cached for the position.
+
+    A move is identified by the XOR of the zobrist hashes of the position before
+    and after it. This is the same for a placement of the same piece in any
+    position, so killer and history information carries between positions.
+    """
+
+    def __init__(self, maxCachedNodes: int = 2**16, numberKillers: int = 2):
+        self.maxCachedNodes = maxCachedNodes
+        self.numberKillers = numberKillers
+        self.killers: Dict[int, List[int]] = {}
+        self.history: Dict[int, int] = {}
+        self._nodeOrders: Dict[int, _NodeOrder] = {}
+
+    def newSearch(self):
+        """Forgets killer moves and ages the history scores. Cached orders are
+        kept, so clear must be called if the scoring agent's scores change, eg.
+        after training it."""
+        self.killers.clear()
+        self.history = {key: value >> 1 for key, value in self.history.items() if value > 1}
+
+    def clear(self):
+        """Forgets all ordering information, eg. after changing or training the
+        scoring agent"""
+        self.killers.clear()
+        self.history.clear()
+        self._nodeOrders.clear()
+
+    def _nodeOrder(self, gameState: AbstractGameState) -> _NodeOrder:
+        key = gameState.zobristHash
+        nodeOrder = self._nodeOrders.get(key)
+        if nodeOrder is None:
+            if len(self._nodeOrders) >= self.maxCachedNodes:
+                self._nodeOrders.clear()
+            nodeOrder = _NodeOrder([
+                nextState.zobristHash ^ key for nextState in gameState.next_moves
+            ])
+            self._nodeOrders[key] = nodeOrder
+        return nodeOrder
+
+    def _scoredOrder(self, 
+        gameState: AbstractGameState, 
+        nodeOrder: _NodeOrder, 
+        scoringAgent: AbstractScoringAgent
+    ) -> List[int]:
+        if nodeOrder.scoredOrder is None:
+            scores = scoringAgent.score_many(gameState.next_moves)
+            if gameState.current_player == 1:
+                scores = [-score for score in scores]
+            history = self.history
+            if history:
+                moveKeys = nodeOrder.moveKeys
+                key = lambda i: (scores[i], history.get(moveKeys[i], 0))
+            else:
+                key = scores.__getitem__
+            nodeOrder.scoredOrder = sorted(range(len(scores)), key=key, reverse=True)
+        return nodeOrder.scoredOrder
+
+    def orderedIndices(self,
+        gameState: AbstractGameState,
+        scoringAgent: AbstractScoringAgent,
+        depth: int,
+        firstIndex: int | None = None,
+        indices: Set[int] | None = None
+    ) -> Iterator[int]:
+        """Lazily yields indices of gameState.next_moves in search order.
+
+        firstIndex: index to try before all others, usually from the
+            transposition table
+        indices: only yield these indices, defaults to all
+        """
+        tried = set()
+        if firstIndex is not None and (indices is None or firstIndex in indices):
+            tried.add(firstIndex)
+            yield firstIndex
+
+        killers = self.killers.get(depth, ())
+        nodeOrder = self._nodeOrder(gameState) if killers else None
+        for killer in killers:
+            i = nodeOrder.keyToIndex.get(killer)
+            if i is not None and i not in tried and (indices is None or i in indices):
+                tried.add(i)
+                yield i
+
+        if nodeOrder is None:
+            nodeOrder = self._nodeOrder(gameState)
+        for i in self._scoredOrder(gameState, nodeOrder, scoringAgent):
+            if i not in tried and (indices is None or i in indices):
+                yield i
+
+    def recordCutoff(self, gameState: AbstractGameState, index: int, depth: int):
+        """Records that the next move at index caused a cutoff when searching
+        gameState to depth"""
+        moveKey = self._nodeOrder(gameState).moveKeys[index]
+        killers = self.killers.setdefault(depth, [])
+        if moveKey in killers:
+            killers.remove(moveKey)
+        killers.insert(0, moveKey)
+        del killers[self.numberKillers:]
+        self.history[moveKey] = self.history.get(moveKey, 0) + depth * depth
+
+class IndexOrdering:
+    """Searches next moves in the order of next_moves, without scoring them"""
+
+    def newSearch(self): pass
+
+    def clear(self): pass
+
+    def orderedIndices(self,
+        gameState: AbstractGameState,
+        scoringAgent: AbstractScoringAgent,
+        depth: int,
+        firstIndex: int | None = None,
+        indices: Set[int] | None = None
+    ) -> Iterator[int]:
+        if firstIndex is not None and (indices is None or firstIndex in indices):
+            yield firstIndex
+        searched = range(len(gameState.next_moves)) if indices is None else sorted(indices)
+        for i in searched:
+            if i != firstIndex:
+                yield i
+
+    def recordCutoff(self, gameState: AbstractGameState, index: int, depth: int): pass
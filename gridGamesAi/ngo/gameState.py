@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from functools import cached_property
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Tuple
 
 import numpy as np
-import tensorflow as tf
-import itertools
 
 from ..turnTracker import TurnTracker
 from ..common import AbstractGridGameState, SavedScoreInterface
 from ..agents import RandomAgent, AbstractAgent
+from ..zobrist import ZobristKeys
+from .. import symmetry
+from .runnerBackends import AbstractRunnerBackend, NumpyRunnerBackend
+
+if TYPE_CHECKING:
+    import tensorflow as tf
 
 randAgent = RandomAgent()
 
@@ -25,73 +29,75 @@ class NgoGameRunner():
         'br_ac': '11cc',
     }
 
-    def __init__(self, size_quadrant: int, win_line_length: int, rotation_enabled: bool):
+    def __init__(self,
+        size_quadrant: int,
+        win_line_length: int,
+        rotation_enabled: bool,
+        backend: str = "numpy"
+    ):
+        """backend: which array library the game rules are evaluated with, 
+        "numpy" (default) or "tensorflow"."""
         self.size_quadrant = size_quadrant
         self.size_board = 2* self.size_quadrant
         self.win_line_length = win_line_length
         self.rotation_enabled = rotation_enabled
-        self.rotations = self.generateRotationTensors()
-        self.win = self.generateWinEvaluationTensor()
-
-    def generateRotationTensors(self):
-        identityMatrix = tf.eye(self.size_board,self.size_board,dtype=tf.int32)
-        no_rotation_tensor = tf.transpose( tf.tensordot(identityMatrix, identityMatrix, 0), [0,2,1,3])
-        quadrantIdentityMatrix = tf.eye(self.size_quadrant,self.size_quadrant,dtype=tf.int32)
-        rot_sub = tf.transpose( tf.tensordot(quadrantIdentityMatrix, quadrantIdentityMatrix ,0), [0,2,1,3])
-        rot_cw = tf.reverse(tf.transpose(rot_sub, [1,0,2,3]), [0])
-        rot_cc = tf.reverse(tf.transpose(rot_sub, [1,0,2,3]), [1])
-        rotations = {"none": no_rotation_tensor}
-        s = [slice(0,self.size_quadrant),slice(self.size_quadrant,2*self.size_quadrant)]
-        i = [0,1]
-        for perm in itertools.product(i, repeat=2):
-            sectorName = f"{perm[0]}{perm[1]}"
-            sliceArr = [s[perm[0]],s[perm[1]],s[perm[0]],s[perm[1]]]
-            x = tf.Variable(no_rotation_tensor)
-            x = x.__getitem__(sliceArr).assign(rot_cw)
-            rotations[f"{sectorName}cw"] = x
-            x = tf.Variable(no_rotation_tensor)
-            x = x.__getitem__(sliceArr).assign(rot_cc)
-            rotations[f"{sectorName}cc"] = x
-        return rotations
-
-    def generateWinEvaluationTensor(self):
-        win_mapping_tensors = []
-        d = self.size_board
-        win_n = self.win_line_length
-        for i, j in itertools.product(range(d),range(d-win_n+1)):
-            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
-            spaces_map = spaces_map[i, j:win_n+j].assign(tf.ones((win_n),dtype=tf.int32))
-            win_mapping_tensors.append(spaces_map)
-            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
-            spaces_map = spaces_map[j:win_n+j, i].assign(tf.ones((win_n),dtype=tf.int32))
-            win_mapping_tensors.append(spaces_map)
-        for i, j in itertools.product(range(d-win_n+1),repeat=2):
-            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
-            spaces_map = spaces_map[i:win_n+i, j:win_n+j].assign(tf.eye(win_n,dtype=tf.int32))
-            win_mapping_tensors.append(spaces_map)
-            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
-            spaces_map = spaces_map[i:win_n+i, j:win_n+j].assign(tf.reverse(tf.eye(win_n,dtype=tf.int32),[0]))
-            win_mapping_tensors.append(spaces_map)
-        win = tf.stack(win_mapping_tensors, axis=2)
-        return win
-
-    def rotate(self, grid: tf.Tensor, rotationKey: str) -> tf.Tensor:
+        self.backend = self._createBackend(backend)
+        self.rotations = self.backend.rotations
+        self.win = self.backend.win
+        self.zobristKeys = ZobristKeys(
+            self.size_board ** 2, 2, self.initialiseTurnTracker().number_turn_steps
+        )
+
+    def _createBackend(self, backend: str) -> AbstractRunnerBackend:
+        if backend == "numpy":
+            return NumpyRunnerBackend(self.size_quadrant, self.win_line_length)
+        if backend == "tensorflow":
+            from .tensorflowRunnerBackend import TensorflowRunnerBackend
+            return TensorflowRunnerBackend(self.size_quadrant, self.win_line_length)
+        raise ValueError(f"Unknown runner backend: {backend}")
+
+    def rotate(self, grid, rotationKey: str):
         try:
             rotationKey = self.keyTranslation[rotationKey]
         except KeyError:
             pass
-        rot = self.rotations[rotationKey]
-        return tf.Variable( tf.tensordot(grid, rot, (2)) )
+        return self.backend.rotate(grid, rotationKey)
+
+    def hasWinningLine(self, grid):
+        return self.backend.hasWinningLine(grid)
+
+    def naiveScore(self, grid) -> int:
+        return self.backend.naiveScore(grid)
 
-    def hasWinningLine(self, grid: tf.Tensor) -> tf.Tensor:
-        return tf.equal(tf.reduce_max( tf.tensordot(grid, self.win, 2), [1] ), self.win_line_length)
+    def hasWinningLineBatch(self, grids) -> np.ndarray:
+        """Shape (N, 2) flags of whether each player has a winning line, for a stack 
+        of N grids"""
+        return np.max(self.backend.lineCountsBatch(grids), axis=2) == self.win_line_length
 
-    def naiveScore(self, grid: tf.Tensor) -> tf.Tensor:
-        count_on_each_winning_line = tf.reduce_max( tf.tensordot(grid, self.win, 2), [1] )
-        square_of_count = tf.square(count_on_each_winning_line)
-        change_player_1_sign = tf.tensordot(tf.constant([1,-1],dtype=tf.int32), 
-            square_of_count, 1)
-        return tf.reduce_sum(change_player_1_sign)
+    def naiveScoreBatch(self, grids) -> np.ndarray:
+        """naiveScore for each of a stack of N grids"""
+        return self._naiveScoreFromLineCounts(self.backend.lineCountsBatch(grids))
+
+    def evaluateBatch(self, grids, last_player_to_move: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Evaluates a stack of N grids, all reached by a move of last_player_to_move,
+        with a single matmul against the win mapping tensor.
+
+        Returns: isWin (N,), winPlayer (N,) with -1 where there is no winner and 
+            naiveScore (N,)
+        """
+        line_counts = self.backend.lineCountsBatch(grids)
+        has_winning_line = np.max(line_counts, axis=2) == self.win_line_length
+        win_player = np.full(len(has_winning_line), -1)
+        win_player[has_winning_line[:, 1]] = 1
+        win_player[has_winning_line[:, 0]] = 0
+        # If a move gives both players a winning line, the player who just moved losses
+        win_player[has_winning_line[:, 0] & has_winning_line[:, 1]] = (last_player_to_move + 1) % 2
+        return win_player != -1, win_player, self._naiveScoreFromLineCounts(line_counts)
+
+    def _naiveScoreFromLineCounts(self, line_counts: np.ndarray) -> np.ndarray:
+        square_of_count = np.square(np.max(line_counts, axis=2))
+        return square_of_count[:, 0] - square_of_count[:, 1]
 
     def initialiseTurnTracker(self) -> TurnTracker:
         if self.rotation_enabled:
@@ -100,31 +106,44 @@ class NgoGameRunner():
             return TurnTracker(2, 1)
 
     def initialiseGrid(self):
-        return tf.Variable(tf.zeros([2,self.size_board,self.size_board],dtype=tf.int32))
-
-    def place(self, grid: tf.Tensor, player: int, index: Tuple[int,int]):
-        newGrid = tf.Variable(grid)
-        newGrid = tf.tensor_scatter_nd_add(newGrid, [[player, index[0], index[1]]], [1])
-        if tf.reduce_max(newGrid) == 2:
-            raise Exception("Invalid placement")
-        return newGrid
-
-    def nextValidPlacement(self, grid: tf.Tensor, player: int):
-        sum_axis_0 = tf.reduce_sum(grid, axis=0)
-        free_spaces = tf.where(tf.equal(sum_axis_0, 0))
-        new_grids = []
-        for i,j in free_spaces:
-            new_grids.append( self.place(grid, player, (i,j)) )
-        return new_grids
-
-    def allPositionsFilled(self, grid: tf.Tensor):
-        return tf.reduce_sum(grid) == self.size_board * self.size_board
+        return self.backend.initialiseGrid()
+
+    def gridFromNumpy(self, array: np.ndarray):
+        return self.backend.fromNumpy(array)
+
+    def place(self, grid, player: int, index: Tuple[int,int]):
+        return self.backend.place(grid, player, index)
+
+    def nextValidPlacement(self, grid, player: int):
+        return list(self.nextPlacementGrids(grid, player))
+
+    def nextPlacementGrids(self, grid, player: int):
+        return self.backend.nextPlacementGrids(grid, player)
+
+    def nextRotationGrids(self, grid):
+        """Grids after each rotation in ROTATION_KEYS, stacked along the first axis"""
+        return self.backend.nextRotationGrids(grid)
+
+    def allPositionsFilled(self, grid) -> bool:
+        return self.backend.allPositionsFilled(grid)
 
 class NgoGameState(AbstractGridGameState):
     rng = np.random.default_rng()
 
-    def __init__(self, turnTracker: TurnTracker, grid: tf.Tensor, gameRunner: NgoGameRunner):
+    def __init__(self, 
+        turnTracker: TurnTracker, 
+        grid, 
+        gameRunner: NgoGameRunner,
+        winInfo: Tuple[bool, int | None] | None = None,
+        zobristHash: int | None = None
+    ):
+        """winInfo: optionally provide the already evaluated (isWin, winPlayer)
+        zobristHash: optionally provide the incrementally updated zobrist hash"""
         self.gameRunner = gameRunner
+        if winInfo is not None:
+            self.__dict__["_winInfo"] = winInfo
+        if zobristHash is not None:
+            self.__dict__["zobristHash"] = zobristHash
 
         if turnTracker is None:
             turnTracker = gameRunner.initialiseTurnTracker()
@@ -147,60 +166,108 @@ class NgoGameState(AbstractGridGameState):
 
     @property
     def grid_0(self) -> np.ndarray:
-        return self.grid[0].numpy()
+        return np.asarray(self.grid[0])
 
     @property
     def grid_1(self) -> np.ndarray:
-        return self.grid[1].numpy()
+        return np.asarray(self.grid[1])
 
-    def _getNextGridStates(self):
+    @cached_property
+    def next_grids(self):
+        """Grids of all next moves, stacked into a single array of shape 
+        (len(next_moves), 2, size_board, size_board)"""
         if self.turnTracker.current_turn_step == 0:
-            return self.gameRunner.nextValidPlacement(self.grid, self.current_player)
+            return self.gameRunner.nextPlacementGrids(self.grid, self.current_player)
         if self.turnTracker.current_turn_step == 1:
-            return self._getNextRotateGridStates()
+            return self.gameRunner.nextRotationGrids(self.grid)
 
-    def _getNextRotateGridStates(self):
-        nextGrids = []
-        rotationsKeys = ["00cw","00cc","01cw","01cc","10cw","10cc","11cw","11cc"]
-        for key in rotationsKeys:
-            nextGrid = self.gameRunner.rotate(self.grid, key)
-            nextGrids.append(nextGrid)
-        return nextGrids
+    @cached_property
+    def zobristHash(self) -> int:
+        keys = self.gameRunner.zobristKeys
+        return (
+            keys.hashGrids(np.reshape(self.grid, (2, -1)))
+            ^ keys.turnKey(self.current_player, self.turn_step)
+        )
 
-    def rotate(self, rotate_key: str) -> NgoGameState:
-        return NgoGameState(
-            self.turnTracker.getIncremented(),
-            self.gameRunner.rotate(self.grid, rotate_key),
-            self.gameRunner
+    @cached_property
+    def canonicalKey(self) -> Tuple[int, int]:
+        """Key shared by all positions equal to this one up to a symmetry of the 
+        board, and the symmetry transform which maps this position to the 
+        canonical orientation"""
+        key, transform = symmetry.canonicalKey(np.asarray(self.grid))
+        return key << 2 | self.current_player << 1 | self.turn_step, transform
+
+    @cached_property
+    def canonicalZobristHash(self) -> int:
+        keys = self.gameRunner.zobristKeys
+        permutation = symmetry.dihedralPermutations(self.gameRunner.size_board)[self.canonicalKey[1]]
+        return (
+            keys.hashGrids(np.reshape(self.grid, (2, -1))[:, permutation])
+            ^ keys.turnKey(self.current_player, self.turn_step)
         )
 
-    def place(self, index: Tuple[int, int]) -> NgoGameState:
+    def _nextZobristHashes(self, next_grids, next_turn_tracker: TurnTracker) -> List[int]:
+        """Incrementally updates the zobrist hash for a stack of next grids"""
+        keys = self.gameRunner.zobristKeys
+        turn_change = (
+            keys.turnKey(self.current_player, self.turn_step)
+            ^ keys.turnKey(next_turn_tracker.current_player, next_turn_tracker.current_turn_step)
+        )
+        changes = keys.hashChangesBatch(
+            np.reshape(self.grid, (2, -1)), 
+            np.reshape(next_grids, (len(next_grids), 2, -1))
+        )
+        return [self.zobristHash ^ turn_change ^ int(change) for change in changes]
+
+    def _nextState(self, next_grid) -> NgoGameState:
+        next_turn_tracker = self.turnTracker.getIncremented()
         return NgoGameState(
-            self.turnTracker.getIncremented(),
-            self.gameRunner.place(self.grid, self.current_player, index),
-            self.gameRunner
+            next_turn_tracker,
+            next_grid,
+            self.gameRunner,
+            zobristHash=self._nextZobristHashes([next_grid], next_turn_tracker)[0]
         )
 
+    def rotate(self, rotate_key: str) -> NgoGameState:
+        return self._nextState(self.gameRunner.rotate(self.grid, rotate_key))
+
+    def place(self, index: Tuple[int, int]) -> NgoGameState:
+        return self._nextState(self.gameRunner.place(self.grid, self.current_player, index))
+
     def skipRotation(self) -> NgoGameState:
         if self.turn_step != 1:
             raise ValueError("Can only skip rotation on second part of turn")
         return self.skipMove()
 
     def skipMove(self) -> NgoGameState:
-        return NgoGameState(
-            self.turnTracker.getIncremented(),
-            self.grid,
-            self.gameRunner
-        )
+        return self._nextState(self.grid)
+
+    def asNumpy(self) -> np.ndarray:
+        return np.concatenate([
+            np.reshape(self.grid, [-1]), 
+            [self.turnTracker.current_player, self.turnTracker.current_turn_step]
+        ]).astype(np.int32)
 
     def asSingleTensor(self) -> tf.Tensor:
-        return tf.concat([tf.reshape(self.grid, [-1]), self.turnTracker.asTensor()], axis=0)
+        import tensorflow as tf
+        return tf.constant(self.asNumpy())
 
     @cached_property
     def next_moves(self) -> List[NgoGameState]:
-        next_grid_states = self._getNextGridStates()
+        next_grids = self.next_grids
         next_turn_tracker = self.turnTracker.getIncremented()
-        return [NgoGameState(next_turn_tracker, state, self.gameRunner) for state in next_grid_states]
+        is_win, win_player, _ = self.gameRunner.evaluateBatch(next_grids, self.current_player)
+        zobrist_hashes = self._nextZobristHashes(next_grids, next_turn_tracker)
+        return [
+            NgoGameState(
+                next_turn_tracker, 
+                next_grids[i], 
+                self.gameRunner,
+                (bool(is_win[i]), int(win_player[i]) if is_win[i] else None),
+                zobrist_hashes[i]
+            ) 
+            for i in range(len(next_grids))
+        ]
 
     @cached_property
     def _winInfo(self) -> Tuple[bool, int | None]:
@@ -261,10 +328,15 @@ class NgoGameState(AbstractGridGameState):
             return NgoGameState(None, None, gameRunner).place((0,0))
 
     @classmethod
-    def init_with_n_random_placements(self, n: int, runner: NgoGameRunner = None) -> NgoGameState:
+    def init_with_n_random_placements(self, 
+        n: int, runner: NgoGameRunner = None, rng: np.random.Generator | None = None
+    ) -> NgoGameState:
+        """rng: generator for the random placements, eg. seeded for reproducible 
+        starting positions"""
+        agent = randAgent if rng is None else RandomAgent(rng)
         gs = NgoGameState.fairVariant(runner)
         for _ in range(n):
-            gs: NgoGameState = randAgent.move(gs)
+            gs: NgoGameState = agent.move(gs)
             if runner.rotation_enabled:
                 gs = gs.skipRotation()
         return gs
@@ -287,13 +359,11 @@ class NgoGameState(AbstractGridGameState):
     def init_as_winning_position(self, runner: NgoGameRunner, player: int = 0, extra_moves: int = 0):
         
         winning_line_index = self.rng.integers(runner.win.shape[-1])
-        grid_with_winning_line = runner.win[:,:,winning_line_index]
-
-        player_selector = tf.Variable(tf.zeros((2), tf.dtypes.int32))
-        player_selector[player].assign(1)
+        grid_with_winning_line = np.asarray(runner.win)[:,:,winning_line_index]
 
-        grid = tf.einsum("ab,c->cab", grid_with_winning_line, player_selector)
-        gs_with_winning_line = NgoGameState(None, grid, runner)
+        grid = np.zeros((2, runner.size_board, runner.size_board), dtype=np.int32)
+        grid[player] = grid_with_winning_line
+        gs_with_winning_line = NgoGameState(None, runner.gridFromNumpy(grid), runner)
 
         if gs_with_winning_line.grid[0,0,0] == 1:
             extra_moves += 1
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from pathlib import Path
 import os
 import math
@@ -7,13 +9,15 @@ from typing import ClassVar
 
 from gridGamesAi.minimax import MinimaxAgent
 from gridGamesAi.agents import SemiRandomAgent
+from gridGamesAi.gameLog import GameLogWriter
+from gridGamesAi.numpyInference import exportTDAgent
 from gridGamesAi.paths import NGO_MODELS_DIR
-import matplotlib.pyplot as plt
 import numpy as np
 
 from .gameState import NgoGameRunner, NgoGameState
 from .temporalDifferenceModel import Ngo_TD_Agent
 from .resolvedPositions import ResolvedPositions
+from .selfPlayPool import SelfPlayJob, SelfPlayPool
 
 def iterations_from_model_path(path: Path):
     return int(path.stem)
@@ -58,6 +62,29 @@ class ModelManager():
         self.ml_agent.load(self.current_model_path, verbose)
         self.ml_agent.compile_td_model()
 
+    def open_game_log(self, path: Path | None = None) -> GameLogWriter:
+        """Appends the self play games the current model trains on to the game log
+        at path, by default selfPlay.gamelog in the model directory"""
+        if path is None:
+            path = self.base_path / "selfPlay.gamelog"
+        runner = self.game_runner
+        self.ml_agent.gameLog = GameLogWriter(path, runner.size_board ** 2 * 2 + 2, {
+            "game": "ngo",
+            "size_quadrant": runner.size_quadrant,
+            "win_line_length": runner.win_line_length,
+            "rotation_enabled": runner.rotation_enabled,
+            "model": self.base_path.name,
+        })
+        return self.ml_agent.gameLog
+
+    def export_numpy_model(self, path: Path | None = None) -> Path:
+        """Exports the current model for NumpyTDScoringAgent, by default next to
+        the current model path with a .npz suffix"""
+        if path is None:
+            path = self.current_model_path.with_suffix(".npz")
+        exportTDAgent(self.ml_agent, path)
+        return path
+
     def get_sorted_model_paths(self):
         all_model_paths = [path for path in self.base_path.iterdir() if path.is_dir()]
         all_model_paths.sort(key = iterations_from_model_path)
@@ -94,12 +121,41 @@ class ModelManager():
                     )
                 self.base_starting_game_state = None
 
+    def train_parallel(self, n_workers: int | None = None, broadcast_after_training_calls: int = 4):
+        """Trains on games played by a pool of worker processes, see SelfPlayPool.
+        The workers' weights are updated every broadcast_after_training_calls."""
+        start = time()
+        with SelfPlayPool(self.ml_agent, self.game_runner, n_workers) as pool:
+            for _ in range(2 * pool.n_workers):
+                pool.submit(self.next_self_play_job())
+
+            while self.ml_agent.training_calls < self.max_training_calls:
+                self.ml_agent.train_td_from_self_play_game(pool.next_game())
+                pool.submit(self.next_self_play_job())
+
+                if self.ml_agent.training_calls % broadcast_after_training_calls == 0:
+                    pool.broadcast_weights()
+
+                if self.ml_agent.training_calls % self.save_after_traning_calls == 0:
+                    self.save_model()
+                    print(f"Game {self.ml_agent.training_calls} - Time for {self.save_after_traning_calls} calls:", time() - start)
+                    start = time()
+
+    def next_self_play_job(self) -> SelfPlayJob:
+        agent_moves = self.training_model_moves_at_start
+        if self.randomise_model_moves_at_start:
+            agent_moves = np.random.randint(
+                0,
+                max(1, self.ml_agent.training_maxMoves - self.training_random_moves - 1)
+            )
+        return SelfPlayJob(agent_moves, self.training_random_moves)
+
     def rate_against_resolved_positions(self, resolved_positions: ResolvedPositions):
-        sum_square_err = 0
-        for position, expected_value in resolved_positions.positions:
-            score = self.ml_agent.model_score(position)
-            square_err = (score - expected_value) ** 2
-            sum_square_err += square_err
-        return sum_square_err / len(resolved_positions.positions)
-            
+        return resolved_positions.mean_square_error(self.ml_agent)
 
+    def rate_checkpoints(self, resolved_positions: ResolvedPositions, n_workers: int = 0):
+        """Mean square error of every saved checkpoint against resolved_positions,
+        by checkpoint path, see ResolvedPositions.rate_checkpoints"""
+        return resolved_positions.rate_checkpoints(
+            self.ml_agent_class, self.get_sorted_model_paths(), n_workers
+        )
@@ -1,23 +1,149 @@
+from pathlib import Path
+
+from gridGamesAi.agents import RandomAgent
 from gridGamesAi.minimax import MinimaxAgent
+from gridGamesAi.modelRegistry import sharedRegistry
 from gridGamesAi.paths import NGO_MODELS_DIR
-import matplotlib.pyplot as plt
+from gridGamesAi.turnTracker import TurnTracker
 import numpy as np
-from typing import List
+from typing import Dict, List, Tuple
 
 from .gameState import NgoGameRunner, NgoGameState
 from .temporalDifferenceModel import Ngo_TD_Agent
 
+# Version of the generated winning positions, bumped whenever their generation 
+# changes so that cached datasets are regenerated
+WINNING_POSITIONS_VERSION = 1
+
+def winning_grids(
+    runner: NgoGameRunner, n: int, player: int, extra_moves: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Shape (n, 2, size_board, size_board) grids of random positions where player 
+    has a winning line and the other player doesn't, generated in batches: a random 
+    winning line, then extra_moves random pieces for player and extra_moves + 
+    win_line_length for the other player, rejecting the grids where the other 
+    player has a line.
+
+    Unlike NgoGameState.init_as_winning_position, which keeps its line and only 
+    redraws the pieces, a rejected grid is redrawn with a new line. Lines leaving 
+    the other player less room to complete a line of their own are rejected less 
+    often, so they are more likely here than there."""
+    size = runner.size_board
+    lines = np.moveaxis(np.asarray(runner.win), -1, 0).reshape((-1, size * size)).astype(np.int8)
+    other = (player + 1) % 2
+    if 2 * (runner.win_line_length + extra_moves + 1) > size * size:
+        raise ValueError(f"A {size}x{size} grid can't fit {extra_moves} extra moves")
+
+    found = []
+    n_found = 0
+    while n_found < n:
+        batch = 2 * (n - n_found) + 16
+        grids = np.zeros((batch, 2, size * size), dtype=np.int8)
+        grids[:, player] = lines[rng.integers(len(lines), size=batch)]
+        # As in init_as_winning_position, both players get an extra move when 
+        # player 0's line covers the first cell
+        extra = extra_moves + grids[:, 0, 0]
+        # Empty cells in a uniformly random order, the first extra for player and 
+        # the next extra + win_line_length for the other player
+        keys = rng.random((batch, size * size)) + grids[:, player]
+        order = np.argsort(keys, axis=1)
+        rank = np.arange(size * size)[None, :]
+        np.put_along_axis(
+            grids[:, player], order,
+            np.take_along_axis(grids[:, player], order, axis=1) | (rank < extra[:, None]),
+            axis=1,
+        )
+        np.put_along_axis(
+            grids[:, other], order,
+            ((rank >= extra[:, None]) & (rank < 2 * extra[:, None] + runner.win_line_length)).astype(np.int8),
+            axis=1,
+        )
+        grids = grids.reshape((batch, 2, size, size))
+        hasWinningLine = runner.hasWinningLineBatch(grids)
+        grids = grids[hasWinningLine[:, player] & ~hasWinningLine[:, other]]
+        found.append(grids)
+        n_found += len(grids)
+    return np.concatenate(found)[:n]
+
 class ResolvedPositions:
     def __init__(self, game_runner: NgoGameRunner = None):
         if game_runner is None:
             game_runner = NgoGameRunner(3, 5, True)
         self.game_runner = game_runner
         self.positions: List[tuple[NgoGameState, float]] = []
+        self._encoded: Tuple[np.ndarray, np.ndarray] | None = None
+
+    def add_winning_positions(self, 
+        n: int, player: int, extra_moves: int, seed: int | None = None, cache_dir: Path | None = None
+    ):
+        """Adds n positions won by player, see winning_grids. With a seed and a 
+        cache_dir, the positions are saved to and reloaded from a .npz file there 
+        keyed by the runner's configuration, the arguments and the seed."""
+        if seed is not None and cache_dir is not None:
+            grids = self._cached_winning_grids(n, player, extra_moves, seed, Path(cache_dir))
+        else:
+            grids = winning_grids(self.game_runner, n, player, extra_moves, np.random.default_rng(seed))
+        # As after init_as_winning_position's last placement, by the other player
+        turnTracker = TurnTracker(2, 2, (player + 1) % 2, 1)
+        value = 1.0 if player == 0 else -1.0
+        for grid in grids:
+            gs = NgoGameState(turnTracker, self.game_runner.gridFromNumpy(grid), self.game_runner)
+            self.positions.append((gs, value))
+
+    def _cached_winning_grids(self, 
+        n: int, player: int, extra_moves: int, seed: int, cache_dir: Path
+    ) -> np.ndarray:
+        runner = self.game_runner
+        path = cache_dir / (
+            f"winning_{runner.size_quadrant}_{runner.win_line_length}_{int(runner.rotation_enabled)}"
+            f"_p{player}_e{extra_moves}_n{n}_s{seed}.resolved.npz"
+        )
+        if path.exists():
+            with np.load(path) as data:
+                if int(data["version"]) == WINNING_POSITIONS_VERSION:
+                    return data["grids"]
+        grids = winning_grids(runner, n, player, extra_moves, np.random.default_rng(seed))
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(path, grids=grids, version=WINNING_POSITIONS_VERSION)
+        return grids
+
+    def add_tablebase_positions(self, tablebase, n: int, rng: np.random.Generator | None = None):
+        """Adds n positions reached by random moves from the fair variant's start,
+        labelled with their exact score probed from tablebase (a Tablebase of
+        this game runner's rules)"""
+        rng = np.random.default_rng() if rng is None else rng
+        agent = RandomAgent(rng)
+        n_cells = self.game_runner.size_board ** 2
+        positions = []
+        while len(positions) < n:
+            gs = NgoGameState.fairVariant(self.game_runner)
+            for _ in range(rng.integers(0, 2 * n_cells)):
+                if gs.isEnd:
+                    break
+                gs = agent.move(gs)
+            if not gs.isEnd:
+                positions.append(gs)
+        self.positions += zip(positions, tablebase.scores(positions).tolist())
+
+    def encoded(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Stacked asNumpy() arrays and expected scores of the positions, encoded 
+        once and reused until positions are added"""
+        if self._encoded is None or len(self._encoded[1]) != len(self.positions):
+            self._encoded = (
+                np.stack([position.asNumpy() for position, _ in self.positions]),
+                np.array([expected_value for _, expected_value in self.positions]),
+            )
+        return self._encoded
+
+    def mean_square_error(self, agent) -> float:
+        """Mean square error of agent's model scores of the positions, where agent
+        has model_score_arrays (eg. Ngo_TD_Agent or NumpyTDScoringAgent)"""
+        arrays, expected = self.encoded()
+        return float(np.mean((agent.model_score_arrays(arrays) - expected) ** 2))
 
-    def add_winning_positions(self, n: int, player: int, extra_moves: int):
-        for _ in range(n):
-            gs = NgoGameState.init_as_winning_position(self.game_runner, player, extra_moves)
-            if player == 0:
-                self.positions.append((gs, 1.0))
-            if player == 1:
-                self.positions.append((gs, -1.0))
\ No newline at end of file
+    def rate_checkpoints(self, 
+        agentClass, checkpointPaths: List[Path], n_workers: int = 0
+    ) -> Dict[Path, float]:
+        """mean_square_error of each td model checkpoint, scoring all the positions
+        in one batch, see ModelRegistry.meanSquareErrors"""
+        return sharedRegistry(agentClass).meanSquareErrors(checkpointPaths, *self.encoded(), n_workers)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+import itertools
+
+import numpy as np
+
+ROTATION_KEYS = ["00cw","00cc","01cw","01cc","10cw","10cc","11cw","11cc"]
+
+class AbstractRunnerBackend(ABC):
+    """Implements the game rule operations of an NgoGameRunner on a specific
+    array type. Grids have shape (2, size_board, size_board), with one layer
+    per player."""
+
+    def __init__(self, size_quadrant: int, win_line_length: int):
+        self.size_quadrant = size_quadrant
+        self.size_board = 2 * size_quadrant
+        self.win_line_length = win_line_length
+
+    @abstractmethod
+    def initialiseGrid(self): pass
+
+    @abstractmethod
+    def fromNumpy(self, array: np.ndarray): pass
+
+    @abstractmethod
+    def rotate(self, grid, rotationKey: str): pass
+
+    @abstractmethod
+    def hasWinningLine(self, grid): pass
+
+    @abstractmethod
+    def naiveScore(self, grid) -> int: pass
+
+    @abstractmethod
+    def lineCountsBatch(self, grids) -> np.ndarray:
+        """Number of pieces each player has on each winning line, for a stack of 
+        grids of shape (N, 2, size_board, size_board). Returns shape (N, 2, L)"""
+
+    @abstractmethod
+    def place(self, grid, player: int, index: Tuple[int,int]): pass
+
+    @abstractmethod
+    def nextPlacementGrids(self, grid, player: int):
+        """All grids reachable by player placing a piece on a free gridspace, as a 
+        single array of shape (k, 2, size_board, size_board)"""
+
+    @abstractmethod
+    def nextRotationGrids(self, grid):
+        """All grids reachable by rotating a quadrant, as a single array of shape 
+        (len(ROTATION_KEYS), 2, size_board, size_board)"""
+
+    @abstractmethod
+    def allPositionsFilled(self, grid) -> bool: pass
+
+
+class NumpyRunnerBackend(AbstractRunnerBackend):
+    """Runner backend operating on int32 numpy arrays. Rotations are applied as
+    index permutations of the flattened grid and win lines are evaluated with a
+    single matmul against the win mapping matrix."""
+
+    def __init__(self, size_quadrant: int, win_line_length: int):
+        super().__init__(size_quadrant, win_line_length)
+        self.rotations = self.generateRotationTensors()
+        self.rotationIndices = {
+            key: self._rotationTensorToIndices(rot) for key, rot in self.rotations.items()
+        }
+        self.stackedRotationIndices = np.stack(
+            [self.rotationIndices[key] for key in ROTATION_KEYS]
+        )
+        self.win = self.generateWinEvaluationTensor()
+        self.winMatrix = self.win.reshape((self.size_board ** 2, -1))
+
+    def generateRotationTensors(self) -> Dict[str, np.ndarray]:
+        """Same rotation tensors as the tensorflow backend, such that
+        rotated[p,c,d] = sum_ab grid[p,a,b] * rotation[a,b,c,d]"""
+        d = self.size_board
+        q = self.size_quadrant
+        no_rotation_tensor = np.einsum("ac,bd->abcd", np.eye(d, dtype=np.int32), np.eye(d, dtype=np.int32))
+        rot_sub = np.einsum("ac,bd->abcd", np.eye(q, dtype=np.int32), np.eye(q, dtype=np.int32))
+        rot_cw = np.flip(np.transpose(rot_sub, [1,0,2,3]), 0)
+        rot_cc = np.flip(np.transpose(rot_sub, [1,0,2,3]), 1)
+        rotations = {"none": no_rotation_tensor}
+        s = [slice(0,q),slice(q,2*q)]
+        for perm in itertools.product([0,1], repeat=2):
+            sectorName = f"{perm[0]}{perm[1]}"
+            sliceArr = (s[perm[0]],s[perm[1]],s[perm[0]],s[perm[1]])
+            for suffix, rot in (("cw", rot_cw), ("cc", rot_cc)):
+                x = no_rotation_tensor.copy()
+                x[sliceArr] = rot
+                rotations[f"{sectorName}{suffix}"] = x
+        return rotations
+
+    def _rotationTensorToIndices(self, rotation: np.ndarray) -> np.ndarray:
+        """Index i of the result is the flat index of the gridspace which is moved
+        to flat index i by the rotation"""
+        n = self.size_board ** 2
+        return np.argmax(rotation.reshape((n, n)), axis=0)
+
+    def generateWinEvaluationTensor(self) -> np.ndarray:
+        win_mapping_tensors = []
+        d = self.size_board
+        win_n = self.win_line_length
+        for i, j in itertools.product(range(d),range(d-win_n+1)):
+            spaces_map = np.zeros((d,d),dtype=np.int32)
+            spaces_map[i, j:win_n+j] = 1
+            win_mapping_tensors.append(spaces_map)
+            spaces_map = np.zeros((d,d),dtype=np.int32)
+            spaces_map[j:win_n+j, i] = 1
+            win_mapping_tensors.append(spaces_map)
+        for i, j in itertools.product(range(d-win_n+1),repeat=2):
+            spaces_map = np.zeros((d,d),dtype=np.int32)
+            spaces_map[i:win_n+i, j:win_n+j] = np.eye(win_n,dtype=np.int32)
+            win_mapping_tensors.append(spaces_map)
+            spaces_map = np.zeros((d,d),dtype=np.int32)
+            spaces_map[i:win_n+i, j:win_n+j] = np.flip(np.eye(win_n,dtype=np.int32), 0)
+            win_mapping_tensors.append(spaces_map)
+        return np.stack(win_mapping_tensors, axis=2)
+
+    def initialiseGrid(self) -> np.ndarray:
+        return np.zeros((2, self.size_board, self.size_board), dtype=np.int32)
+
+    def fromNumpy(self, array: np.ndarray) -> np.ndarray:
+        return np.asarray(array, dtype=np.int32)
+
+    def rotate(self, grid: np.ndarray, rotationKey: str) -> np.ndarray:
+        indices = self.rotationIndices[rotationKey]
+        return grid.reshape((2, -1))[:, indices].reshape(grid.shape)
+
+    def _lineCounts(self, grid: np.ndarray) -> np.ndarray:
+        return grid.reshape((2, -1)) @ self.winMatrix
+
+    def hasWinningLine(self, grid: np.ndarray) -> np.ndarray:
+        return np.max(self._lineCounts(grid), axis=1) == self.win_line_length
+
+    def naiveScore(self, grid: np.ndarray) -> int:
+        count_on_each_winning_line = np.max(self._lineCounts(grid), axis=1)
+        square_of_count = np.square(count_on_each_winning_line)
+        return int(square_of_count[0] - square_of_count[1])
+
+    def lineCountsBatch(self, grids: np.ndarray) -> np.ndarray:
+        n = len(grids)
+        flat_grids = grids.reshape((n * 2, self.size_board ** 2))
+        return (flat_grids @ self.winMatrix).reshape((n, 2, -1))
+
+    def place(self, grid: np.ndarray, player: int, index: Tuple[int,int]) -> np.ndarray:
+        if grid[player, index[0], index[1]] != 0:
+            raise Exception("Invalid placement")
+        newGrid = grid.copy()
+        newGrid[player, index[0], index[1]] = 1
+        return newGrid
+
+    def nextPlacementGrids(self, grid: np.ndarray, player: int) -> np.ndarray:
+        free_spaces = np.flatnonzero(np.sum(grid, axis=0) == 0)
+        k = free_spaces.size
+        new_grids = np.repeat(grid[None], k, axis=0)
+        new_grids.reshape((k, 2, -1))[np.arange(k), player, free_spaces] = 1
+        return new_grids
+
+    def nextRotationGrids(self, grid: np.ndarray) -> np.ndarray:
+        # Gathering with the stacked index permutations is equivalent to contracting
+        # against the stacked rotation tensors, without the O(size_board^4) product
+        rotated = grid.reshape((2, -1))[:, self.stackedRotationIndices]
+        return np.transpose(rotated, (1, 0, 2)).reshape((-1,) + grid.shape)
+
+    def allPositionsFilled(self, grid: np.ndarray) -> bool:
+        return np.sum(grid) == self.size_board * self.size_board
@@ -1,6 +1,9 @@
+from typing import List
+
+import numpy as np
 from scipy.special import expit
 
-from ..common import  handle_wins_draws_method
+from ..common import  handle_wins_draws_method, baseScoreStrategyMany
 from ..scoringAgents import  OnGameStateCachingScoringAgent
 from .gameState import NgoGameState
 
@@ -12,5 +15,16 @@ class NgoNaiveScoringAgent(OnGameStateCachingScoringAgent):
         # squish the score to be between -1 and 1 using a sigmoid function
         return 2*(expit(self.unsquished_score(gameState)*expitScale) - 0.5)
 
+    def _score_many(self, gameStates: List[NgoGameState]) -> List[float]:
+        return baseScoreStrategyMany(gameStates, self._squished_scores)
+
+    def _squished_scores(self, gameStates: List[NgoGameState]) -> np.ndarray:
+        expitScale = 0.05
+        return 2*(expit(self.unsquished_scores(gameStates)*expitScale) - 0.5)
+
     def unsquished_score(self, gameState: NgoGameState) -> int:
-        return gameState.gameRunner.naiveScore(gameState.grid).numpy()
\ No newline at end of file
+        return gameState.gameRunner.naiveScore(gameState.grid)
+
+    def unsquished_scores(self, gameStates: List[NgoGameState]) -> np.ndarray:
+        runner = gameStates[0].gameRunner
+        return runner.naiveScoreBatch(np.stack([gameState.grid for gameState in gameStates]))
\ No newline at end of file
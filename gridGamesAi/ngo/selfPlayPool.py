@@ -0,0 +1,190 @@
+"""Parallel self play for training Ngo_TD_Agent models.
+
+Worker processes each hold a frozen copy of the learner's model and play games
+from starting positions requested by the learner, sending back the positions of
+each game as a SelfPlayGame. The learner trains on the games as they arrive and
+periodically broadcasts its updated weights, which each worker picks up before
+starting its next game.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import multiprocessing as mp
+import os
+import queue
+import traceback
+from typing import List, Type
+
+import tensorflow as tf
+
+from ..agents import SemiRandomAgent
+from ..minimax import MinimaxAgent
+from .gameState import NgoGameRunner, NgoGameState
+from .temporalDifferenceModel import Ngo_TD_Agent, SelfPlayGame
+
+@dataclass
+class SelfPlayJob:
+    """A game for a worker to play, starting from the fair variant position
+    followed by agent_moves moves of the model then random_moves random moves"""
+    agent_moves: int
+    random_moves: int
+    random_chance: float = 0.1
+
+@dataclass
+class _WorkerError:
+    traceback: str
+
+def _latestWeights(weightUpdates: mp.Queue):
+    weights = None
+    while True:
+        try:
+            weights = weightUpdates.get_nowait()
+        except queue.Empty:
+            return weights
+
+def _selfPlayWorker(
+    agentClass: Type[Ngo_TD_Agent],
+    gameRunner: NgoGameRunner,
+    weights: List,
+    jobs: mp.Queue,
+    results: mp.Queue,
+    weightUpdates: mp.Queue,
+):
+    # Parallelism comes from the number of workers, one thread each avoids
+    # oversubscribing the cores
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    try:
+        agent = agentClass(None, gameRunner)
+        agent.td_model.set_weights(weights)
+        while True:
+            job: SelfPlayJob | None = jobs.get()
+            if job is None:
+                break
+            weights = _latestWeights(weightUpdates)
+            if weights is not None:
+                agent.td_model.set_weights(weights)
+                agent.incrementSerial()
+
+            rootGameState = NgoGameState.init_with_n_agent_and_m_random_moves(
+                job.agent_moves,
+                job.random_moves,
+                SemiRandomAgent(MinimaxAgent(agent, 0), job.random_chance),
+                gameRunner
+            )
+            movesSequence = agent._generate_self_play_moves_sequence(rootGameState, False)
+            results.put(SelfPlayGame.fromMovesSequence(movesSequence))
+    except Exception:
+        results.put(_WorkerError(traceback.format_exc()))
+    finally:
+        results.put(None)
+
+class SelfPlayPool:
+    """Pool of worker processes playing games with copies of agent's model.
+
+    Jobs are queued with submit and finished games are returned by next_game in
+    the order they finish. Workers keep playing with the weights they last
+    received, so call broadcast_weights after training the agent.
+
+    Workers are started with the spawn method, so scripts creating a pool must
+    guard their entry point with `if __name__ == "__main__":`.
+    """
+
+    def __init__(self,
+        agent: Ngo_TD_Agent,
+        gameRunner: NgoGameRunner,
+        n_workers: int | None = None,
+    ):
+        """n_workers: number of worker processes, defaults to the number of cores"""
+        self.agent = agent
+        self.gameRunner = gameRunner
+        self.n_workers = n_workers or os.cpu_count()
+        self._context = mp.get_context("spawn")
+        self._processes: List[mp.Process] = []
+        self._weightUpdates: List[mp.Queue] = []
+        self._jobs: mp.Queue = None
+        self._results: mp.Queue = None
+        self.pending = 0
+
+    def __enter__(self) -> SelfPlayPool:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        self._jobs = self._context.Queue()
+        self._results = self._context.Queue()
+        weights = self.agent.td_model.get_weights()
+        for _ in range(self.n_workers):
+            weightUpdates = self._context.Queue()
+            process = self._context.Process(
+                target=_selfPlayWorker,
+                args=(
+                    type(self.agent), self.gameRunner, weights,
+                    self._jobs, self._results, weightUpdates
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+            self._weightUpdates.append(weightUpdates)
+
+    def submit(self, job: SelfPlayJob):
+        self._jobs.put(job)
+        self.pending += 1
+
+    def broadcast_weights(self):
+        """Sends the agent's current weights to all workers"""
+        weights = self.agent.td_model.get_weights()
+        for weightUpdates in self._weightUpdates:
+            weightUpdates.put(weights)
+
+    def next_game(self) -> SelfPlayGame:
+        """Waits for the next finished game"""
+        if self.pending == 0:
+            raise RuntimeError("No self play jobs have been submitted")
+        while True:
+            try:
+                result = self._results.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self._processes):
+                    raise RuntimeError("All self play workers have stopped")
+                continue
+            if isinstance(result, _WorkerError):
+                raise RuntimeError("Self play worker failed:\n" + result.traceback)
+            if result is not None:
+                self.pending -= 1
+                return result
+
+    def close(self):
+        """Discards queued jobs and stops the workers"""
+        if not self._processes:
+            return
+        try:
+            while True:
+                self._jobs.get_nowait()
+        except queue.Empty:
+            pass
+        for _ in self._processes:
+            self._jobs.put(None)
+
+        # Workers can't exit until everything they've put on the results queue
+        # has been read
+        running = sum(process.is_alive() for process in self._processes)
+        while running:
+            try:
+                if self._results.get(timeout=1) is None:
+                    running -= 1
+            except queue.Empty:
+                running = sum(process.is_alive() for process in self._processes)
+
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._weightUpdates = []
+        self.pending = 0
@@ -1,31 +1,63 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
 from functools import cache
 import json
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import tensorflow as tf
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from gridGamesAi.common import baseScoreStrategy
+from gridGamesAi.common import baseScoreStrategy, baseScoreStrategyMany
+from gridGamesAi.gameLog import GameLogWriter
 from gridGamesAi.minimax import MinimaxAgent
 from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
 from gridGamesAi.scoringAgents import OnGameStateCachingScoringAgent
+from gridGamesAi.tdLearning import TDLearner, compiledPredict, compiledTDGradients, eagerPredict
+
+@dataclass
+class SelfPlayGame:
+    """Positions of a self play game as model input arrays, in the form sent
+    between processes.
+
+    states: asNumpy() of each position, from the root to the end of the game
+    end_score: score of the final position (1, -1 or 0)
+    total_moves: total moves made in the game by its end
+    """
+    states: np.ndarray
+    end_score: float
+    total_moves: int
+
+    @classmethod
+    def fromMovesSequence(cls, movesSequence: List[NgoGameState]) -> SelfPlayGame:
+        return cls(
+            np.stack([gameState.asNumpy() for gameState in movesSequence]),
+            baseScoreStrategy(movesSequence[-1], None),
+            int(movesSequence[-1].turnTracker.total_moves)
+        )
 
 class Ngo_TD_Agent(OnGameStateCachingScoringAgent):
+    # Name of the model input encoding in numpyInference.INPUT_ENCODINGS
+    modelInputEncoding = "ngo"
+
     def __init__(
         self,
         loadPath = None,
         newModelRunner = None,
         minixmaxAgent = MinimaxAgent(None, max_depth=0),
+        graphMode = True,
     ) -> None:
         """ Initialize the agent. If loadPath is provided, td model 
         will be loaded from that path. If newModelRunner is provided and loadPath
-        is None, a new model will be created. """
+        is None, a new model will be created. If graphMode is True, scoring and TD
+        updates run as tf.functions, otherwise the model is called eagerly. """
 
         self.incrementSerial()
         
         self.td_model: TD_model = None
         self.isCompiled = False
+        self.graphMode = graphMode
+        self._predict = None
+        self._td_gradients = None
 
         self.minimaxAgent: MinimaxAgent = minixmaxAgent
         self.minimaxAgent.scoringAgent = self
@@ -33,6 +65,9 @@ class Ngo_TD_Agent(OnGameStateCachingScoringAgent):
         self.training_calls = 0
         self.trainingCall_totalMoves: List[Tuple[int, int]] = []
         self.training_maxMoves = 0
+        self.td_learner: TDLearner | None = None
+        # Log the self play games trained on are appended to, if any
+        self.gameLog: GameLogWriter | None = None
 
         if loadPath is not None:
             self.load(loadPath)
@@ -110,10 +145,24 @@ class Ngo_TD_Agent(OnGameStateCachingScoringAgent):
         self.td_model.compile(
             loss=tf.keras.losses.MeanSquaredError(), 
             metrics=[],
-            run_eagerly=True
+            run_eagerly=not self.graphMode
         )
+        if self.graphMode:
+            self._predict = compiledPredict(self.td_model)
+            self._td_gradients = compiledTDGradients(self.td_model)
+        else:
+            self._predict = eagerPredict(self.td_model)
+            self._td_gradients = None
         self.isCompiled = True
 
+    def create_td_learner(self, **kwargs):
+        """Trains from now on with a replay buffer and minibatch TD(lambda)
+        learner, instead of TD_model.train_td_from_sequential_states. kwargs are
+        passed to TDLearner."""
+        self.requireComplied()
+        kwargs.setdefault("td_lambda", self.td_model.td_factor)
+        self.td_learner = TDLearner(self.td_model, **kwargs)
+
     def requireComplied(self):
         if self.td_model is None:
             raise Exception("Must create or load a TD model")
@@ -123,26 +172,52 @@ class Ngo_TD_Agent(OnGameStateCachingScoringAgent):
     def _score(self, gameState: NgoGameState) -> float:
         return baseScoreStrategy(gameState, self.model_score)
 
+    def _score_many(self, gameStates: List[NgoGameState]) -> List[float]:
+        return baseScoreStrategyMany(gameStates, self.model_score_many)
+
     def model_score(self, gameState: NgoGameState):
-        return self.td_model.__call__(
-            gameState.asSingleTensor()[None, :]
-        ).numpy()[0,0]
+        return self.model_score_many([gameState])[0]
+
+    def model_score_many(self, gameStates: List[NgoGameState]) -> np.ndarray:
+        """Scores the game states with a single forward pass of the td model"""
+        return self._predict(self._model_input(gameStates))
+
+    def model_score_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        """Scores positions given as stacked asNumpy() arrays, none of which
+        are ended games"""
+        return self._predict(self._model_input_arrays(arrays))
+
+    def _model_input(self, gameStates: List[NgoGameState]) -> np.ndarray:
+        return self._model_input_arrays(
+            np.stack([gameState.asNumpy() for gameState in gameStates])
+        )
+
+    def _model_input_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        return arrays
 
     def train_td_from_game(self, rootGameState: NgoGameState):
         movesSequence = self._generate_self_play_moves_sequence(rootGameState)
+        self.train_td_from_self_play_game(SelfPlayGame.fromMovesSequence(movesSequence))
 
-        gameStateTensors = [
-            gameState.asSingleTensor() 
-            for gameState in movesSequence
-        ]
-        scores = np.array([self.score(gameState) for gameState in movesSequence])
+    def train_td_from_self_play_game(self, game: SelfPlayGame):
+        """Trains on a self play game, which may have been played by another
+        copy of the model"""
+        scores = np.empty(len(game.states))
+        scores[:-1] = self.model_score_arrays(game.states[:-1])
+        scores[-1] = game.end_score
 
-        self.td_model.train_td_from_sequential_states(gameStateTensors, scores)
+        if self.td_learner is not None:
+            self.td_learner.add_game(self._model_input_arrays(game.states), scores)
+        else:
+            self.td_model.train_td_from_sequential_states(
+                list(game.states), scores, self._td_gradients
+            )
+        if self.gameLog is not None:
+            self.gameLog.append(game.states, game.end_score, game.total_moves, self.training_calls)
         self.incrementSerial()
-        self._update_training_record(movesSequence)
+        self._update_training_record(game.total_moves)
 
-    def _update_training_record(self, movesSequence: List[NgoGameState]):
-        moves = int(movesSequence[-1].turnTracker.total_moves)
+    def _update_training_record(self, moves: int):
         self.training_calls += 1
         self.trainingCall_totalMoves.append(
             (
@@ -152,17 +227,21 @@ class Ngo_TD_Agent(OnGameStateCachingScoringAgent):
         )
         self.training_maxMoves = max(self.training_maxMoves, moves)
 
-    def _generate_self_play_moves_sequence(self, rootGameState):
+    def _generate_self_play_moves_sequence(self, rootGameState, verbose=True):
         movesSequence: List[NgoGameState] = [rootGameState]
         while not movesSequence[-1].isEnd:
-            print(
-                f"Game {self.training_calls} ",
-                f"- Total moves: {movesSequence[-1].turnTracker.total_moves}     ",
-                end="\r")
+            if verbose:
+                print(
+                    f"Game {self.training_calls} ",
+                    f"- Total moves: {movesSequence[-1].turnTracker.total_moves}     ",
+                    end="\r")
             movesSequence.append(self.minimaxAgent.move(movesSequence[-1]))
         return movesSequence
 
     def plot_training_total_moves(self):
+        import matplotlib.pyplot as plt
+        import pandas as pd
+
         x = [i[0] for i in self.trainingCall_totalMoves]
         y = [i[1] for i in self.trainingCall_totalMoves]
         df = pd.DataFrame({"training_run": x, "moves": y})
@@ -181,10 +260,10 @@ class Ngo_TD_Agent(OnGameStateCachingScoringAgent):
         plt.show()
 
 class Ngo_TD_Agent_v1b(Ngo_TD_Agent):
-    def model_score(self, gameState: NgoGameState):
-        return self.td_model.__call__(
-            gameState.asSingleTensor()[None, :] * 2 - 1
-        ).numpy()[0,0]
+    modelInputEncoding = "ngo_v1b"
+
+    def _model_input_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        return arrays * 2 - 1
 
 
 class TD_model(tf.keras.Model):
@@ -194,21 +273,32 @@ class TD_model(tf.keras.Model):
         self.batch_size = 1
         self.batch_pending = []
 
-    def train_td_from_sequential_states(self, tensor_states: List[tf.Tensor], scores: np.ndarray):
+    def train_td_from_sequential_states(self, 
+        tensor_states: List[tf.Tensor], 
+        scores: np.ndarray,
+        td_gradients: Callable | None = None
+    ):
         """Trains the tensor model from a series of tensor_states and their know score (using
         the latest verion of the model).
         Expects: 
             len(tensor_states) = len(scores)
+        td_gradients: optional compiled function of (states, weights) giving the weighted
+            sum of the gradients of the states' scores, see compiledTDGradients
         """
         deltas = scores[1:] - scores[:-1]
-        gradients = []
-        for tensor in tensor_states[:-1]:
-            with tf.GradientTape() as tape:
-                tfModelScore = self.__call__(tensor[None, :])
-            gradients.append(
-                tape.gradient(tfModelScore, self.trainable_variables)
+        if td_gradients is not None:
+            delta_trainable = td_gradients(
+                np.stack(tensor_states[:-1]), self.generate_temporal_difference_weights(deltas)
             )
-        delta_trainable = self.get_update_as_weighted_sum_gradients(deltas, gradients)
+        else:
+            gradients = []
+            for tensor in tensor_states[:-1]:
+                with tf.GradientTape() as tape:
+                    tfModelScore = self.__call__(tensor[None, :])
+                gradients.append(
+                    tape.gradient(tfModelScore, self.trainable_variables)
+                )
+            delta_trainable = self.get_update_as_weighted_sum_gradients(deltas, gradients)
         if self.batch_size == 1:
             self.optimizer.apply_gradients(zip(delta_trainable, self.trainable_variables))
             return
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import Tuple
+import itertools
+
+import numpy as np
+import tensorflow as tf
+
+from .runnerBackends import AbstractRunnerBackend, ROTATION_KEYS
+
+
+class TensorflowRunnerBackend(AbstractRunnerBackend):
+    """Runner backend operating on tensorflow tensors."""
+
+    def __init__(self, size_quadrant: int, win_line_length: int):
+        super().__init__(size_quadrant, win_line_length)
+        self.rotations = self.generateRotationTensors()
+        self.stackedRotations = tf.stack([self.rotations[key] for key in ROTATION_KEYS])
+        self.win = self.generateWinEvaluationTensor()
+
+    def generateRotationTensors(self):
+        identityMatrix = tf.eye(self.size_board,self.size_board,dtype=tf.int32)
+        no_rotation_tensor = tf.transpose( tf.tensordot(identityMatrix, identityMatrix, 0), [0,2,1,3])
+        quadrantIdentityMatrix = tf.eye(self.size_quadrant,self.size_quadrant,dtype=tf.int32)
+        rot_sub = tf.transpose( tf.tensordot(quadrantIdentityMatrix, quadrantIdentityMatrix ,0), [0,2,1,3])
+        rot_cw = tf.reverse(tf.transpose(rot_sub, [1,0,2,3]), [0])
+        rot_cc = tf.reverse(tf.transpose(rot_sub, [1,0,2,3]), [1])
+        rotations = {"none": no_rotation_tensor}
+        s = [slice(0,self.size_quadrant),slice(self.size_quadrant,2*self.size_quadrant)]
+        i = [0,1]
+        for perm in itertools.product(i, repeat=2):
+            sectorName = f"{perm[0]}{perm[1]}"
+            sliceArr = [s[perm[0]],s[perm[1]],s[perm[0]],s[perm[1]]]
+            x = tf.Variable(no_rotation_tensor)
+            x = x.__getitem__(sliceArr).assign(rot_cw)
+            rotations[f"{sectorName}cw"] = x
+            x = tf.Variable(no_rotation_tensor)
+            x = x.__getitem__(sliceArr).assign(rot_cc)
+            rotations[f"{sectorName}cc"] = x
+        return rotations
+
+    def generateWinEvaluationTensor(self):
+        win_mapping_tensors = []
+        d = self.size_board
+        win_n = self.win_line_length
+        for i, j in itertools.product(range(d),range(d-win_n+1)):
+            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
+            spaces_map = spaces_map[i, j:win_n+j].assign(tf.ones((win_n),dtype=tf.int32))
+            win_mapping_tensors.append(spaces_map)
+            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
+            spaces_map = spaces_map[j:win_n+j, i].assign(tf.ones((win_n),dtype=tf.int32))
+            win_mapping_tensors.append(spaces_map)
+        for i, j in itertools.product(range(d-win_n+1),repeat=2):
+            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
+            spaces_map = spaces_map[i:win_n+i, j:win_n+j].assign(tf.eye(win_n,dtype=tf.int32))
+            win_mapping_tensors.append(spaces_map)
+            spaces_map = tf.Variable(tf.zeros((d,d),dtype=tf.int32))
+            spaces_map = spaces_map[i:win_n+i, j:win_n+j].assign(tf.reverse(tf.eye(win_n,dtype=tf.int32),[0]))
+            win_mapping_tensors.append(spaces_map)
+        win = tf.stack(win_mapping_tensors, axis=2)
+        return win
+
+    def initialiseGrid(self):
+        return tf.Variable(tf.zeros([2,self.size_board,self.size_board],dtype=tf.int32))
+
+    def fromNumpy(self, array: np.ndarray):
+        return tf.Variable(tf.constant(array, dtype=tf.int32))
+
+    def rotate(self, grid: tf.Tensor, rotationKey: str) -> tf.Tensor:
+        rot = self.rotations[rotationKey]
+        return tf.Variable( tf.tensordot(grid, rot, (2)) )
+
+    def hasWinningLine(self, grid: tf.Tensor) -> tf.Tensor:
+        return tf.equal(tf.reduce_max( tf.tensordot(grid, self.win, 2), [1] ), self.win_line_length)
+
+    def naiveScore(self, grid: tf.Tensor) -> int:
+        count_on_each_winning_line = tf.reduce_max( tf.tensordot(grid, self.win, 2), [1] )
+        square_of_count = tf.square(count_on_each_winning_line)
+        change_player_1_sign = tf.tensordot(tf.constant([1,-1],dtype=tf.int32),
+            square_of_count, 1)
+        return int(tf.reduce_sum(change_player_1_sign))
+
+    def lineCountsBatch(self, grids: tf.Tensor) -> np.ndarray:
+        return tf.tensordot(grids, self.win, [[2,3],[0,1]]).numpy()
+
+    def place(self, grid: tf.Tensor, player: int, index: Tuple[int,int]):
+        newGrid = tf.Variable(grid)
+        newGrid = tf.tensor_scatter_nd_add(newGrid, [[player, index[0], index[1]]], [1])
+        if tf.reduce_max(newGrid) == 2:
+            raise Exception("Invalid placement")
+        return newGrid
+
+    def nextPlacementGrids(self, grid: tf.Tensor, player: int) -> tf.Tensor:
+        sum_axis_0 = tf.reduce_sum(grid, axis=0)
+        free_spaces = tf.cast(tf.where(tf.equal(sum_axis_0, 0)), tf.int32)
+        k = tf.shape(free_spaces)[0]
+        scatter_indices = tf.concat([
+            tf.range(k)[:, None],
+            tf.fill([k, 1], player),
+            free_spaces
+        ], axis=1)
+        new_grids = tf.repeat(tf.convert_to_tensor(grid)[None], k, axis=0)
+        return tf.tensor_scatter_nd_add(new_grids, scatter_indices, tf.ones([k], tf.int32))
+
+    def nextRotationGrids(self, grid: tf.Tensor) -> tf.Tensor:
+        return tf.einsum("pab,kabcd->kpcd", grid, self.stackedRotations)
+
+    def allPositionsFilled(self, grid: tf.Tensor) -> bool:
+        return bool(tf.reduce_sum(grid) == self.size_board * self.size_board)
@@ -0,0 +1,187 @@
+"""Evaluation of exported td value networks with NumPy only, for processes which
+only score positions and shouldn't pay for importing tensorflow and loading a
+keras model.
+
+A network is exported to a flat .npz file holding kernel_i, bias_i and
+activation_i for each Dense layer i, and the name of the input encoding the
+model was trained with (see INPUT_ENCODINGS). Alternatively, saveFlat writes all
+the weights to a single float32 .npy file with a .json layout alongside, which
+loadFlat memory maps rather than reads.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .common import AbstractGameState, baseScoreStrategy, baseScoreStrategyMany
+from .scoringAgents import AbstractScoringAgent
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+}
+
+def _pentagoModelInput(arrays: np.ndarray) -> np.ndarray:
+    from .pentago.modelInput import modelInputArrays
+    return modelInputArrays(arrays)
+
+# Model input from stacked asNumpy() arrays, by the td agents' modelInputEncoding
+INPUT_ENCODINGS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "ngo": lambda arrays: arrays,
+    "ngo_v1b": lambda arrays: arrays * 2 - 1,
+    "pentago": _pentagoModelInput,
+}
+
+class DenseNetwork:
+    """Stack of dense layers, evaluated on a batch of inputs with one matmul per
+    layer"""
+
+    def __init__(self,
+        kernels: List[np.ndarray],
+        biases: List[np.ndarray],
+        activations: List[str]
+    ):
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.kernels = [np.asarray(kernel, dtype=np.float32) for kernel in kernels]
+        self.biases = [np.asarray(bias, dtype=np.float32) for bias in biases]
+        self.activations = list(activations)
+
+    @property
+    def input_size(self) -> int:
+        return self.kernels[0].shape[0]
+
+    def __call__(self, inputs: np.ndarray) -> np.ndarray:
+        """Scores of a batch of inputs, with shape (N,)"""
+        x = np.asarray(inputs, dtype=np.float32)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x[:, 0]
+
+    @classmethod
+    def fromKerasModel(cls, model) -> DenseNetwork:
+        kernels, biases, activations = [], [], []
+        for layer in model.layers:
+            if not layer.get_weights():
+                continue
+            config = layer.get_config()
+            if "activation" not in config or len(layer.get_weights()) != 2:
+                raise ValueError(f"Unsupported layer for export: {layer.name}")
+            kernel, bias = layer.get_weights()
+            kernels.append(kernel)
+            biases.append(bias)
+            activations.append(config["activation"])
+        return cls(kernels, biases, activations)
+
+class NumpyTDScoringAgent(AbstractScoringAgent):
+    """Scores game states with an exported td model, see exportTDAgent"""
+
+    def __init__(self, network: DenseNetwork, inputEncoding: str):
+        self.network = network
+        self.inputEncoding = inputEncoding
+        self._modelInput = INPUT_ENCODINGS[inputEncoding]
+
+    @classmethod
+    def load(cls, path: Path) -> NumpyTDScoringAgent:
+        with np.load(path) as data:
+            n_layers = sum(1 for key in data.files if key.startswith("kernel_"))
+            network = DenseNetwork(
+                [data[f"kernel_{i}"] for i in range(n_layers)],
+                [data[f"bias_{i}"] for i in range(n_layers)],
+                [str(data[f"activation_{i}"]) for i in range(n_layers)],
+            )
+            return cls(network, str(data["input_encoding"]))
+
+    def save(self, path: Path):
+        arrays = {"input_encoding": np.array(self.inputEncoding)}
+        for i, (kernel, bias, activation) in enumerate(zip(
+            self.network.kernels, self.network.biases, self.network.activations
+        )):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+            arrays[f"activation_{i}"] = np.array(activation)
+        np.savez(path, **arrays)
+
+    def score(self, gameState: AbstractGameState) -> float:
+        return baseScoreStrategy(
+            gameState, lambda gameState: self.model_score_arrays(gameState.asNumpy()[None, :])[0]
+        )
+
+    def score_many(self, gameStates: List[AbstractGameState]) -> List[float]:
+        return baseScoreStrategyMany(
+            gameStates,
+            lambda gameStates: self.model_score_arrays(
+                np.stack([gameState.asNumpy() for gameState in gameStates])
+            )
+        )
+
+    def saveFlat(self, path: Path):
+        """Writes the weights to path as one float32 .npy array, and the layout of
+        the layers to path with a .json suffix"""
+        path = Path(path)
+        network = self.network
+        np.save(path, np.concatenate([
+            array.ravel() for layer in zip(network.kernels, network.biases) for array in layer
+        ]).astype(np.float32))
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({
+                "input_encoding": self.inputEncoding,
+                "layers": [
+                    {"kernel": list(kernel.shape), "bias": list(bias.shape), "activation": activation}
+                    for kernel, bias, activation in zip(
+                        network.kernels, network.biases, network.activations
+                    )
+                ],
+            }, f)
+
+    @classmethod
+    def loadFlat(cls, path: Path, mmap: bool = True) -> NumpyTDScoringAgent:
+        """Loads weights written by saveFlat. With mmap, the layers are views of
+        the memory mapped file, so only the pages used are read."""
+        path = Path(path)
+        with open(path.with_suffix(".json")) as f:
+            layout = json.load(f)
+        weights = np.load(path, mmap_mode="r" if mmap else None)
+        arrays, offset = [], 0
+        for layer in layout["layers"]:
+            for shape in (layer["kernel"], layer["bias"]):
+                size = int(np.prod(shape))
+                arrays.append(weights[offset:offset + size].reshape(shape))
+                offset += size
+        network = DenseNetwork(
+            arrays[0::2], arrays[1::2], [layer["activation"] for layer in layout["layers"]]
+        )
+        return cls(network, layout["input_encoding"])
+
+    def model_score_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        """Scores positions given as stacked asNumpy() arrays, none of which are
+        ended games"""
+        return self.network(self._modelInput(arrays))
+
+def exportTDAgent(agent, path: Path) -> NumpyTDScoringAgent:
+    """Writes the td model of agent (eg. a Ngo_TD_Agent or Pentago_TD_Agent) to
+    path as a .npz file, or with saveFlat if path has a .npy suffix, returning the
+    equivalent NumpyTDScoringAgent"""
+    numpyAgent = NumpyTDScoringAgent(
+        DenseNetwork.fromKerasModel(agent.td_model), agent.modelInputEncoding
+    )
+    if Path(path).suffix == ".npy":
+        numpyAgent.saveFlat(path)
+    else:
+        numpyAgent.save(path)
+    return numpyAgent
+
+def exportSavedTDModel(agentClass, modelPath: Path, path: Path | None = None) -> Path:
+    """Loads the saved td model at modelPath with agentClass and exports it, by
+    default to modelPath with a .npz suffix"""
+    if path is None:
+        path = Path(modelPath).with_suffix(".npz")
+    exportTDAgent(agentClass(Path(modelPath)), path)
+    return path
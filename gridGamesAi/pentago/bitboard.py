@@ -0,0 +1,247 @@
+"""Compact integer representation of a pentago position.
+
+Each player's pieces are stored in a 36 bit int, where bit ``6*row + col`` is set
+when the player has a piece on that gridspace. This is the same ordering as
+``grid.flatten()``, so the index lists in ``rotations`` can be used directly.
+
+The turn tracker is packed into a single int:
+    bit 0:      current player
+    bit 1:      current turn step
+    bits 2-3:   last player to move (2 when no move has been made yet)
+    bits 4-:    total moves
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from ..symmetry import N_TRANSFORMS, dihedralPermutations
+from ..zobrist import ZobristKeys
+from .rotations import rotations, rotationsKeys
+
+SIZE = 6
+N_CELLS = SIZE * SIZE
+FULL_BOARD = (1 << N_CELLS) - 1
+
+CELL_BITS: List[int] = [1 << i for i in range(N_CELLS)]
+_CELL_BIT_VALUES = np.array(CELL_BITS, dtype=np.int64)
+
+_QUADRANT_ORIGINS = {
+    'tl': (0, 0),
+    'tr': (0, 3),
+    'bl': (3, 0),
+    'br': (3, 3),
+}
+
+def _winLineCells() -> List[List[Tuple[int, int]]]:
+    """Cells of each line of 5, in the same order as ``_gridOccupancy``"""
+    lines = []
+    # horizontal lines
+    for start in (0, 1):
+        for col in range(SIZE):
+            lines.append([(row, col) for row in range(start, start+5)])
+    # vertical lines
+    for start in (0, 1):
+        for row in range(SIZE):
+            lines.append([(row, col) for col in range(start, start+5)])
+    # diagonals
+    lines.append([(i+1, i) for i in range(5)])
+    lines.append([(i, i+1) for i in range(5)])
+    lines.append([(i, i) for i in range(5)])
+    lines.append([(i+1, i+1) for i in range(5)])
+    # anti-diagonals
+    lines.append([(i+1, 5-i) for i in range(5)])
+    lines.append([(i, 4-i) for i in range(5)])
+    lines.append([(i, 5-i) for i in range(5)])
+    lines.append([(i+1, 4-i) for i in range(5)])
+    return lines
+
+def _cellsToMask(cells: List[Tuple[int, int]]) -> int:
+    mask = 0
+    for row, col in cells:
+        mask |= CELL_BITS[row*SIZE + col]
+    return mask
+
+WIN_MASKS: List[int] = [_cellsToMask(cells) for cells in _winLineCells()]
+
+# Shape (36, 32) matrix, where flattened_grid @ WIN_LINE_MATRIX gives the number of
+# pieces on each line of 5
+WIN_LINE_MATRIX = np.array(
+    [[mask >> i & 1 for mask in WIN_MASKS] for i in range(N_CELLS)], dtype=np.int32
+)
+
+def _rotationLookupTables() -> Dict[str, Tuple[int, List[Tuple[int, List[int]]]]]:
+    """For each rotation key, builds the mask of the rotated quadrant and, for each
+    of the quadrant's three rows, a table mapping the 3 bit row chunk to the bits it
+    occupies after rotation."""
+    tables = {}
+    for key in rotationsKeys:
+        perm = rotations[key]
+        # perm[new] = old, so invert to find where each old cell moves to
+        destination = np.empty(N_CELLS, dtype=int)
+        destination[perm] = np.arange(N_CELLS)
+
+        row_0, col_0 = _QUADRANT_ORIGINS[key.split('_')[0]]
+        quadrant_mask = 0
+        row_tables = []
+        for row in range(row_0, row_0 + 3):
+            shift = row*SIZE + col_0
+            chunk_table = []
+            for chunk in range(8):
+                rotated = 0
+                for b in range(3):
+                    if chunk >> b & 1:
+                        rotated |= CELL_BITS[destination[shift + b]]
+                chunk_table.append(rotated)
+            row_tables.append((shift, chunk_table))
+            quadrant_mask |= 0b111 << shift
+        tables[key] = (quadrant_mask, row_tables)
+    return tables
+
+_ROTATION_TABLES = _rotationLookupTables()
+
+def rotateBoard(board: int, rotationKey: str) -> int:
+    quadrant_mask, row_tables = _ROTATION_TABLES[rotationKey]
+    rotated = board & ~quadrant_mask
+    for shift, chunk_table in row_tables:
+        rotated |= chunk_table[board >> shift & 0b111]
+    return rotated
+
+def boardIsWin(board: int) -> bool:
+    for mask in WIN_MASKS:
+        if board & mask == mask:
+            return True
+    return False
+
+def freeCells(board_0: int, board_1: int) -> List[int]:
+    occupied = board_0 | board_1
+    return [i for i in range(N_CELLS) if not occupied & CELL_BITS[i]]
+
+def boardToGrid(board: int) -> np.ndarray:
+    return ((board & _CELL_BIT_VALUES) != 0).astype(float).reshape((SIZE, SIZE))
+
+def gridToBoard(grid: np.ndarray) -> int:
+    return int(np.sum(_CELL_BIT_VALUES[np.asarray(grid).flatten() != 0]))
+
+def cellIndex(index: Tuple[int, int]) -> int:
+    row, col = index
+    return int(row)*SIZE + int(col)
+
+def _symmetryLookupTables() -> List[List[List[int]]]:
+    """For each symmetry transform and each byte of a board, a table mapping the
+    byte to the bits it occupies after the transform"""
+    tables = []
+    for perm in dihedralPermutations(SIZE):
+        destination = np.empty(N_CELLS, dtype=int)
+        destination[perm] = np.arange(N_CELLS)
+        byte_tables = []
+        for shift in range(0, N_CELLS, 8):
+            byte_table = []
+            for byte in range(256):
+                transformed = 0
+                for b in range(min(8, N_CELLS - shift)):
+                    if byte >> b & 1:
+                        transformed |= CELL_BITS[destination[shift + b]]
+                byte_table.append(transformed)
+            byte_tables.append(byte_table)
+        tables.append(byte_tables)
+    return tables
+
+_SYMMETRY_TABLES = _symmetryLookupTables()
+
+def transformBoard(board: int, transform: int) -> int:
+    """Applies a symmetry transform, as numbered in ``symmetry.TRANSFORM_NAMES``"""
+    transformed = 0
+    for i, byte_table in enumerate(_SYMMETRY_TABLES[transform]):
+        transformed |= byte_table[board >> 8*i & 0xff]
+    return transformed
+
+def canonicalBoards(board_0: int, board_1: int) -> Tuple[int, int, int]:
+    """Boards transformed to the orientation minimising ``board_0 << 36 | board_1``
+    over the 8 symmetries, and the transform giving it"""
+    best = None
+    for transform in range(N_TRANSFORMS):
+        key = transformBoard(board_0, transform) << N_CELLS | transformBoard(board_1, transform)
+        if best is None or key < best[0]:
+            best = (key, transform)
+    key, transform = best
+    return key >> N_CELLS, key & FULL_BOARD, transform
+
+def canonicalTransformsOfGrids(grids: np.ndarray) -> np.ndarray:
+    """Batch version of the transform returned by canonicalBoards, for grids of 
+    shape (N, 2, 6, 6)"""
+    flat_grids = np.asarray(grids).reshape((-1, 2, N_CELLS)) != 0
+    # (N, 2, 8) boards for each player and transform
+    boards = flat_grids[:, :, dihedralPermutations(SIZE)] @ _CELL_BIT_VALUES
+    # smallest board_0, then smallest board_1, then first transform
+    min_board_0 = np.min(boards[:, 0], axis=1, keepdims=True)
+    board_1 = np.where(boards[:, 0] == min_board_0, boards[:, 1], np.iinfo(np.int64).max)
+    return np.argmin(board_1, axis=1)
+
+_NO_PLAYER = 2
+
+def packTurn(
+    current_player: int = 0,
+    turn_step: int = 0,
+    total_moves: int = 0,
+    last_player_to_move: int | None = None
+) -> int:
+    if last_player_to_move is None:
+        last_player_to_move = _NO_PLAYER
+    return (
+        current_player
+        | turn_step << 1
+        | last_player_to_move << 2
+        | total_moves << 4
+    )
+
+def turnCurrentPlayer(turn: int) -> int:
+    return turn & 1
+
+def turnStep(turn: int) -> int:
+    return turn >> 1 & 1
+
+def turnLastPlayer(turn: int) -> int | None:
+    last_player = turn >> 2 & 0b11
+    if last_player == _NO_PLAYER:
+        return None
+    return last_player
+
+def turnTotalMoves(turn: int) -> int:
+    return turn >> 4
+
+def incrementTurn(turn: int) -> int:
+    """Packed equivalent of ``TurnTracker(2, 2).getIncremented()``"""
+    current_player = turn & 1
+    if turn >> 1 & 1:
+        next_player, next_step = 1 - current_player, 0
+    else:
+        next_player, next_step = current_player, 1
+    return packTurn(next_player, next_step, (turn >> 4) + 1, current_player)
+
+def popCount(board: int) -> int:
+    return bin(board).count("1")
+
+ZOBRIST_KEYS = ZobristKeys(N_CELLS, 2, 2)
+
+def zobristBoardChange(player: int, changed: int) -> int:
+    """XOR of player's piece keys for each set bit of changed"""
+    keys = ZOBRIST_KEYS.pieceKeys[player]
+    h = 0
+    while changed:
+        lowest_bit = changed & -changed
+        h ^= keys[lowest_bit.bit_length() - 1]
+        changed ^= lowest_bit
+    return h
+
+def zobristTurnKey(turn: int) -> int:
+    return ZOBRIST_KEYS.turnKey(turn & 1, turn >> 1 & 1)
+
+def zobristHash(board_0: int, board_1: int, turn: int) -> int:
+    return (
+        zobristBoardChange(0, board_0) 
+        ^ zobristBoardChange(1, board_1) 
+        ^ zobristTurnKey(turn)
+    )
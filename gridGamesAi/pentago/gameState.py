@@ -1,44 +1,42 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from functools import cached_property, cache
-from typing import List, Tuple
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Tuple
 
 import numpy as np
-import tensorflow as tf
-import hashlib
 
 from ..turnTracker import TurnTracker
 from ..twoPlayerGridState import TwoPlayerGridState
-from .rotations import rotations, rotationsKeys
+from .rotations import rotationsKeys
+from . import bitboard
 from ..common import AbstractGridGameState
 from ..agents import RandomAgent
 
+if TYPE_CHECKING:
+    import tensorflow as tf
+
 randAgent = RandomAgent()
 
-def _gridOccupancy(grid: np.ndarray) -> List[int]:
+def _gridOccupancy(grid: np.ndarray) -> np.ndarray:
     """Evaluates the number of pieces a player has on each row, column or diagonal
     of 5. Used in evaluating win states or in scoring a position using a naive algorithm.
 
     param: grid
         shape (6,6) ndarray representing pieces placed by the player
     """
-    flipped_grid: np.ndarray = np.fliplr(grid)
-    occupacy = np.concatenate((
-        #horizontal lines occupancy
-        np.sum(grid[0:5], axis=0), np.sum(grid[1:], axis=0),
-        #vertical lines occupancy
-        np.sum(grid[:, 0:5], axis=1), np.sum(grid[:, 1:], axis=1),
-        [
-            #diagonals
-            np.sum(grid.diagonal(-1)), np.sum(grid.diagonal(1)),
-            np.sum(grid.diagonal()[0:5]), np.sum(grid.diagonal()[1:]),
-            #anti-diagonals
-            np.sum(flipped_grid.diagonal(-1)), np.sum(flipped_grid.diagonal(1)),
-            np.sum(flipped_grid.diagonal()[0:5]), np.sum(flipped_grid.diagonal()[1:]),
-        ]
-    ))
-    return occupacy
+    return _gridsOccupancy(np.asarray(grid)[None])[0]
+
+def _gridsOccupancy(grids: np.ndarray) -> np.ndarray:
+    """Batch version of _gridOccupancy, evaluated with a single matmul against the
+    win line masks.
+
+    param: grids
+        shape (..., 6, 6) ndarray, eg. (N, 2, 6, 6) for the grids of N positions
+    returns: shape (..., 32) ndarray
+    """
+    grids = np.asarray(grids)
+    return grids.reshape(grids.shape[:-2] + (36,)) @ bitboard.WIN_LINE_MATRIX
 
 def _gridInWinState(grid: np.ndarray) -> bool:
     """Does the grid contain a winning line of 5 pieces?
@@ -48,58 +46,149 @@ def _gridInWinState(grid: np.ndarray) -> bool:
     """
     return np.max(_gridOccupancy(grid)) == 5
 
-def _rotatePentagoGrid(gridState: TwoPlayerGridState, rotationKey: str):
-    new_grid_0 = gridState.grid_0.flatten()[rotations[rotationKey]].reshape((6,6))
-    new_grid_1 = gridState.grid_1.flatten()[rotations[rotationKey]].reshape((6,6))
-    return TwoPlayerGridState(new_grid_0, new_grid_1)
+def _gridsInWinState(grids: np.ndarray) -> np.ndarray:
+    """Batch version of _gridInWinState, for grids of shape (..., 6, 6)"""
+    return np.max(_gridsOccupancy(grids), axis=-1) == 5
+
+def _evaluateGrids(grids: np.ndarray, last_player_to_move: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Evaluates N positions, all reached by a move of last_player_to_move, from a 
+    single occupancy evaluation.
+
+    param: grids
+        shape (N, 2, 6, 6) ndarray of both players' grids for each position
+    returns: isWin (N,), winPlayer (N,) with -1 where there is no winner and the
+        naive unsquished score (N,)
+    """
+    occupancy = _gridsOccupancy(grids)
+    has_winning_line = np.max(occupancy, axis=-1) == 5
+    win_player = np.full(len(occupancy), -1)
+    win_player[has_winning_line[:, 1]] = 1
+    win_player[has_winning_line[:, 0]] = 0
+    # If a player rotates a segment so both players achieve 5 in a row simultaneously,
+    # the player who just moved *losses*
+    win_player[has_winning_line[:, 0] & has_winning_line[:, 1]] = (last_player_to_move + 1) % 2
+    naive_score = np.sum(occupancy[:, 0]**2, axis=-1) - np.sum(occupancy[:, 1]**2, axis=-1)
+    return win_player != -1, win_player, naive_score
+
+def _evaluateArrays(arrays: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluates whether N positions have ended, without building game states.
+
+    param: arrays
+        shape (N, 74) ndarray of positions in the asNumpy layout
+    returns: isEnd (N,) and the end score (N,), which is 1 if player 0 won, -1 if
+        player 1 won and 0 otherwise
+    """
+    arrays = np.asarray(arrays)
+    current_player, turn_step = arrays[:, 0], arrays[:, 1]
+    grids = arrays[:, 2:].reshape((-1, 2, 6, 6))
+    has_winning_line = _gridsInWinState(grids)
+    win_player = np.full(len(arrays), -1)
+    win_player[has_winning_line[:, 1]] = 1
+    win_player[has_winning_line[:, 0]] = 0
+    # The player who just moved losses a simultaneous win
+    last_player_to_move = np.where(turn_step == 1, current_player, 1 - current_player)
+    both_win = has_winning_line[:, 0] & has_winning_line[:, 1]
+    win_player[both_win] = 1 - last_player_to_move[both_win]
+
+    is_win = win_player != -1
+    is_draw = (turn_step == 0) & (np.sum(grids, axis=(1, 2, 3)) == 36) & ~is_win
+    end_score = np.select([win_player == 0, win_player == 1], [1.0, -1.0], 0.0)
+    return is_win | is_draw, end_score
 
 @dataclass
 class PentagoGameState(AbstractGridGameState):
-    turnTracker: TurnTracker = TurnTracker(2,2)
-    gridState: TwoPlayerGridState = TwoPlayerGridState(
-        np.zeros((6,6)), np.zeros((6,6))
-    )
+    """Pentago position stored as a pair of bitboards and a packed turn tracker,
+    see ``bitboard`` for the layout. Grid and turn tracker objects are only built
+    when requested."""
+
+    board_0: int = 0
+    board_1: int = 0
+    turn: int = bitboard.packTurn()
+    zobristHash: int | None = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.zobristHash is None:
+            self.zobristHash = bitboard.zobristHash(self.board_0, self.board_1, self.turn)
 
     @property
-    def current_player(self) -> int: return self.turnTracker.current_player
+    def current_player(self) -> int: return bitboard.turnCurrentPlayer(self.turn)
     
     @property
-    def turn_step(self) -> int: return self.turnTracker.current_turn_step
+    def turn_step(self) -> int: return bitboard.turnStep(self.turn)
     
     @property
-    def last_player_to_move(self) -> int: return self.turnTracker.last_player_to_move
+    def last_player_to_move(self) -> int: return bitboard.turnLastPlayer(self.turn)
+
+    @cached_property
+    def turnTracker(self) -> TurnTracker:
+        return TurnTracker(
+            2, 2,
+            self.current_player,
+            self.turn_step,
+            bitboard.turnTotalMoves(self.turn),
+            self.last_player_to_move
+        )
+
+    @cached_property
+    def grid_0(self) -> np.array: return bitboard.boardToGrid(self.board_0)
+
+    @cached_property
+    def grid_1(self) -> np.array: return bitboard.boardToGrid(self.board_1)
 
     @property
-    def grid_0(self) -> np.array: return self.gridState.grid_0
+    def grids(self) -> np.ndarray:
+        """Both players' grids stacked into shape (2,6,6)"""
+        return np.stack([self.grid_0, self.grid_1])
 
     @property
-    def grid_1(self) -> np.array: return self.gridState.grid_1
+    def gridState(self) -> TwoPlayerGridState:
+        return TwoPlayerGridState(self.grid_0, self.grid_1)
+
+    def _nextTurnAndZobristHash(self) -> Tuple[int, int]:
+        next_turn = bitboard.incrementTurn(self.turn)
+        zobrist_hash = (
+            self.zobristHash 
+            ^ bitboard.zobristTurnKey(self.turn) 
+            ^ bitboard.zobristTurnKey(next_turn)
+        )
+        return next_turn, zobrist_hash
+
+    def _placeBit(self, bit: int) -> PentagoGameState:
+        next_turn, zobrist_hash = self._nextTurnAndZobristHash()
+        zobrist_hash ^= bitboard.zobristBoardChange(self.current_player, bit)
+        if self.current_player == 0:
+            return PentagoGameState(
+                self.board_0 | bit, self.board_1, next_turn, zobrist_hash
+            )
+        return PentagoGameState(
+            self.board_0, self.board_1 | bit, next_turn, zobrist_hash
+        )
 
-    def _getNextGridStates(self):
-        if self.turnTracker.current_turn_step == 0:
-            return self.gridState.nextValidPlacements(self.current_player)
-        if self.turnTracker.current_turn_step == 1:
-            return self._getNextRotateGridStates()
+    def _getNextPlacements(self) -> List[PentagoGameState]:
+        return [
+            self._placeBit(bitboard.CELL_BITS[i])
+            for i in bitboard.freeCells(self.board_0, self.board_1)
+        ]
 
-    def _getNextRotateGridStates(self):
-        nextGridStates = []
-        for key in rotationsKeys:
-            nextGrid = _rotatePentagoGrid(self.gridState, key)
-            nextGridStates.append(nextGrid)
-        return nextGridStates
+    def _getNextRotations(self) -> List[PentagoGameState]:
+        return [self.rotate(key) for key in rotationsKeys]
 
     def rotate(self, rotate_key: str) -> PentagoGameState:
-        return PentagoGameState(
-            self.turnTracker.getIncremented(),
-            _rotatePentagoGrid(self.gridState, rotate_key)
+        board_0 = bitboard.rotateBoard(self.board_0, rotate_key)
+        board_1 = bitboard.rotateBoard(self.board_1, rotate_key)
+        next_turn, zobrist_hash = self._nextTurnAndZobristHash()
+        zobrist_hash ^= (
+            bitboard.zobristBoardChange(0, board_0 ^ self.board_0)
+            ^ bitboard.zobristBoardChange(1, board_1 ^ self.board_1)
         )
+        return PentagoGameState(board_0, board_1, next_turn, zobrist_hash)
 
     def place(self, index: Tuple[int, int]) -> PentagoGameState:
-        self.gridState.assert_unoccupied(index)
-        return PentagoGameState(
-            self.turnTracker.getIncremented(),
-            self.gridState.placeOn(self.current_player, index)
-        )
+        bit = bitboard.CELL_BITS[bitboard.cellIndex(index)]
+        if (self.board_0 | self.board_1) & bit:
+            raise ValueError(f"Position is already occupied: {index}")
+        return self._placeBit(bit)
 
     def skipRotation(self) -> PentagoGameState:
         if self.turn_step != 1:
@@ -107,21 +196,19 @@ class PentagoGameState(AbstractGridGameState):
         return self.skipMove()
 
     def skipMove(self) -> PentagoGameState:
-        return PentagoGameState(
-            self.turnTracker.getIncremented(),
-            self.gridState
-        )
+        next_turn, zobrist_hash = self._nextTurnAndZobristHash()
+        return PentagoGameState(self.board_0, self.board_1, next_turn, zobrist_hash)
 
     @cached_property
     def next_moves(self) -> List[PentagoGameState]:
-        next_grid_states = self._getNextGridStates()
-        next_turn_tracker = self.turnTracker.getIncremented()
-        return [PentagoGameState(next_turn_tracker, state) for state in next_grid_states]
+        if self.turn_step == 0:
+            return self._getNextPlacements()
+        return self._getNextRotations()
 
     @cached_property
     def _winInfo(self) -> Tuple[bool, int | None]:
-        win_player_0 = _gridInWinState(self.gridState.grid_0)
-        win_player_1 = _gridInWinState(self.gridState.grid_1)
+        win_player_0 = bitboard.boardIsWin(self.board_0)
+        win_player_1 = bitboard.boardIsWin(self.board_1)
 
         if win_player_0 and win_player_1:
             # If a player rotates a segment so both players achieve 5 in a row simultaneously,
@@ -145,7 +232,7 @@ class PentagoGameState(AbstractGridGameState):
     def isDraw(self) -> bool:
         return (
             self.turn_step == 0
-            and np.sum(self.gridState.grid_0) + np.sum(self.gridState.grid_1) >= 36 
+            and self.board_0 | self.board_1 == bitboard.FULL_BOARD
             and not self.isWin
         )
 
@@ -156,30 +243,61 @@ class PentagoGameState(AbstractGridGameState):
     def asNumpy(self) -> np.ndarray:
         return np.concatenate([
             np.array([self.current_player, self.turn_step]),
-            self.gridState.grid_0.flatten(),
-            self.gridState.grid_1.flatten(),
+            self.grid_0.flatten(),
+            self.grid_1.flatten(),
         ])
 
     def asTensor(self) -> tf.Tensor:
+        import tensorflow as tf
         return tf.constant(
             self.asNumpy()
         )
 
     def __hash__(self) -> int:
-        arr = self.asNumpy().view()
-        hash = hashlib.sha1(arr).hexdigest()
-        return int(hash,16)
+        return hash((self.board_0, self.board_1, self.turn & 0b11))
 
     def __eq__(self, other: object) -> bool:
-        return np.all(self.asNumpy() == other.asNumpy())
+        return (
+            self.board_0 == other.board_0
+            and self.board_1 == other.board_1
+            and self.turn & 0b11 == other.turn & 0b11
+        )
 
-    def flipCenterOfMassToUpperLeftBelowDiagonal(self) -> PentagoGameState:
+    @cached_property
+    def canonicalKey(self) -> Tuple[int, int]:
+        """Key shared by all positions equal to this one up to a symmetry of the 
+        board, and the symmetry transform which maps this position to canonical()"""
+        board_0, board_1, transform = bitboard.canonicalBoards(self.board_0, self.board_1)
+        key = (board_0 << bitboard.N_CELLS | board_1) << 2 | self.turn & 0b11
+        return key, transform
+
+    def canonical(self) -> PentagoGameState:
+        """The symmetric position in canonical orientation"""
+        transform = self.canonicalKey[1]
+        if transform == 0:
+            return self
         return PentagoGameState(
-            self.turnTracker,
-            self.gridState.flipCenterOfMassToUpperLeftBelowDiagonal()
+            bitboard.transformBoard(self.board_0, transform),
+            bitboard.transformBoard(self.board_1, transform),
+            self.turn
         )
 
-    
+    @cached_property
+    def canonicalZobristHash(self) -> int:
+        return self.canonical().zobristHash
+
+    def flipCenterOfMassToUpperLeftBelowDiagonal(self) -> PentagoGameState:
+        return PentagoGameState.fromGridState(
+            self.gridState.flipCenterOfMassToUpperLeftBelowDiagonal(), self.turn
+        )
+
+    @classmethod
+    def fromGridState(self, gridState: TwoPlayerGridState, turn: int) -> PentagoGameState:
+        return PentagoGameState(
+            bitboard.gridToBoard(gridState.grid_0),
+            bitboard.gridToBoard(gridState.grid_1),
+            turn
+        )
 
     @classmethod
     def fromTensor(self, tensor: tf.Tensor) -> PentagoGameState:
@@ -190,9 +308,11 @@ class PentagoGameState(AbstractGridGameState):
     def fromNumpy(self, array: np.ndarray) -> PentagoGameState:
         current_player = int(array[0])
         turn_step = int(array[1])
-        grid_0 = array[2:38].reshape((6,6))
-        grid_1 = array[38:].reshape((6,6))
-        total_moves = (np.sum(grid_0) + np.sum(grid_1)) * 2 - turn_step
+        board_0 = bitboard.gridToBoard(array[2:38])
+        board_1 = bitboard.gridToBoard(array[38:])
+        total_moves = (
+            bitboard.popCount(board_0) + bitboard.popCount(board_1)
+        ) * 2 - turn_step
         if turn_step == 0:
             last_player_to_move = (current_player + 1) % 2
         else:
@@ -200,8 +320,9 @@ class PentagoGameState(AbstractGridGameState):
         if total_moves == 0:
             last_player_to_move = None
         return PentagoGameState(
-            TurnTracker(2,2,current_player,turn_step,total_moves,last_player_to_move),
-            TwoPlayerGridState(grid_0, grid_1)
+            board_0,
+            board_1,
+            bitboard.packTurn(current_player, turn_step, total_moves, last_player_to_move)
         )
 
     @classmethod
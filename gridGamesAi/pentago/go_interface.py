@@ -1,4 +1,5 @@
 import ctypes
+from functools import cache
 from typing import List
 import numpy as np
 from .gameState import PentagoGameState
@@ -7,22 +8,47 @@ from pathlib import Path
 c_int = ctypes.c_int
 c_float = ctypes.c_float
 c_int_p = ctypes.POINTER(c_int)
+c_float_p = ctypes.POINTER(c_float)
+
+# Batched score callback: (grids, n, scores) where grids is a contiguous buffer of
+# n arrays of 74 ints and n scores are written to scores
+ScoreBatch = ctypes.CFUNCTYPE(None, c_int_p, c_int, c_float_p)
 
 lib_path = './go_gridgamesAi/_goPentago.so'
-print(f"Load library: {Path(lib_path).absolute()}")
 
-lib = ctypes.cdll.LoadLibrary(lib_path)
-lib.C_Minimax_Move.argtypes = [c_int_p, c_int, c_int]
-lib.C_Minimax_Move.restype = c_int_p
-lib.Go_Self_Play.argtypes = [c_int_p, c_int, c_int]
-lib.Go_Self_Play.restype = c_int_p
-lib.free_arr_int.argtypes = [c_int_p]
+@cache
+def loadLibrary() -> ctypes.CDLL:
+    """Loads the go shared library, on the first call which needs it"""
+    print(f"Load library: {Path(lib_path).absolute()}")
+    lib = ctypes.cdll.LoadLibrary(lib_path)
+    lib.C_Minimax_Move.argtypes = [c_int_p, c_int, c_int]
+    lib.C_Minimax_Move.restype = c_int_p
+    lib.Go_Self_Play.argtypes = [c_int_p, c_int, c_int]
+    lib.Go_Self_Play.restype = c_int_p
+    lib.C_Minimax_Move_Batched.argtypes = [c_int_p, c_int, c_int, ScoreBatch]
+    lib.C_Minimax_Move_Batched.restype = c_int_p
+    lib.Go_Self_Play_Batched.argtypes = [c_int_p, c_int, c_int, ScoreBatch]
+    lib.Go_Self_Play_Batched.restype = c_int_p
+    lib.free_arr_int.argtypes = [c_int_p]
+    return lib
+
+@cache
+def libraryAvailable() -> bool:
+    """Whether the go library loads, with all the functions used. A library
+    built before the batched functions were added raises AttributeError."""
+    try:
+        loadLibrary()
+        return True
+    except (OSError, AttributeError) as e:
+        print(e)
+        return False
 
 exception_raised_inside_ctypes_callback = False
 keyboard_interrupt_inside_ctypes_callback = False
 
 def goMinimaxMove(gameState: PentagoGameState, depth: int, score_gameState: callable):
     score, c_arr, c_arr_size = _parseInputs(gameState, score_gameState)
+    lib = loadLibrary()
     out_c_arr = lib.C_Minimax_Move(c_arr, c_arr_size, c_int(depth), score)
     decoded = _decode_c_arr_74_int(out_c_arr)
     lib.free_arr_int(out_c_arr)
@@ -45,10 +71,55 @@ def _parseInputs(gameState: PentagoGameState, score_gameState: callable):
     c_arr, c_arr_size = _ndarrInt_to_CintArray(gameState.asNumpy())
     return score, c_arr, c_arr_size
 
+def goMinimaxMoveBatched(
+    gameState: PentagoGameState, depth: int, score_arrays: callable
+) -> PentagoGameState:
+    """Version of goMinimaxMove where all the leaves of the search are scored with
+    one call of score_arrays, which maps an (N, 74) int32 array of positions in 
+    the asNumpy layout to N scores"""
+    score, c_arr, c_arr_size = _parseBatchedInputs(gameState, score_arrays)
+    lib = loadLibrary()
+    out_c_arr = lib.C_Minimax_Move_Batched(c_arr, c_arr_size, c_int(depth), score)
+    _raise_if_reported_exception()
+    decoded = _decode_c_arr_74_int(out_c_arr)
+    lib.free_arr_int(out_c_arr)
+    return PentagoGameState.fromNumpy(decoded)
+
+def _parseBatchedInputs(gameState: PentagoGameState, score_arrays: callable):
+    @ScoreBatch
+    def score(c_arr: c_int_p, n: int, c_out: c_float_p):
+        try:
+            # Views of the native buffers, no copies are made
+            arrays = np.ctypeslib.as_array(c_arr, shape=(n, 74))
+            np.ctypeslib.as_array(c_out, shape=(n,))[:] = score_arrays(arrays)
+        except Exception as e:
+            global exception_raised_inside_ctypes_callback
+            exception_raised_inside_ctypes_callback = True
+            raise e
+        except KeyboardInterrupt as e:
+            global keyboard_interrupt_inside_ctypes_callback
+            keyboard_interrupt_inside_ctypes_callback = True
+    c_arr, c_arr_size = _ndarrInt_to_CintArray(gameState.asNumpy())
+    return score, c_arr, c_arr_size
+
+def goSelfPlayBatched(
+    gameState: PentagoGameState, depth: int, score_arrays: callable
+) -> List[PentagoGameState]:
+    """Version of goSelfPlay where the leaves of each move's search are scored with
+    one call of score_arrays, see goMinimaxMoveBatched"""
+    score, c_arr, c_arr_size = _parseBatchedInputs(gameState, score_arrays)
+    lib = loadLibrary()
+    out_c_arr = lib.Go_Self_Play_Batched(c_arr, c_arr_size, c_int(depth), score)
+    _raise_if_reported_exception()
+    decoded = _decode_c_arr_arr_74_int(out_c_arr)
+    lib.free_arr_int(out_c_arr)
+    return [PentagoGameState.fromNumpy(d) for d in decoded]
+
 def goSelfPlay(
     gameState: PentagoGameState, depth: int, score_gameState: callable
 ) -> List[PentagoGameState]:
     score, c_arr, c_arr_size = _parseInputs(gameState, score_gameState)
+    lib = loadLibrary()
     out_c_arr = lib.Go_Self_Play(c_arr, c_arr_size, c_int(depth), score)
     _raise_if_reported_exception()
     decoded = _decode_c_arr_arr_74_int(out_c_arr)
@@ -0,0 +1,23 @@
+"""Encoding of pentago positions as td model input, without tensorflow"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from ..symmetry import dihedralPermutations
+from ..twoPlayerGridState import flipCenterOfMassToUpperLeftBelowDiagonalBatch
+from . import bitboard
+
+def modelInputArrays(arrays: np.ndarray) -> np.ndarray:
+    """Model input of positions in the (N, 74) asNumpy layout: the canonical
+    orientation of each position, flipped to put its centre of mass in the upper 
+    left, below the diagonal. Batch version of 
+    gameState.canonical().flipCenterOfMassToUpperLeftBelowDiagonal().asNumpy()"""
+    flat_grids = arrays[:, 2:].reshape((-1, 2, 36))
+    transforms = bitboard.canonicalTransformsOfGrids(flat_grids)
+    permutations = dihedralPermutations(6)[transforms]
+    canonical_grids = np.take_along_axis(flat_grids, permutations[:, None, :], axis=2)
+    flipped = flipCenterOfMassToUpperLeftBelowDiagonalBatch(
+        canonical_grids.reshape((-1, 2, 6, 6)).astype(float)
+    )
+    return np.concatenate([arrays[:, :2], flipped.reshape((-1, 72))], axis=1)
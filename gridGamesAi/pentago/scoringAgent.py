@@ -1,24 +1,69 @@
-from functools import cache
+from typing import Callable, List
 import numpy as np
-from scipy.special import expit
 
-from ..common import handle_wins_draws, handle_wins_draws_method
+from ..common import handle_wins_draws, handle_wins_draws_method, baseScoreStrategyMany
 from ..scoringAgents import CachingScoringAgent
-from .gameState import PentagoGameState, _gridOccupancy
+from .gameState import PentagoGameState, _gridsOccupancy, _evaluateArrays
+
+def baseScoreArraysStrategy(arrays: np.ndarray, notEndScoreArraysStrategy: Callable) -> np.ndarray:
+    """Version of baseScoreStrategyMany for positions in the (N, 74) asNumpy layout.
+
+    notEndScoreArraysStrategy: scores the arrays of the positions which haven't 
+    ended in a single call
+    """
+    is_end, scores = _evaluateArrays(arrays)
+    if not np.all(is_end):
+        scores[~is_end] = notEndScoreArraysStrategy(np.asarray(arrays)[~is_end])
+    return scores
+
+def _squish(unsquished, expitScale: float = 0.05):
+    """Squishes scores to be between -1 and 1 using a sigmoid function, 
+    2*(expit(x) - 0.5) == tanh(x/2)"""
+    return np.tanh(unsquished * expitScale / 2)
 
 class PentagoNaiveScoringAgent(CachingScoringAgent):
 
+    def __init__(self):
+        self._unsquishedCache: dict[PentagoGameState, int] = {}
+
     @handle_wins_draws_method
     def score(self, gameState: PentagoGameState) -> float:
-        expitScale = 0.05
-        # squish the score to be between -1 and 1 using a sigmoid function
-        return 2*(expit(self.unsquished_score(gameState)*expitScale) - 0.5)
+        return float(_squish(self.unsquished_score(gameState)))
+
+    def score_many(self, gameStates: List[PentagoGameState]) -> List[float]:
+        return baseScoreStrategyMany(gameStates, self._squished_scores)
+
+    def score_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        """Scores positions in the (N, 74) asNumpy layout, without building game states"""
+        return baseScoreArraysStrategy(arrays, self._squished_scores_arrays)
+
+    def _squished_scores_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        occupancy = _gridsOccupancy(arrays[:, 2:].reshape((-1, 2, 6, 6)))
+        unsquished = np.sum(occupancy[:, 0]**2, axis=-1) - np.sum(occupancy[:, 1]**2, axis=-1)
+        return _squish(unsquished)
+
+    def _squished_scores(self, gameStates: List[PentagoGameState]) -> np.ndarray:
+        uncached = {}
+        for gameState in gameStates:
+            if gameState not in self._unsquishedCache:
+                uncached.setdefault(gameState, gameState)
+        if uncached:
+            self._unsquishedCache.update(zip(uncached, self.unsquished_scores(list(uncached))))
+        return _squish(np.array([self._unsquishedCache[gameState] for gameState in gameStates]))
 
-    @cache
     def unsquished_score(self, gameState: PentagoGameState) -> int:
-        grid_0_occupancy = _gridOccupancy(gameState.grid_0)
-        grid_1_occupancy = _gridOccupancy(gameState.grid_1)
-        return np.sum(grid_0_occupancy**2) - np.sum(grid_1_occupancy**2)
+        if gameState in self._unsquishedCache:
+            return self._unsquishedCache[gameState]
+        occupancy = _gridsOccupancy(gameState.grids)
+        score = np.sum(occupancy[0]**2) - np.sum(occupancy[1]**2)
+        self._unsquishedCache[gameState] = score
+        return score
+
+    def unsquished_scores(self, gameStates: List[PentagoGameState]) -> np.ndarray:
+        """Batch version of unsquished_score, evaluated with one occupancy matmul
+        across all the game states. Does not use the cache."""
+        occupancy = _gridsOccupancy(np.stack([gs.grids for gs in gameStates]))
+        return np.sum(occupancy[:, 0]**2, axis=-1) - np.sum(occupancy[:, 1]**2, axis=-1)
 
     def resetCache(self):
-        self.unsquished_score.cache_clear()
\ No newline at end of file
+        self._unsquishedCache.clear()
\ No newline at end of file
@@ -1,46 +1,52 @@
-from functools import cache
 import json
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import tensorflow as tf
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from gridGamesAi.agents import AbstractAgent
-from gridGamesAi.common import AbstractGameState, AbstractGridGameState, baseScoreStrategy
+from gridGamesAi.common import AbstractGameState, AbstractGridGameState, baseScoreStrategy, baseScoreStrategyMany
 from gridGamesAi.game import Game
+from gridGamesAi.gameLog import GameLogWriter
 from gridGamesAi.minimax import MinimaxAgent, PruningAgent
+from gridGamesAi.pentago import go_interface
 from gridGamesAi.pentago.gameState import PentagoGameState
-from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
+from gridGamesAi.pentago.modelInput import modelInputArrays
+from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent, baseScoreArraysStrategy
 from gridGamesAi.scoringAgents import AbstractScoringAgent, CachingScoringAgent
-
-CAN_GO_SELF_PLAY = False
-
-try:
-    from gridGamesAi.pentago.go_interface import goSelfPlay
-    CAN_GO_SELF_PLAY = True
-except Exception as e:
-    print(e)
+from gridGamesAi.tdLearning import TDLearner, compiledPredict, compiledTDGradients, eagerPredict
 
 class Pentago_TD_Agent(CachingScoringAgent):
+    # Name of the model input encoding in numpyInference.INPUT_ENCODINGS
+    modelInputEncoding = "pentago"
+
     def __init__(
         self,
         loadPath = None,
         createNewModel = False,
         minixmaxAgent = MinimaxAgent(None, max_depth=0),
+        graphMode = True,
     ) -> None:
         """ Initialize the agent. If loadPath is provided, td model 
         will be loaded from that path. If createNewModel is True and loadPath
-        is None, a new model will be created. """
+        is None, a new model will be created. If graphMode is True, scoring and TD
+        updates run as tf.functions, otherwise the model is called eagerly. """
         
         self.td_model = None
         self.isCompiled = False
+        self.graphMode = graphMode
+        self._predict = None
+        self._td_gradients = None
+        # Keyed by canonicalKey, as symmetric positions share a score
+        self._scoreCache: dict[int, float] = {}
 
         self.minimaxAgent: MinimaxAgent = minixmaxAgent
         self.minimaxAgent.scoringAgent = self
 
         self.training_calls = 0
         self.trainingCall_totalMoves: List[Tuple[int, int]] = []
+        self.td_learner: TDLearner | None = None
+        # Log the self play games trained on are appended to, if any
+        self.gameLog: GameLogWriter | None = None
 
         if loadPath is not None:
             self.load(loadPath)
@@ -113,42 +119,100 @@ class Pentago_TD_Agent(CachingScoringAgent):
         self.td_model.compile(
             loss=tf.keras.losses.MeanSquaredError(), 
             metrics=[],
-            run_eagerly=True
+            run_eagerly=not self.graphMode
         )
+        if self.graphMode:
+            self._predict = compiledPredict(self.td_model)
+            self._td_gradients = compiledTDGradients(self.td_model)
+        else:
+            self._predict = eagerPredict(self.td_model)
+            self._td_gradients = None
         self.isCompiled = True
 
+    def create_td_learner(self, **kwargs):
+        """Trains from now on with a replay buffer and minibatch TD(lambda)
+        learner, instead of TD_model.train_td_from_sequential_states. kwargs are
+        passed to TDLearner."""
+        self.requireComplied()
+        kwargs.setdefault("td_lambda", self.td_model.td_factor)
+        self.td_learner = TDLearner(self.td_model, **kwargs)
+
     def requireComplied(self):
         if self.td_model is None:
             raise Exception("Must create or load a TD model")
         if not self.isCompiled:
             raise Exception("Must compile the TD model")
 
-    @cache
     def score(self, gameState: PentagoGameState) -> float:
-        return baseScoreStrategy(gameState, self._score)
+        key = gameState.canonicalKey[0]
+        try:
+            return self._scoreCache[key]
+        except KeyError:
+            score = baseScoreStrategy(gameState, self._score)
+            self._scoreCache[key] = score
+            return score
+
+    def score_many(self, gameStates: List[PentagoGameState]) -> List[float]:
+        keys = [gameState.canonicalKey[0] for gameState in gameStates]
+        uncached = {}
+        for key, gameState in zip(keys, gameStates):
+            if key not in self._scoreCache:
+                uncached.setdefault(key, gameState)
+        if uncached:
+            scores = baseScoreStrategyMany(list(uncached.values()), self._score_many)
+            self._scoreCache.update(zip(uncached.keys(), scores))
+        return [self._scoreCache[key] for key in keys]
 
     def _score(self, gameState: PentagoGameState):
-        return self.td_model.__call__(
-            gameState.flipCenterOfMassToUpperLeftBelowDiagonal().asTensor()[None, :]
-        ).numpy()[0,0]
+        return self._score_many([gameState])[0]
+
+    def _score_many(self, gameStates: List[PentagoGameState]) -> np.ndarray:
+        """Scores the game states with a single forward pass of the td model"""
+        return self._predict(np.stack([
+            self._modelInputState(gameState).asNumpy() for gameState in gameStates
+        ]))
+
+    def _modelInputState(self, gameState: PentagoGameState) -> PentagoGameState:
+        """Orientation of gameState seen by the td model. Flipping the canonical
+        position makes the model input the same for all symmetric positions, 
+        including when the centre of mass is ambiguous."""
+        return gameState.canonical().flipCenterOfMassToUpperLeftBelowDiagonal()
+
+    def score_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        """Scores positions in the (N, 74) asNumpy layout with a single forward 
+        pass of the td model, without building game states or using the cache"""
+        return baseScoreArraysStrategy(arrays, self._score_arrays)
+
+    def _score_arrays(self, arrays: np.ndarray) -> np.ndarray:
+        return self._predict(self._modelInputArrays(arrays))
+
+    def _modelInputArrays(self, arrays: np.ndarray) -> np.ndarray:
+        """Batch version of _modelInputState(...).asNumpy()"""
+        return modelInputArrays(arrays)
 
     def resetCache(self):
-        self.score.cache_clear()
+        self._scoreCache.clear()
 
     def train_td_from_game(self, rootGameState: PentagoGameState, usePythonNative = False):
-        if usePythonNative or not CAN_GO_SELF_PLAY:
+        if usePythonNative or not go_interface.libraryAvailable():
             movesSequence = self._generate_self_play_moves_sequence(rootGameState)
         else:
-            movesSequence = goSelfPlay(rootGameState, 0, self.score)
+            movesSequence = go_interface.goSelfPlayBatched(rootGameState, 0, self.score_arrays)
             print(f"Game {self.training_calls} ", end="\r")
 
-        gameStateTensors = [
-            gameState.flipCenterOfMassToUpperLeftBelowDiagonal().asTensor() 
-            for gameState in movesSequence
-        ]
-        scores = np.array([self.score(gameState) for gameState in movesSequence])
-
-        self.td_model.train_td_from_sequential_states(gameStateTensors, scores)
+        scores = np.array(self.score_many(movesSequence))
+        if self.td_learner is not None:
+            arrays = np.stack([gameState.asNumpy() for gameState in movesSequence])
+            self.td_learner.add_game(self._modelInputArrays(arrays), scores)
+        else:
+            gameStateTensors = [
+                self._modelInputState(gameState).asTensor() for gameState in movesSequence
+            ]
+            self.td_model.train_td_from_sequential_states(
+                gameStateTensors, scores, self._td_gradients
+            )
+        if self.gameLog is not None:
+            self.gameLog.appendMovesSequence(movesSequence, self.training_calls)
         self.resetCache()
         self._update_training_record(movesSequence)
 
@@ -172,6 +236,9 @@ class Pentago_TD_Agent(CachingScoringAgent):
         return movesSequence
 
     def plot_training_total_moves(self):
+        import matplotlib.pyplot as plt
+        import pandas as pd
+
         x = [i[0] for i in self.trainingCall_totalMoves]
         y = [i[1] for i in self.trainingCall_totalMoves]
         df = pd.DataFrame({"training_run": x, "moves": y})
@@ -196,21 +263,32 @@ class TD_model(tf.keras.Model):
         self.batch_size = 20
         self.batch_pending = []
 
-    def train_td_from_sequential_states(self, tensor_states: List[tf.Tensor], scores: np.ndarray):
+    def train_td_from_sequential_states(self, 
+        tensor_states: List[tf.Tensor], 
+        scores: np.ndarray,
+        td_gradients: Callable | None = None
+    ):
         """Trains the tensor model from a series of tensor_states and their know score (using
         the latest verion of the model).
         Expects: 
             len(tensor_states) = len(scores)
+        td_gradients: optional compiled function of (states, weights) giving the weighted
+            sum of the gradients of the states' scores, see compiledTDGradients
         """
         deltas = scores[1:] - scores[:-1]
-        gradients = []
-        for tensor in tensor_states[:-1]:
-            with tf.GradientTape() as tape:
-                tfModelScore = self.__call__(tensor[None, :])
-            gradients.append(
-                tape.gradient(tfModelScore, self.trainable_variables)
+        if td_gradients is not None:
+            delta_trainable = td_gradients(
+                np.stack(tensor_states[:-1]), self.generate_temporal_difference_weights(deltas)
             )
-        delta_trainable = self.get_update_as_weighted_sum_gradients(deltas, gradients)
+        else:
+            gradients = []
+            for tensor in tensor_states[:-1]:
+                with tf.GradientTape() as tape:
+                    tfModelScore = self.__call__(tensor[None, :])
+                gradients.append(
+                    tape.gradient(tfModelScore, self.trainable_variables)
+                )
+            delta_trainable = self.get_update_as_weighted_sum_gradients(deltas, gradients)
         if self.batch_size == 1:
             self.optimizer.apply_gradients(zip(delta_trainable, self.trainable_variables))
         else:
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod, abstractproperty
 from typing import List
-import copy
 
 from .common import AbstractGameState, SavedScoreInterface
 class AbstractScoringAgent(ABC):
@@ -10,6 +9,11 @@ class AbstractScoringAgent(ABC):
     @abstractmethod
     def score(self,gameState: AbstractGameState) -> float: pass
 
+    def score_many(self, gameStates: List[AbstractGameState]) -> List[float]:
+        """Scores a list of game states. Agents which can evaluate many game states 
+        more efficiently in a single batch should override this."""
+        return [self.score(gameState) for gameState in gameStates]
+
 class CachingScoringAgent(AbstractScoringAgent):
     def hasCachingFacility(self) -> bool: return True
 
@@ -30,6 +34,16 @@ class OnGameStateCachingScoringAgent(AbstractScoringAgent):
             gameState.savedScores[self.serialNumber] = score
             return score
 
+    def score_many(self, gameStates: List[SavedScoreInterface]) -> List[float]:
+        uncached = [
+            gameState for gameState in gameStates 
+            if self.serialNumber not in gameState.savedScores
+        ]
+        if uncached:
+            for gameState, score in zip(uncached, self._score_many(uncached)):
+                gameState.savedScores[self.serialNumber] = score
+        return [gameState.savedScores[self.serialNumber] for gameState in gameStates]
+
     def incrementSerial(self):
         self.serialNumber = OnGameStateCachingScoringAgent.nextSerialNumber
         OnGameStateCachingScoringAgent.nextSerialNumber += 1
@@ -37,12 +51,22 @@ class OnGameStateCachingScoringAgent(AbstractScoringAgent):
     @abstractmethod
     def _score(self, gameState: AbstractGameState) -> float: pass
 
+    def _score_many(self, gameStates: List[AbstractGameState]) -> List[float]:
+        return [self._score(gameState) for gameState in gameStates]
+
+def nextMovesOrderAscendingWithScoringAgent(
+    gameState: AbstractGameState, agent: AbstractScoringAgent
+) -> List[int]:
+    """Indices of gameState.next_moves, sorted by ascending score"""
+    scores = agent.score_many(gameState.next_moves)
+    return sorted(range(len(scores)), key=scores.__getitem__)
+
 def sortNextMovesAscendingWithScoringAgent(
     gameState: AbstractGameState, agent: AbstractScoringAgent
 ) -> List[AbstractGameState]:
-    next_moves = copy.copy(gameState.next_moves)
-    next_moves.sort(key = lambda x: agent.score(x))
-    return next_moves
+    next_moves = gameState.next_moves
+    order = nextMovesOrderAscendingWithScoringAgent(gameState, agent)
+    return [next_moves[i] for i in order]
 
 def sortNextMovesDescendingWithScoringAgent(
     gameState: AbstractGameState, agent: AbstractScoringAgent
@@ -0,0 +1,200 @@
+"""Negamax search with alpha-beta pruning, shared by the minimax agents.
+
+Values are from the perspective of the player to move in the searched position,
+so a scoring agent's score s (positive favours player 0) has value s for player
+0 and -s for player 1. A child position is only negated when the player to move
+changes, so turns with several steps (eg. pentago's placement then rotation by
+the same player) are searched without any special casing.
+"""
+
+from __future__ import annotations
+
+from math import inf
+from time import perf_counter
+from typing import List, Set, Tuple
+
+from .common import AbstractGameState
+from .moveOrdering import IndexOrdering
+from .scoringAgents import AbstractScoringAgent
+from .transpositionTable import TranspositionTable, TranspositionEntry, EXACT, LOWER_BOUND, UPPER_BOUND
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed"""
+
+class NegamaxSearch:
+    """Depth limited negamax search with alpha-beta pruning.
+
+    Hooks:
+        scoringAgent: evaluates positions at the search horizon, override
+            evaluate/evaluateMany to evaluate differently
+        transpositionTable: optional table of search results, keyed by
+            zobristHash or canonicalZobristHash when useSymmetry
+        moveOrdering: orders the next moves of each position, defaults to
+            IndexOrdering which searches in next_moves order
+        deadline: perf_counter time after which SearchTimeout is raised
+        batchHorizon: evaluate all the next moves of positions one step from the
+            horizon in a single score_many call, rather than one at a time in
+            search order. Faster when evaluation is batched (eg. a model) and
+            there's no move ordering to make cutoffs likely.
+
+    Counters, reset by resetCounters:
+        nodes: positions visited, including those evaluated at the horizon
+        cutoffs: positions where the remaining next moves were pruned
+        transpositionHits: positions whose value was taken from the table
+    """
+
+    def __init__(self,
+        scoringAgent: AbstractScoringAgent,
+        transpositionTable: TranspositionTable | None = None,
+        moveOrdering = None,
+        useSymmetry: bool = False,
+        batchHorizon: bool = False
+    ):
+        self.scoringAgent = scoringAgent
+        self.transpositionTable = transpositionTable
+        self.moveOrdering = moveOrdering if moveOrdering is not None else IndexOrdering()
+        self.useSymmetry = useSymmetry
+        self.batchHorizon = batchHorizon
+        self.deadline: float | None = None
+        self.resetCounters()
+
+    def resetCounters(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.transpositionHits = 0
+
+    def newSearch(self):
+        """Called before searching from a new root position"""
+        if self.transpositionTable is not None:
+            self.transpositionTable.newSearch()
+        self.moveOrdering.newSearch()
+
+    def evaluate(self, gameState: AbstractGameState) -> float:
+        """Score of gameState for the player to move"""
+        score = float(self.scoringAgent.score(gameState))
+        return score if gameState.current_player == 0 else -score
+
+    def evaluateMany(self, gameStates: List[AbstractGameState], player: int) -> List[float]:
+        """Scores of gameStates for player, evaluated in a single score_many call"""
+        scores = self.scoringAgent.score_many(gameStates)
+        if player == 0:
+            return [float(score) for score in scores]
+        return [-float(score) for score in scores]
+
+    def value(self,
+        gameState: AbstractGameState,
+        depth: int,
+        alpha: float = -1.0,
+        beta: float = 1.0
+    ) -> float:
+        """Value of gameState for the player to move, searched to depth. The value
+        is exact when it is within (alpha, beta), otherwise it is an upper bound
+        when <= alpha or a lower bound when >= beta."""
+        self.nodes += 1
+        if gameState.isEnd or depth == 0:
+            return self.evaluate(gameState)
+
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        entry = self.probe(gameState)
+        if entry is not None and entry.depth >= depth:
+            if (
+                entry.bound == EXACT
+                or (entry.bound == LOWER_BOUND and entry.value >= beta)
+                or (entry.bound == UPPER_BOUND and entry.value <= alpha)
+            ):
+                self.transpositionHits += 1
+                return entry.value
+
+        value, bestIndex = self.searchChildren(
+            gameState, depth, alpha, beta, self.firstIndex(gameState, entry)
+        )
+
+        if self.transpositionTable is not None:
+            if value <= alpha:
+                bound = UPPER_BOUND
+            elif value >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            key, transform = self.tableKey(gameState)
+            self.transpositionTable.store(key, depth, value, bound, bestIndex, transform)
+        return value
+
+    def searchChildren(self,
+        gameState: AbstractGameState,
+        depth: int,
+        alpha: float = -1.0,
+        beta: float = 1.0,
+        firstIndex: int | None = None,
+        indices: Set[int] | None = None
+    ) -> Tuple[float, int]:
+        """Searches the next moves of gameState to depth-1, returning the value of
+        gameState for the player to move and the index of its best next move.
+        Ties are won by the first move searched.
+
+        firstIndex: index of a next move to search before all others
+        indices: indices of the next moves to search, defaults to all
+        """
+        next_moves = gameState.next_moves
+        player = gameState.current_player
+        bestValue, bestIndex = -inf, None
+
+        if depth == 1 and self.batchHorizon:
+            # All horizon children are evaluated, so there is nothing to order
+            values = self.evaluateMany(next_moves, player)
+            self.nodes += len(values)
+            searched = range(len(values)) if indices is None else sorted(indices)
+            for i in searched:
+                if values[i] > bestValue:
+                    bestValue, bestIndex = values[i], i
+            return bestValue, bestIndex
+
+        order = self.moveOrdering.orderedIndices(
+            gameState, self.scoringAgent, depth, firstIndex, indices
+        )
+        for i in order:
+            nextState = next_moves[i]
+            if nextState.current_player == player:
+                value = self.value(nextState, depth-1, alpha, beta)
+            else:
+                value = -self.value(nextState, depth-1, -beta, -alpha)
+            if value > bestValue:
+                bestValue, bestIndex = value, i
+                if value >= beta:
+                    self.cutoffs += 1
+                    self.moveOrdering.recordCutoff(gameState, i, depth)
+                    break
+                alpha = max(alpha, value)
+        return bestValue, bestIndex
+
+    def tableKey(self, gameState: AbstractGameState) -> Tuple[int, int]:
+        """Transposition table key of gameState and its symmetry transform"""
+        if self.useSymmetry:
+            return gameState.canonicalZobristHash, gameState.canonicalKey[1]
+        return gameState.zobristHash, 0
+
+    def probe(self, gameState: AbstractGameState) -> TranspositionEntry | None:
+        if self.transpositionTable is None:
+            return None
+        return self.transpositionTable.probe(self.tableKey(gameState)[0])
+
+    def firstIndex(self,
+        gameState: AbstractGameState, entry: TranspositionEntry | None
+    ) -> int | None:
+        """Best next move index stored for gameState, if it applies to gameState's
+        orientation"""
+        if entry is None or entry.transform != self.tableKey(gameState)[1]:
+            return None
+        return entry.bestChildIndex
+
+    def rootIndices(self, gameState: AbstractGameState) -> Set[int] | None:
+        """Indices of the next moves to search from the root, one for each set of
+        symmetric next moves when searching up to symmetry"""
+        if not self.useSymmetry:
+            return None
+        indices = {}
+        for i, nextState in enumerate(gameState.next_moves):
+            indices.setdefault(nextState.canonicalKey[0], i)
+        return set(indices.values())
@@ -0,0 +1,62 @@
+"""The 8 symmetries of a square grid (the dihedral group D4).
+
+All of the grid games here are unchanged by these symmetries: a quadrant
+rotation is mapped to a rotation of the image quadrant and lines of pieces are
+mapped to lines of pieces. Positions which are equal up to a symmetry share a
+canonical key, the smallest encoding of the position over all 8 transforms.
+"""
+
+from __future__ import annotations
+
+from functools import cache
+from typing import Tuple
+
+import numpy as np
+
+TRANSFORM_NAMES = [
+    "identity", "rot90", "rot180", "rot270",
+    "flipud", "fliplr", "transpose", "antitranspose",
+]
+N_TRANSFORMS = len(TRANSFORM_NAMES)
+
+# INVERSE_TRANSFORMS[t] undoes transform t
+INVERSE_TRANSFORMS = [0, 3, 2, 1, 4, 5, 6, 7]
+
+def transformGrid(grid: np.ndarray, transform: int) -> np.ndarray:
+    """Applies the transform to the last two axes of grid"""
+    if transform == 0:
+        return grid
+    if transform <= 3:
+        return np.rot90(grid, transform, axes=(-2, -1))
+    if transform == 4:
+        return np.flip(grid, -2)
+    if transform == 5:
+        return np.flip(grid, -1)
+    if transform == 6:
+        return np.swapaxes(grid, -2, -1)
+    return np.rot90(np.swapaxes(grid, -2, -1), 2, axes=(-2, -1))
+
+@cache
+def dihedralPermutations(size: int) -> np.ndarray:
+    """Shape (8, size*size) array where transformGrid(grid, t).flatten() equals
+    grid.flatten()[permutations[t]]"""
+    indices = np.arange(size * size).reshape((size, size))
+    return np.stack([
+        transformGrid(indices, t).flatten() for t in range(N_TRANSFORMS)
+    ])
+
+def canonicalKey(grids: np.ndarray) -> Tuple[int, int]:
+    """Canonical key of a stack of player grids of shape (n_players, size, size).
+
+    Returns the key and the transform which maps grids to the canonical
+    orientation. When several transforms give the key, the first is returned.
+    """
+    grids = np.asarray(grids)
+    n_players, size = grids.shape[0], grids.shape[-1]
+    occupied = grids.reshape((n_players, -1)) != 0
+    # (8, n_players * size * size) bits of each transformed position
+    transformed = occupied[:, dihedralPermutations(size)].transpose((1, 0, 2))
+    packed = np.packbits(transformed.reshape((N_TRANSFORMS, -1)), axis=1)
+    keys = [int.from_bytes(row.tobytes(), "big") for row in packed]
+    transform = min(range(N_TRANSFORMS), key=keys.__getitem__)
+    return keys[transform], transform
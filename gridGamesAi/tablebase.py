@@ -0,0 +1,325 @@
+"""Exact values of every position of small grid games, solved by retrograde
+analysis and stored in a flat table memory mapped from disk.
+
+A game is described by GridRules: players alternately place a piece on an empty
+cell, optionally followed by a rotation step, until a player has a winning line
+or the board is full. This covers tic-tac-toe and ngo (eg. NgoGameRunner(2, 4,
+True)). Every position with consistent piece counts (a superset of the reachable
+positions) is solved, layer by layer from the full board back to the empty one:
+a turn always adds a piece, so each layer only depends on layers already solved.
+
+Positions are indexed by a perfect hash: the layer (turn step and number of
+pieces) gives an offset, and the rank of the position within its layer is the
+combinatorial number of its occupied cells followed by that of player 0's cells
+among them.
+
+Values are int8, from the perspective of the player to move: 0 for a draw, d > 0
+for a win d - 1 moves from the end of the game with best play, and d < 0 for a
+loss -d - 1 moves from the end. Winners play for the fastest win and losers for
+the slowest loss.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import itertools
+import json
+from math import comb
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .common import AbstractGridGameState
+from .scoringAgents import AbstractScoringAgent
+
+@dataclass
+class GridRules:
+    """n_cells: cells of the (flattened) board
+    winMatrix: (n_cells, n_lines) indicator of the cells of each winning line
+    winLength: cells in a winning line
+    rotations: (n_rotations, n_cells) gather indices of the rotations one of which
+        follows each placement, or None for games without a rotation step
+    """
+    n_cells: int
+    winMatrix: np.ndarray
+    winLength: int
+    rotations: np.ndarray | None = None
+
+    @property
+    def turnSteps(self) -> int:
+        return 1 if self.rotations is None else 2
+
+    @classmethod
+    def fromNgoRunner(cls, runner) -> GridRules:
+        from .ngo.runnerBackends import NumpyRunnerBackend
+        backend = NumpyRunnerBackend(runner.size_quadrant, runner.win_line_length)
+        return cls(
+            runner.size_board ** 2,
+            backend.winMatrix,
+            runner.win_line_length,
+            backend.stackedRotationIndices if runner.rotation_enabled else None,
+        )
+
+    @classmethod
+    def ticTacToe(cls) -> GridRules:
+        lines = [[(i, j) for j in range(3)] for i in range(3)]
+        lines += [[(j, i) for j in range(3)] for i in range(3)]
+        lines += [[(i, i) for i in range(3)], [(i, 2 - i) for i in range(3)]]
+        winMatrix = np.zeros((9, len(lines)), dtype=np.int32)
+        for line, cells in enumerate(lines):
+            for i, j in cells:
+                winMatrix[3*i + j, line] = 1
+        return cls(9, winMatrix, 3)
+
+    def asDict(self) -> Dict:
+        return {
+            "n_cells": self.n_cells,
+            "win_matrix": np.asarray(self.winMatrix).tolist(),
+            "win_length": self.winLength,
+            "rotations": None if self.rotations is None else np.asarray(self.rotations).tolist(),
+        }
+
+    @classmethod
+    def fromDict(cls, data: Dict) -> GridRules:
+        rotations = data["rotations"]
+        return cls(
+            data["n_cells"],
+            np.array(data["win_matrix"], dtype=np.int32),
+            data["win_length"],
+            None if rotations is None else np.array(rotations, dtype=np.int64),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, GridRules) and self.asDict() == other.asDict()
+
+def _binomials(n: int) -> np.ndarray:
+    """B[i, j] = C(i, j), zero for j > i"""
+    return np.array([[comb(i, j) for j in range(n + 2)] for i in range(n + 1)], dtype=np.int64)
+
+class Tablebase:
+    """Values of every position of a GridRules game, see the module docstring"""
+
+    # Most parent positions solved at once, bounding the memory of their children
+    CHUNK_SIZE = 2**15
+
+    def __init__(self, rules: GridRules, values: np.ndarray):
+        self.rules = rules
+        self.values = values
+        self._binomials = _binomials(rules.n_cells)
+        self.layers: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        offset = 0
+        for step, k in self._layerKeys():
+            size = comb(rules.n_cells, k) * comb(k, (k + 1) // 2)
+            self.layers[(step, k)] = (offset, size)
+            offset += size
+        self.size = offset
+
+    def _layerKeys(self) -> List[Tuple[int, int]]:
+        keys = [(0, k) for k in range(self.rules.n_cells + 1)]
+        if self.rules.turnSteps == 2:
+            keys += [(1, k) for k in range(1, self.rules.n_cells + 1)]
+        return keys
+
+    @staticmethod
+    def playerToMove(step: int, k: int) -> int:
+        """Player to move with k pieces on the board at turn step"""
+        return k % 2 if step == 0 else (k - 1) % 2
+
+    @classmethod
+    def solve(cls, rules: GridRules, verbose: bool = False) -> Tablebase:
+        tablebase = cls(rules, np.zeros(0, dtype=np.int8))
+        tablebase.values = np.zeros(tablebase.size, dtype=np.int8)
+        for k in range(rules.n_cells, -1, -1):
+            # A placement leads to layer k + 1 and a rotation to layer k at step 0
+            tablebase._solveLayer(0, k)
+            if rules.turnSteps == 2 and k > 0:
+                tablebase._solveLayer(1, k)
+            if verbose:
+                print(f"Solved positions with {k} pieces")
+        return tablebase
+
+    def save(self, path: Path):
+        """Writes the values to path as a .npy file, and the rules to path with a
+        .json suffix"""
+        path = Path(path)
+        np.save(path, self.values)
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump(self.rules.asDict(), f)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Tablebase:
+        path = Path(path)
+        with open(path.with_suffix(".json")) as f:
+            rules = GridRules.fromDict(json.load(f))
+        return cls(rules, np.load(path, mmap_mode="r" if mmap else None))
+
+    @classmethod
+    def loadOrSolve(cls, rules: GridRules, path: Path, verbose: bool = False) -> Tablebase:
+        """Loads the tablebase saved at path, solving and saving it first if there
+        isn't one for rules"""
+        path = Path(path)
+        if path.exists() and path.with_suffix(".json").exists():
+            tablebase = cls.load(path)
+            if tablebase.rules == rules:
+                return tablebase
+        tablebase = cls.solve(rules, verbose)
+        tablebase.save(path)
+        return cls.load(path)
+
+    def _layerGrids(self, k: int):
+        """Yields chunks of the grids, shape (N, 2, n_cells), with k pieces"""
+        n = self.rules.n_cells
+        n0 = (k + 1) // 2
+        ownerCombinations = list(itertools.combinations(range(k), n0))
+        owners = np.zeros((len(ownerCombinations), k), dtype=np.int8)
+        for i, combination in enumerate(ownerCombinations):
+            owners[i, list(combination)] = 1
+
+        occupiedCombinations = itertools.combinations(range(n), k)
+        chunk = max(1, self.CHUNK_SIZE // len(owners))
+        while True:
+            occupied = list(itertools.islice(occupiedCombinations, chunk))
+            if not occupied:
+                return
+            cells = np.array(occupied, dtype=np.int64).reshape((len(occupied), k))
+            grids = np.zeros((len(occupied), len(owners), 2, n), dtype=np.int8)
+            rows = np.arange(len(occupied))[:, None, None]
+            columns = np.arange(len(owners))[None, :, None]
+            grids[rows, columns, 0, cells[:, None, :]] = owners[None]
+            grids[rows, columns, 1, cells[:, None, :]] = 1 - owners[None]
+            yield grids.reshape((-1, 2, n))
+
+    def _ranks(self, grids: np.ndarray, k: int) -> np.ndarray:
+        """Ranks within their layer of grids with k pieces"""
+        B = self._binomials
+        occupied = grids[:, 0] | grids[:, 1]
+        cells = np.arange(self.rules.n_cells)[None, :]
+        occupiedCount = np.cumsum(occupied, axis=1)
+        occupiedRank = np.sum(occupied * B[cells, occupiedCount], axis=1)
+        position = np.maximum(occupiedCount - 1, 0)
+        ownerCount = np.cumsum(grids[:, 0], axis=1)
+        ownerRank = np.sum(grids[:, 0] * B[position, ownerCount], axis=1)
+        return occupiedRank * comb(k, (k + 1) // 2) + ownerRank
+
+    def _winners(self, grids: np.ndarray, lastPlayer: int) -> np.ndarray:
+        """Winning player of each grid, or -1. If both players have a line, the
+        player who made it by moving loses."""
+        n = len(grids)
+        lineCounts = (
+            grids.reshape((2 * n, -1)).astype(np.float32) @ self.rules.winMatrix.astype(np.float32)
+        ).reshape((n, 2, -1))
+        hasLine = np.max(lineCounts, axis=2) == self.rules.winLength
+        winners = np.full(n, -1)
+        winners[hasLine[:, 1]] = 1
+        winners[hasLine[:, 0]] = 0
+        winners[hasLine[:, 0] & hasLine[:, 1]] = 1 - lastPlayer
+        return winners
+
+    def _solveLayer(self, step: int, k: int):
+        rules = self.rules
+        offset, _ = self.layers[(step, k)]
+        player = self.playerToMove(step, k)
+        lastPlayer = player if step == 1 else 1 - player
+        for grids in self._layerGrids(k):
+            n = len(grids)
+            values = np.zeros(n, dtype=np.int8)
+            winners = self._winners(grids, lastPlayer) if k > 0 else np.full(n, -1)
+            ended = winners != -1
+            values[ended] = np.where(winners[ended] == player, 1, -1)
+            if step == 0 and k == rules.n_cells:
+                # Full board without a line is a draw
+                ended[:] = True
+
+            parents = grids[~ended]
+            if len(parents):
+                if step == 0:
+                    children, childStep, childK = self._placements(parents, player)
+                else:
+                    children, childStep, childK = self._rotated(parents)
+                childOffset, _ = self.layers[(childStep, childK)]
+                m = children.shape[1]
+                childValues = self.values[
+                    childOffset + self._ranks(children.reshape((-1, 2, rules.n_cells)), childK)
+                ].reshape((-1, m)).astype(np.int16)
+                if self.playerToMove(childStep, childK) != player:
+                    childValues = -childValues
+                values[~ended] = _bestValues(childValues)
+
+            self.values[offset + self._ranks(grids, k)] = values
+
+    def _placements(self, grids: np.ndarray, player: int):
+        n, cells = len(grids), self.rules.n_cells
+        free = np.nonzero((grids[:, 0] | grids[:, 1]) == 0)[1].reshape((n, -1))
+        children = np.repeat(grids[:, None], free.shape[1], axis=1)
+        children[np.arange(n)[:, None], np.arange(free.shape[1])[None, :], player, free] = 1
+        k = int(np.sum(grids[0])) + 1
+        if self.rules.turnSteps == 2:
+            return children, 1, k
+        return children, 0, k
+
+    def _rotated(self, grids: np.ndarray):
+        children = np.transpose(grids[:, :, self.rules.rotations], (0, 2, 1, 3))
+        return children, 0, int(np.sum(grids[0]))
+
+    def indices(self, gameStates: List[AbstractGridGameState]) -> np.ndarray:
+        """Table indices of the game states"""
+        grids = np.stack([
+            np.stack([np.asarray(gs.grid_0), np.asarray(gs.grid_1)]).reshape((2, -1))
+            for gs in gameStates
+        ]).astype(np.int8)
+        steps = np.array([gs.turn_step for gs in gameStates])
+        players = np.array([gs.current_player for gs in gameStates])
+        counts = np.sum(grids, axis=(1, 2))
+        indices = np.empty(len(gameStates), dtype=np.int64)
+        for step, k in set(zip(steps.tolist(), counts.tolist())):
+            layer = (steps == step) & (counts == k)
+            if (step, k) not in self.layers or np.any(
+                (np.sum(grids[layer, 0], axis=1) != (k + 1) // 2)
+                | (players[layer] != self.playerToMove(step, k))
+            ):
+                raise ValueError("Position isn't in the tablebase")
+            offset, _ = self.layers[(step, k)]
+            indices[layer] = offset + self._ranks(grids[layer], k)
+        return indices
+
+    def value(self, gameState: AbstractGridGameState) -> int:
+        """Encoded value of gameState for the player to move"""
+        return int(self.values[self.indices([gameState])[0]])
+
+    def result(self, gameState: AbstractGridGameState) -> Tuple[int, int]:
+        """(1 for a win, 0 for a draw or -1 for a loss of the player to move,
+        moves to the end of the game with best play)"""
+        value = self.value(gameState)
+        if value == 0:
+            placements = self.rules.n_cells - int(
+                np.sum(gameState.grid_0) + np.sum(gameState.grid_1)
+            )
+            return 0, placements * self.rules.turnSteps + gameState.turn_step
+        return (1, value - 1) if value > 0 else (-1, -value - 1)
+
+    def scores(self, gameStates: List[AbstractGridGameState]) -> np.ndarray:
+        """Exact scores of the game states, 1 if player 0 wins, -1 if player 1
+        wins and 0 for a draw"""
+        outcomes = np.sign(self.values[self.indices(gameStates)]).astype(np.float64)
+        players = np.array([gs.current_player for gs in gameStates])
+        return np.where(players == 0, outcomes, -outcomes)
+
+def _bestValues(childValues: np.ndarray) -> np.ndarray:
+    """Values of positions from the values of their children, shape (N, moves),
+    from the perspective of the positions' player to move"""
+    keys = np.where(childValues > 0, 1000 - childValues, np.where(childValues < 0, -1000 - childValues, 0))
+    best = childValues[np.arange(len(childValues)), np.argmax(keys, axis=1)]
+    return np.where(best > 0, best + 1, np.where(best < 0, best - 1, 0)).astype(np.int8)
+
+class TablebaseScoringAgent(AbstractScoringAgent):
+    """Scores positions exactly by probing a tablebase"""
+
+    def __init__(self, tablebase: Tablebase):
+        self.tablebase = tablebase
+
+    def score(self, gameState: AbstractGridGameState) -> float:
+        return float(self.tablebase.scores([gameState])[0])
+
+    def score_many(self, gameStates: List[AbstractGridGameState]) -> List[float]:
+        return self.tablebase.scores(gameStates).tolist()
@@ -0,0 +1,143 @@
+"""TD learning helpers shared by the td models.
+
+Minibatch TD(lambda) learning from a replay buffer of self play positions: each
+game's positions are stored with their lambda-return targets, computed from the
+scores of the game's positions when it was added. The model is then fitted to
+minibatches sampled from the buffer by a compiled train step, rather than with a
+gradient per position of each game.
+
+Graph compiled inference and TD gradient steps, traced once for a fixed input
+signature, which replace eager calls of the model.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, List
+
+import numpy as np
+import tensorflow as tf
+
+def _inputSignature(model: tf.keras.Model) -> tf.TensorSpec:
+    return tf.TensorSpec((None, model.input_shape[-1]), tf.float32)
+
+def eagerPredict(model: tf.keras.Model) -> Callable[[np.ndarray], np.ndarray]:
+    """Scores a batch of model inputs with an eager call of model"""
+    return lambda inputs: model.__call__(inputs).numpy()[:,0]
+
+def compiledPredict(model: tf.keras.Model) -> Callable[[np.ndarray], np.ndarray]:
+    """Scores a batch of model inputs with a tf.function of model"""
+    predict = tf.function(
+        lambda inputs: model(inputs)[:, 0], input_signature=[_inputSignature(model)]
+    )
+    return lambda inputs: predict(np.asarray(inputs, dtype=np.float32)).numpy()
+
+def compiledTDGradients(model: tf.keras.Model) -> Callable[[np.ndarray, np.ndarray], List[tf.Tensor]]:
+    """Returns a tf.function of (states, weights) giving the weighted sum of the
+    gradients of model's score of each state, with a single gradient tape pass.
+    This is the gradient of the weighted sum of the scores."""
+    @tf.function(input_signature=[_inputSignature(model), tf.TensorSpec((None,), tf.float32)])
+    def gradients(states, weights):
+        with tf.GradientTape() as tape:
+            total = tf.reduce_sum(weights * model(states)[:, 0])
+        return tape.gradient(total, model.trainable_variables)
+    return lambda states, weights: gradients(
+        np.asarray(states, dtype=np.float32), np.asarray(weights, dtype=np.float32)
+    )
+
+def lambdaReturns(scores: np.ndarray, td_lambda: float) -> np.ndarray:
+    """Lambda-return targets for all but the last of a game's positions.
+
+    scores: score of each position of the game, where the last is the final
+        score of the game
+    Returns G, where G[t] = (1 - td_lambda) * scores[t+1] + td_lambda * G[t+1]
+    and G[-1] = scores[-1]
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.size - 1
+    # G[t] = sum over k > t of (1 - td_lambda) * td_lambda**(k-t-1) * scores[k],
+    # except the final score has weight td_lambda**(n-t-1)
+    steps = np.arange(n + 1)[None, :] - np.arange(n)[:, None] - 1
+    weights = np.where(steps >= 0, td_lambda ** np.maximum(steps, 0), 0.0)
+    weights[:, :-1] *= 1 - td_lambda
+    return weights @ scores
+
+class ReplayBuffer:
+    """Fixed capacity ring buffer of model inputs and their targets. Once full,
+    the oldest positions are overwritten."""
+
+    def __init__(self, capacity: int, input_size: int):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, input_size), dtype=np.float32)
+        self.targets = np.zeros(capacity, dtype=np.float32)
+        self.size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, states: np.ndarray, targets: np.ndarray):
+        n = len(targets)
+        if n > self.capacity:
+            states, targets = states[-self.capacity:], targets[-self.capacity:]
+            n = self.capacity
+        slots = (self._next + np.arange(n)) % self.capacity
+        self.states[slots] = states
+        self.targets[slots] = targets
+        self._next = (self._next + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size: int, rng: np.random.Generator):
+        indices = rng.integers(0, self.size, size=batch_size)
+        return self.states[indices], self.targets[indices]
+
+    def clear(self):
+        self.size = 0
+        self._next = 0
+
+class TDLearner:
+    """Fits a model, compiled with an optimizer, to the lambda-returns of self
+    play games.
+
+    Each call to add_game stores the game in the replay buffer and then runs
+    train_steps_per_game minibatch steps, once the buffer holds at least
+    batch_size positions.
+    """
+
+    def __init__(self,
+        model: tf.keras.Model,
+        capacity: int = 2**16,
+        batch_size: int = 256,
+        td_lambda: float = 0.7,
+        train_steps_per_game: int = 1,
+    ):
+        self.model = model
+        self.batch_size = batch_size
+        self.td_lambda = td_lambda
+        self.train_steps_per_game = train_steps_per_game
+        self.buffer = ReplayBuffer(capacity, model.input_shape[-1])
+        self.rng = np.random.default_rng()
+        self.last_loss: float | None = None
+        self._train_step = tf.function(
+            self._train_step_eager,
+            input_signature=[_inputSignature(model), tf.TensorSpec((None,), tf.float32)],
+        )
+
+    def add_game(self, states: np.ndarray, scores: np.ndarray):
+        """states: model input of each of the game's positions
+        scores: score of each position, where the last is the final score"""
+        self.buffer.add(states[:-1], lambdaReturns(scores, self.td_lambda))
+        if len(self.buffer) >= self.batch_size:
+            self.train(self.train_steps_per_game)
+
+    def train(self, steps: int):
+        for _ in range(steps):
+            states, targets = self.buffer.sample(self.batch_size, self.rng)
+            self.last_loss = float(self._train_step(states, targets))
+
+    def _train_step_eager(self, states: tf.Tensor, targets: tf.Tensor) -> tf.Tensor:
+        with tf.GradientTape() as tape:
+            values = self.model(states, training=True)[:, 0]
+            loss = tf.reduce_mean(tf.square(targets - values))
+        gradients = tape.gradient(loss, self.model.trainable_variables)
+        self.model.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
+        return loss
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from functools import cached_property
 from typing import List, Tuple
@@ -8,6 +8,10 @@ import numpy as np
 from ..turnTracker import TurnTracker
 from ..twoPlayerGridState import TwoPlayerGridState
 from ..common import AbstractGridGameState
+from ..zobrist import ZobristKeys
+from .. import symmetry
+
+zobristKeys = ZobristKeys(9, 2, 1)
 
 def _gridContainsWin(grid: np.ndarray):
     """Evaluates whether a player grid contains a winning set of pieces, ie.
@@ -29,10 +33,10 @@ def _gridContainsWin(grid: np.ndarray):
 
 @dataclass
 class TicTacToeGameState(AbstractGridGameState):
-    turnTracker: TurnTracker = TurnTracker(2,1)
-    gridState: TwoPlayerGridState = TwoPlayerGridState(
+    turnTracker: TurnTracker = field(default_factory=lambda: TurnTracker(2, 1))
+    gridState: TwoPlayerGridState = field(default_factory=lambda: TwoPlayerGridState(
         np.zeros((3,3)), np.zeros((3,3))
-    )
+    ))
 
     @property
     def current_player(self) -> int: return self.turnTracker.current_player
@@ -49,6 +53,30 @@ class TicTacToeGameState(AbstractGridGameState):
     @property
     def grid_1(self) -> np.array: return self.gridState.grid_1
 
+    @cached_property
+    def zobristHash(self) -> int:
+        return (
+            zobristKeys.hashGrids(np.stack([self.grid_0.flatten(), self.grid_1.flatten()]))
+            ^ zobristKeys.turnKey(self.current_player, self.turn_step)
+        )
+
+    @cached_property
+    def canonicalKey(self) -> Tuple[int, int]:
+        """Key shared by all positions equal to this one up to a symmetry of the 
+        board, and the symmetry transform which maps this position to the 
+        canonical orientation"""
+        key, transform = symmetry.canonicalKey(np.stack([self.grid_0, self.grid_1]))
+        return key << 1 | self.current_player, transform
+
+    @cached_property
+    def canonicalZobristHash(self) -> int:
+        permutation = symmetry.dihedralPermutations(3)[self.canonicalKey[1]]
+        flat_grids = np.stack([self.grid_0.flatten(), self.grid_1.flatten()])
+        return (
+            zobristKeys.hashGrids(flat_grids[:, permutation])
+            ^ zobristKeys.turnKey(self.current_player, self.turn_step)
+        )
+
     @cached_property
     def _win_player_0(self) -> bool:
         return _gridContainsWin(self.grid_0)
@@ -77,7 +105,7 @@ class TicTacToeGameState(AbstractGridGameState):
     def isEnd(self) -> bool:
         return self.isDraw or self.isWin
 
-    @property
+    @cached_property
     def next_moves(self) -> List[TicTacToeGameState]:
         next_grid_states = self.gridState.nextValidPlacements(self.current_player)
         next_turn_tracker = self.turnTracker.getIncremented()
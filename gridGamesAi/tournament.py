@@ -0,0 +1,378 @@
+"""Tournaments between agents, played across a process pool, with Elo ratings.
+
+Each pairing plays the same seeded starting positions (openings) once with each
+player moving first. Results are appended to a JSON lines file as games finish,
+and games already in the file are skipped, so an interrupted tournament resumes
+where it stopped.
+
+Ratings are fitted with a Bradley-Terry model, where a draw counts as half a
+win for each player, and reported on the Elo scale with 95% confidence
+intervals from the model's Fisher information.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from functools import partial
+import json
+import math
+import multiprocessing as mp
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .agents import AbstractAgent
+from .common import AbstractGameState
+from .game import Game
+from .lockstep import LockstepGames, greedyScoringAgent
+
+ELO_PER_NATURAL_UNIT = 400 / math.log(10)
+
+@dataclass
+class Entrant:
+    """A tournament player. makeAgent is called once in each process which plays
+    the entrant's games, so must be picklable (eg. a module level function or a
+    functools.partial of one)"""
+    name: str
+    makeAgent: Callable[[], AbstractAgent]
+
+@dataclass(frozen=True)
+class GameResult:
+    """score: 1 if first won, 0 if second won and 0.5 for a draw"""
+    first: str
+    second: str
+    opening: int
+    score: float
+    moves: int
+    round: int = 0
+
+    @property
+    def key(self) -> Tuple[str, str, int, int]:
+        return (self.first, self.second, self.opening, self.round)
+
+@dataclass
+class Rating:
+    name: str
+    elo: float
+    lower: float
+    upper: float
+    games: int
+    score: float
+
+@dataclass
+class NgoOpenings:
+    """Seeded ngo starting positions with n_placements random placements for each
+    player, the same for a given seed and index in any process"""
+    size_quadrant: int
+    win_line_length: int
+    rotation_enabled: bool
+    n_placements: int
+    seed: int = 0
+
+    def __call__(self, index: int) -> AbstractGameState:
+        from .ngo.gameState import NgoGameRunner, NgoGameState
+        runner = self.__dict__.get("_runner")
+        if runner is None:
+            runner = self.__dict__["_runner"] = NgoGameRunner(
+                self.size_quadrant, self.win_line_length, self.rotation_enabled
+            )
+        return NgoGameState.init_with_n_random_placements(
+            self.n_placements, runner, np.random.default_rng([self.seed, index])
+        )
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key != "_runner"}
+
+def playGame(
+    first: AbstractAgent, second: AbstractAgent, startingPosition: AbstractGameState
+) -> Tuple[float, int]:
+    """Plays a game to the end, returning the score of first (who moves first from
+    the starting position) and the number of moves made"""
+    game = Game([first, second], startingPosition)
+    if startingPosition.current_player == 1:
+        game.agents = [second, first]
+    moves = 0
+    while not game.current_game_state.isEnd:
+        game.moveWithCurrentPlayer()
+        moves += 1
+    winPlayer = game.current_game_state.winPlayer
+    if winPlayer is None:
+        return 0.5, moves
+    return (1.0 if winPlayer == startingPosition.current_player else 0.0), moves
+
+_workerEntrants: Dict[str, Entrant] = {}
+_workerAgents: Dict[str, AbstractAgent] = {}
+_workerOpenings: Callable[[int], AbstractGameState] | None = None
+
+def _initWorker(entrants: List[Entrant], openings: Callable[[int], AbstractGameState]):
+    global _workerOpenings
+    _workerEntrants.clear()
+    _workerEntrants.update({entrant.name: entrant for entrant in entrants})
+    _workerAgents.clear()
+    _workerOpenings = openings
+
+def _workerAgent(name: str) -> AbstractAgent:
+    agent = _workerAgents.get(name)
+    if agent is None:
+        agent = _workerAgents[name] = _workerEntrants[name].makeAgent()
+    return agent
+
+def _gameResult(key: Tuple[str, str, int, int], gameState: AbstractGameState, moves: int) -> GameResult:
+    first, second, opening, round = key
+    if gameState.winPlayer is None:
+        score = 0.5
+    else:
+        score = 1.0 if gameState.winPlayer == _workerOpenings(opening).current_player else 0.0
+    return GameResult(first, second, opening, score, moves, round)
+
+def _playScheduledGames(keys: List[Tuple[str, str, int, int]]) -> List[GameResult]:
+    """Plays the games, in lockstep when all their agents are greedy"""
+    agents = {name: _workerAgent(name) for key in keys for name in key[:2]}
+    if all(greedyScoringAgent(agent) is not None for agent in agents.values()):
+        startingPositions = [_workerOpenings(key[2]) for key in keys]
+        players = [
+            [agents[first], agents[second]] if gameState.current_player == 0
+            else [agents[second], agents[first]]
+            for (first, second, _, _), gameState in zip(keys, startingPositions)
+        ]
+        games = LockstepGames(startingPositions, players)
+        games.run()
+        return [
+            _gameResult(key, gameState, moves)
+            for key, gameState, moves in zip(keys, games.gameStates, games.moves)
+        ]
+
+    results = []
+    for first, second, opening, round in keys:
+        score, moves = playGame(agents[first], agents[second], _workerOpenings(opening))
+        results.append(GameResult(first, second, opening, score, moves, round))
+    return results
+
+def bradleyTerry(
+    results: Iterable[GameResult], names: List[str], priorDraws: float = 1.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fits Bradley-Terry strengths, exp(theta), to the results between names.
+
+    Each player also has priorDraws draws against a virtual player with theta 0,
+    which keeps theta finite for players who won or lost every game and anchors
+    the scale. Returns theta and its standard error for each player.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    games = np.zeros((n, n))
+    wins = np.zeros((n, n))
+    for result in results:
+        if result.first in index and result.second in index:
+            i, j = index[result.first], index[result.second]
+            games[i, j] += 1
+            games[j, i] += 1
+            wins[i, j] += result.score
+            wins[j, i] += 1 - result.score
+
+    theta = np.zeros(n)
+    for _ in range(100):
+        p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+        pPrior = 1 / (1 + np.exp(-theta))
+        gradient = np.sum(wins - games * p, axis=1) + priorDraws * (0.5 - pPrior)
+        weights = games * p * (1 - p)
+        information = np.diag(np.sum(weights, axis=1) + priorDraws * pPrior * (1 - pPrior)) - weights
+        step = np.linalg.solve(information, gradient)
+        theta += step
+        if np.max(np.abs(step)) < 1e-9:
+            break
+    return theta, np.sqrt(np.diag(np.linalg.inv(information)))
+
+def ratings(results: Iterable[GameResult], names: List[str]) -> List[Rating]:
+    """Elo ratings of names, best first, with 95% confidence intervals"""
+    results = list(results)
+    theta, stderr = bradleyTerry(results, names)
+    games = {name: 0 for name in names}
+    scores = {name: 0.0 for name in names}
+    for result in results:
+        if result.first in games and result.second in games:
+            games[result.first] += 1
+            games[result.second] += 1
+            scores[result.first] += result.score
+            scores[result.second] += 1 - result.score
+    elo = theta * ELO_PER_NATURAL_UNIT
+    margin = 1.96 * stderr * ELO_PER_NATURAL_UNIT
+    table = [
+        Rating(name, elo[i], elo[i] - margin[i], elo[i] + margin[i], games[name], scores[name])
+        for i, name in enumerate(names)
+    ]
+    return sorted(table, key=lambda rating: rating.elo, reverse=True)
+
+class Tournament:
+    """Schedules games between entrants and plays them with n_workers processes.
+
+    openings: picklable function from an opening index to a starting position,
+        eg. NgoOpenings
+    n_openings: openings played by each pairing, each once with either player first
+    resultsPath: JSON lines file results are appended to and resumed from
+    n_workers: worker processes, defaults to the number of cores. With 0 games are
+        played in this process.
+    gamesPerTask: most games sent to a worker at once. Games between greedy
+        agents in the same task are played in lockstep (see LockstepGames).
+    """
+
+    def __init__(self,
+        entrants: List[Entrant],
+        openings: Callable[[int], AbstractGameState],
+        n_openings: int,
+        resultsPath: Path | None = None,
+        n_workers: int | None = None,
+        gamesPerTask: int = 64,
+    ):
+        names = [entrant.name for entrant in entrants]
+        if len(set(names)) != len(names):
+            raise ValueError("Entrant names must be unique")
+        self.entrants = entrants
+        self.openings = openings
+        self.n_openings = n_openings
+        self.resultsPath = Path(resultsPath) if resultsPath is not None else None
+        self.n_workers = os.cpu_count() if n_workers is None else n_workers
+        self.gamesPerTask = gamesPerTask
+        self.results: Dict[Tuple[str, str, int, int], GameResult] = {}
+        self.onResult: Callable[[GameResult], None] | None = None
+        if self.resultsPath is not None and self.resultsPath.exists():
+            self._loadResults()
+
+    @property
+    def names(self) -> List[str]:
+        return [entrant.name for entrant in self.entrants]
+
+    def _loadResults(self):
+        with open(self.resultsPath) as f:
+            for line in f:
+                # A run interrupted while writing can leave a partial last line
+                try:
+                    result = GameResult(**json.loads(line))
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                self.results[result.key] = result
+
+    def pairingGames(self, a: str, b: str, round: int = 0) -> List[Tuple[str, str, int, int]]:
+        """Keys of the games between a and b"""
+        keys = []
+        for opening in range(self.n_openings):
+            keys.append((a, b, opening, round))
+            keys.append((b, a, opening, round))
+        return keys
+
+    def roundRobin(self) -> List[Rating]:
+        """Plays every pairing of entrants"""
+        names = self.names
+        keys = []
+        for i, a in enumerate(names):
+            for b in names[i+1:]:
+                keys += self.pairingGames(a, b)
+        self.play(keys)
+        return self.ratings()
+
+    def swiss(self, rounds: int) -> List[Rating]:
+        """Plays rounds where entrants with similar scores so far are paired, each
+        pair at most once where possible. With an odd number of entrants the
+        lowest entrant without a bye sits out each round. A round's pairs only
+        depend on the earlier rounds, so resuming recomputes them and plays the
+        games missing from the results."""
+        byes = set()
+        for round in range(1, rounds + 1):
+            pairs, bye = self._swissPairs(round, byes)
+            if bye is not None:
+                byes.add(bye)
+            self.play([key for a, b in pairs for key in self.pairingGames(a, b, round)])
+        return self.ratings()
+
+    def _swissPairs(self, round: int, byes: set) -> Tuple[List[Tuple[str, str]], str | None]:
+        scores = {name: 0.0 for name in self.names}
+        met = set()
+        for result in self.results.values():
+            if 0 < result.round < round and result.first in scores and result.second in scores:
+                scores[result.first] += result.score
+                scores[result.second] += 1 - result.score
+                met.add(frozenset((result.first, result.second)))
+        standings = sorted(self.names, key=lambda name: -scores[name])
+
+        bye = None
+        if len(standings) % 2 == 1:
+            bye = next(
+                (name for name in reversed(standings) if name not in byes), standings[-1]
+            )
+            standings.remove(bye)
+
+        pairs = []
+        while standings:
+            a = standings.pop(0)
+            b = next((name for name in standings if frozenset((a, name)) not in met), standings[0])
+            standings.remove(b)
+            pairs.append((a, b))
+        return pairs, bye
+
+    def play(self, keys: List[Tuple[str, str, int, int]]):
+        """Plays the games which aren't already in the results"""
+        keys = [key for key in keys if key not in self.results]
+        if not keys:
+            return
+        # Small enough tasks to keep every worker busy
+        taskSize = min(self.gamesPerTask, math.ceil(len(keys) / max(self.n_workers, 1)))
+        tasks = [keys[i:i + taskSize] for i in range(0, len(keys), taskSize)]
+        if self.n_workers == 0:
+            _initWorker(self.entrants, self.openings)
+            for task in tasks:
+                for result in _playScheduledGames(task):
+                    self._record(result)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.n_workers, len(tasks)),
+            mp_context=mp.get_context("spawn"),
+            initializer=_initWorker,
+            initargs=(self.entrants, self.openings),
+        ) as executor:
+            futures = [executor.submit(_playScheduledGames, task) for task in tasks]
+            for future in as_completed(futures):
+                for result in future.result():
+                    self._record(result)
+
+    def _record(self, result: GameResult):
+        self.results[result.key] = result
+        if self.resultsPath is not None:
+            with open(self.resultsPath, "a") as f:
+                f.write(json.dumps(asdict(result), separators=(",", ":")) + "\n")
+        if self.onResult is not None:
+            self.onResult(result)
+
+    def ratings(self) -> List[Rating]:
+        return ratings(self.results.values(), self.names)
+
+def minimaxCheckpointAgent(agentClass, checkpointPath: Path, max_depth: int = 0) -> AbstractAgent:
+    """MinimaxAgent scoring with a saved td model checkpoint, loaded through the
+    process's shared ModelRegistry. Use with functools.partial as an Entrant's
+    makeAgent."""
+    from .minimax import MinimaxAgent
+    from .modelRegistry import sharedRegistry
+    return MinimaxAgent(sharedRegistry(agentClass).agent(checkpointPath), max_depth)
+
+def checkpointEntrants(agentClass, checkpointPaths: List[Path], max_depth: int = 0) -> List[Entrant]:
+    """Entrants for td model checkpoints, named by their paths' names. The flat
+    weights of each checkpoint are exported first, so the workers don't export
+    the same checkpoint at once."""
+    from .modelRegistry import sharedRegistry
+    for path in checkpointPaths:
+        sharedRegistry(agentClass).agent(path)
+    return [
+        Entrant(Path(path).name, partial(minimaxCheckpointAgent, agentClass, Path(path), max_depth))
+        for path in checkpointPaths
+    ]
+
+def formatRatings(table: List[Rating]) -> str:
+    lines = [f"{'name':<20} {'elo':>7} {'95% interval':>17} {'games':>6} {'score':>7}"]
+    for rating in table:
+        lines.append(
+            f"{rating.name:<20} {rating.elo:7.0f} "
+            f"{f'[{rating.lower:.0f}, {rating.upper:.0f}]':>17} {rating.games:6d} {rating.score:7.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import List
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+class TranspositionEntry:
+    """Result of searching a position to a given depth.
+
+    value: exact score when bound is EXACT, otherwise a lower or upper bound on it
+    bestChildIndex: index in next_moves of the best move found, or None
+    transform: symmetry transform of the stored position, when keyed on canonical
+        positions. bestChildIndex only applies to positions with the same transform
+    """
+    __slots__ = ("key", "depth", "value", "bound", "bestChildIndex", "generation", "transform")
+
+    def __init__(self,
+        key: int,
+        depth: int,
+        value: float,
+        bound: int,
+        bestChildIndex: int | None,
+        generation: int,
+        transform: int = 0
+    ):
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.bound = bound
+        self.bestChildIndex = bestChildIndex
+        self.generation = generation
+        self.transform = transform
+
+class TranspositionTable:
+    """Fixed size table of search results indexed by zobrist hash.
+
+    Each hash maps to a single slot. An occupied slot is replaced by a result for
+    the same position, a result from a newer search or a result searched at least
+    as deep.
+    """
+
+    def __init__(self, size: int = 2**18):
+        self.size = size
+        self.generation = 0
+        self._entries: List[TranspositionEntry | None] = [None] * size
+
+    def newSearch(self):
+        """Marks existing entries as stale, so they're replaced in preference"""
+        self.generation += 1
+
+    def clear(self):
+        self._entries = [None] * self.size
+        self.generation = 0
+
+    def probe(self, key: int) -> TranspositionEntry | None:
+        entry = self._entries[key % self.size]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store(self,
+        key: int,
+        depth: int,
+        value: float,
+        bound: int,
+        bestChildIndex: int | None = None,
+        transform: int = 0
+    ):
+        slot = key % self.size
+        entry = self._entries[slot]
+        replace = (
+            entry is None
+            or entry.key == key
+            or entry.generation != self.generation
+            or depth >= entry.depth
+        )
+        if replace:
+            self._entries[slot] = TranspositionEntry(
+                key, depth, value, bound, bestChildIndex, self.generation, transform
+            )
@@ -1,8 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
 
-import tensorflow as tf
-
 
 @dataclass
 class TurnTracker:
@@ -48,4 +46,5 @@ class TurnTracker:
         return (self.last_player_to_move + 1) % self.number_players
 
     def asTensor(self):
+        import tensorflow as tf
         return tf.constant([self.current_player, self.current_turn_step], dtype=tf.int32)
\ No newline at end of file
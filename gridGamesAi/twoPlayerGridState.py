@@ -21,6 +21,25 @@ def get_COM_weights(shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
     weightsY = np.transpose(np.tile(weightsY, (x,1)))
     return weightsX, weightsY
 
+def flipCenterOfMassToUpperLeftBelowDiagonalBatch(grids: np.ndarray) -> np.ndarray:
+    """Batch version of TwoPlayerGridState.flipCenterOfMassToUpperLeftBelowDiagonal,
+    for grids of shape (N, 2, x, x)"""
+    grids = np.asarray(grids)
+    combined_grids = np.sum(grids, axis=1)
+    weightsX, weightsY = get_COM_weights(combined_grids.shape[1:])
+    comX = np.sum(weightsX * combined_grids, axis=(1, 2))
+    comY = np.sum(weightsY * combined_grids, axis=(1, 2))
+    comXY = comX - comY
+
+    flipX = comX > 0
+    grids = np.where(flipX[:, None, None, None], np.flip(grids, -1), grids)
+    comXY = np.where(flipX, -comXY, comXY)
+    flipY = comY > 0
+    grids = np.where(flipY[:, None, None, None], np.flip(grids, -2), grids)
+    comXY = np.where(flipY, -comXY, comXY)
+    transpose = comXY > 0
+    return np.where(transpose[:, None, None, None], np.swapaxes(grids, -2, -1), grids)
+
 @dataclass
 class TwoPlayerGridState:
     """Represents a playing grid for two players, where only one
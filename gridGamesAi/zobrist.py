@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class ZobristKeys:
+    """Random 64 bit keys for Zobrist hashing of two player grid game positions.
+
+    The hash of a position is the XOR of the key of every placed piece and the key
+    of the current turn, so it can be updated incrementally by XOR-ing the keys of
+    only the gridspaces which changed in a move.
+    """
+
+    def __init__(self, n_cells: int, n_players: int = 2, n_turn_steps: int = 1, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.pieceKeysArray = rng.integers(
+            0, 2**63, size=(n_players, n_cells), dtype=np.int64
+        )
+        self.pieceKeys = self.pieceKeysArray.tolist()
+        self.turnKeys = rng.integers(
+            0, 2**63, size=(n_players, n_turn_steps), dtype=np.int64
+        ).tolist()
+
+    def turnKey(self, current_player: int, turn_step: int) -> int:
+        return self.turnKeys[current_player][turn_step]
+
+    def hashGrids(self, flat_grids: np.ndarray) -> int:
+        """Hash of the pieces on flat_grids, of shape (n_players, n_cells), excluding
+        the turn key"""
+        occupied = np.asarray(flat_grids) != 0
+        return int(np.bitwise_xor.reduce(self.pieceKeysArray[occupied]))
+
+    def hashChangesBatch(self, flat_grid: np.ndarray, next_flat_grids: np.ndarray) -> np.ndarray:
+        """For each grid in next_flat_grids, of shape (k, n_players, n_cells), the XOR
+        of the keys of the gridspaces which differ from flat_grid. XOR-ing this
+        with the hash of flat_grid gives the pieces hash of the next grid."""
+        changed = np.asarray(next_flat_grids) != np.asarray(flat_grid)[None]
+        changed_keys = np.where(changed, self.pieceKeysArray[None], 0)
+        return np.bitwise_xor.reduce(changed_keys.reshape((len(changed_keys), -1)), axis=1)
@@ -11,6 +11,7 @@ import numpy as np
 from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
 from gridGamesAi.ngo.modelManager import ModelManager
 from gridGamesAi.ngo.resolvedPositions import ResolvedPositions
+from gridGamesAi.tablebase import GridRules, Tablebase
 
 
 alpha_model_dir = NGO_MODELS_DIR / "alpha_4x4_with_rotation"
@@ -22,19 +23,31 @@ beta_runner = NgoGameRunner(2, 4, True)
 # model_dir, runner = alpha_model_dir, alpha_runner
 model_dir, runner = beta_model_dir, beta_runner
 
-model = ModelManager(
-    model_dir, runner
-)
-
-resolved_positions = ResolvedPositions(runner)
-print("Generating resolved positions...")
-resolved_positions.add_winning_positions(10, 0, 3)
-print("Halfway there...")
-resolved_positions.add_winning_positions(10, 1, 3)
-print("Finished generating resolved positions.")
-
-for path in model.get_sorted_model_paths():
-    model.current_model_path = path
-    model.load_model(True)
-    score = model.rate_against_resolved_positions(resolved_positions)
-    print(score)
\ No newline at end of file
+def main():
+    model = ModelManager(
+        model_dir, runner
+    )
+
+    # Exact values of every 4x4 position, solved on the first run (a few minutes)
+    tablebase = Tablebase.loadOrSolve(
+        GridRules.fromNgoRunner(runner),
+        NGO_MODELS_DIR / "4x4_with_rotation.tablebase.npy",
+        verbose=True,
+    )
+
+    resolved_positions = ResolvedPositions(runner)
+    print("Generating resolved positions...")
+    resolved_positions.add_tablebase_positions(tablebase, 2000, np.random.default_rng(0))
+    for player in (0, 1):
+        resolved_positions.add_winning_positions(
+            2000, player, 3, seed=player, cache_dir=NGO_MODELS_DIR / "resolvedPositions"
+        )
+    print("Finished generating resolved positions.")
+
+    start = time()
+    for path, score in model.rate_checkpoints(resolved_positions).items():
+        print(f"{path.stem}: {score}")
+    print(f"Rated in {time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
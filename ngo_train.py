@@ -22,23 +22,39 @@ beta_runner = NgoGameRunner(2, 4, True)
 # model_dir, runner = alpha_model_dir, alpha_runner
 model_dir, runner = beta_model_dir, beta_runner
 
-model = ModelManager(
-    model_dir, runner
-)
+# Number of self play worker processes, or 0 to train in this process
+parallel_workers = 0
+# Train with minibatches from a replay buffer rather than game by game
+use_replay_learner = False
+# Keep the self play games trained on in a game log in the model directory
+log_self_play_games = False
+
+if __name__ == "__main__":
+    model = ModelManager(
+        model_dir, runner
+    )
 
-try:
-    model.load_latest_model()
     try:
-        model.ml_agent.plot_training_total_moves()
-    except (TypeError) as e:
-        print(e)
-except (IndexError):
-    model.new_model()
-
-if model.base_path == beta_model_dir:
-    model.ml_agent.td_model.batch_size = 20
-    model.new_save_file_after_training_calls = 2000
-
-model.training_model_moves_at_start = 10
-model.training_random_moves = 3
-model.train()
\ No newline at end of file
+        model.load_latest_model()
+        try:
+            model.ml_agent.plot_training_total_moves()
+        except (TypeError) as e:
+            print(e)
+    except (IndexError):
+        model.new_model()
+
+    if model.base_path == beta_model_dir:
+        model.ml_agent.td_model.batch_size = 20
+        model.new_save_file_after_training_calls = 2000
+
+    if use_replay_learner:
+        model.ml_agent.create_td_learner()
+    if log_self_play_games:
+        model.open_game_log()
+
+    model.training_model_moves_at_start = 10
+    model.training_random_moves = 3
+    if parallel_workers:
+        model.train_parallel(parallel_workers)
+    else:
+        model.train()
\ No newline at end of file
@@ -9,11 +9,17 @@ from gridGamesAi.pentago.gameState import PentagoGameState
 from gridGamesAi.ngo.render import NgoRender, UserNgoAgent
 from gridGamesAi.agents import RandomAgent
 from gridGamesAi.game import Game
+from gridGamesAi.gameLog import GameLogWriter
 from gridGamesAi.pentago.temporal_difference_model import Pentago_TD_Agent
 
 MOD_PATH = None
 LOAD_MOD_PATH = PENTAGO_MODELS_DIR / "alpha_model_32000"
 
+# Train with minibatches from a replay buffer rather than game by game
+use_replay_learner = False
+# Keep the self play games trained on in a game log in the models directory
+log_self_play_games = False
+
 def update_save_path(training_calls):
     global SAVE_MOD_PATH
     SAVE_MOD_PATH = PENTAGO_MODELS_DIR / f"alpha_model_{training_calls}"
@@ -31,6 +37,12 @@ randAgent = RandomAgent()
 
 pentAgent.plot_training_total_moves()
 pentAgent.td_model.batch_size = 20
+if use_replay_learner:
+    pentAgent.create_td_learner()
+if log_self_play_games:
+    pentAgent.gameLog = GameLogWriter(
+        PENTAGO_MODELS_DIR / "selfPlay.gamelog", len(PentagoGameState().asNumpy()), {"game": "pentago"}
+    )
 
 update_save_path(math.ceil((pentAgent.training_calls)/4000)*4000)
 print(SAVE_MOD_PATH)
@@ -1,7 +1,22 @@
 import unittest
 from tests.turnTrackerTest import TurnTrackerTestCase
-from tests.pentagoTest import pentagoGameStateTestCase, PentagoNaiveScoreTestCase
-from tests.TDmodelTest import TDmodelTestCase
+from tests.pentagoTest import pentagoGameStateTestCase, PentagoBitboardTestCase, PentagoNaiveScoreTestCase, PentagoArrayScoringTestCase
+from tests.TDmodelTest import TDmodelTestCase, PentagoTDAgentTestCase, TDLearnerTestCase
+from tests.ngoRunnerTest import NgoRunnerBackendTestCase
+from tests.scoringAgentsTest import ScoreManyTestCase
+from tests.minimaxTest import ZobristHashTestCase, TranspositionTableTestCase, PruningAgentTestCase, MoveOrderingTestCase, NegamaxSearchTestCase
+from tests.symmetryTest import SymmetryTestCase
+from tests.ngoSelfPlayTest import NgoSelfPlayTestCase
+from tests.numpyInferenceTest import NumpyInferenceTestCase
+from tests.importTimeTest import ImportTimeTestCase
+from tests.modelRegistryTest import ModelRegistryTestCase
+from tests.tournamentTest import TournamentTestCase
+from tests.lockstepTest import LockstepGamesTestCase
+from tests.benchmarkSuiteTest import BenchmarkSuiteTestCase
+from tests.mctsTest import MCTSTestCase
+from tests.tablebaseTest import TablebaseTestCase
+from tests.resolvedPositionsTest import ResolvedPositionsTestCase
+from tests.gameLogTest import GameLogTestCase
 # from tests.goInterfaceTest import goInterfaceTestCase
 
 if __name__ == "__main__":
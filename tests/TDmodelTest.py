@@ -2,7 +2,9 @@ import unittest
 import tensorflow as tf
 import numpy as np
 
-from gridGamesAi.pentago.temporal_difference_model import TD_model
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.pentago.temporal_difference_model import TD_model, Pentago_TD_Agent
+from gridGamesAi.tdLearning import ReplayBuffer, TDLearner, compiledPredict, compiledTDGradients, eagerPredict, lambdaReturns
 
 class TDmodelTestCase(unittest.TestCase):
     def test_generate_td_weights(self):
@@ -25,4 +27,74 @@ class TDmodelTestCase(unittest.TestCase):
     
 
 
-    
\ No newline at end of file
+    
+class PentagoTDAgentTestCase(unittest.TestCase):
+    def test_arrayModelInputMatchesGameStates(self):
+        agent = Pentago_TD_Agent()
+        gameStates = []
+        gs = PentagoGameState()
+        while not gs.isEnd:
+            gameStates += gs.next_moves[:4]
+            gs = gs.next_moves[len(gameStates) % len(gs.next_moves)]
+        arrays = np.stack([gs.asNumpy() for gs in gameStates]).astype(np.int32)
+        np.testing.assert_array_equal(
+            agent._modelInputArrays(arrays),
+            [agent._modelInputState(gs).asNumpy() for gs in gameStates]
+        )
+
+class TDLearnerTestCase(unittest.TestCase):
+    def test_lambdaReturns(self):
+        scores = np.array([0.1, -0.3, 0.5, 0.2, 1.0])
+        expected = [scores[-1]]
+        for score in scores[-2:0:-1]:
+            expected.insert(0, 0.3 * score + 0.7 * expected[0])
+        np.testing.assert_allclose(lambdaReturns(scores, 0.7), expected)
+        np.testing.assert_allclose(lambdaReturns(scores, 0.0), scores[1:])
+        np.testing.assert_allclose(lambdaReturns(scores, 1.0), [1.0] * 4)
+
+    def test_replayBufferOverwritesOldest(self):
+        buffer = ReplayBuffer(4, 2)
+        buffer.add(np.arange(6).reshape((3, 2)), np.arange(3))
+        buffer.add(np.arange(6, 10).reshape((2, 2)), np.arange(3, 5))
+        self.assertEqual(len(buffer), 4)
+        self.assertCountEqual(buffer.targets, [1, 2, 3, 4])
+        states, targets = buffer.sample(8, np.random.default_rng(0))
+        np.testing.assert_array_equal(states[:, 0], targets * 2)
+
+    def test_learnerFitsTargets(self):
+        inputs = tf.keras.Input(shape=(4,))
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(1)(inputs))
+        model.compile(optimizer=tf.keras.optimizers.SGD(0.1), loss="mse")
+        learner = TDLearner(model, capacity=64, batch_size=8, td_lambda=0.0)
+        learner.rng = np.random.default_rng(0)
+        states = np.eye(4, dtype=np.float32)
+        for _ in range(200):
+            learner.add_game(states, np.array([0, 0.5, -0.5, 0.25]))
+        np.testing.assert_allclose(model(states[:3]).numpy()[:, 0], [0.5, -0.5, 0.25], atol=0.05)
+
+    def test_compiledPredictMatchesEager(self):
+        inputs = tf.keras.Input(shape=(74,))
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(1, activation="tanh")(inputs))
+        states = np.random.default_rng(0).integers(0, 2, size=(13, 74))
+        np.testing.assert_allclose(
+            compiledPredict(model)(states), eagerPredict(model)(states), rtol=1e-5
+        )
+
+    def test_compiledTDGradientsMatchPerStateGradients(self):
+        inputs = tf.keras.Input(shape=(6,))
+        hidden = tf.keras.layers.Dense(4, activation="relu")(inputs)
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(1, activation="tanh")(hidden))
+        rng = np.random.default_rng(1)
+        states = rng.normal(size=(4, 6)).astype(np.float32)
+        weights = rng.normal(size=4)
+
+        expected = [np.zeros(v.shape) for v in model.trainable_variables]
+        for state, weight in zip(states, weights):
+            with tf.GradientTape() as tape:
+                score = model(state[None, :])
+            for e, g in zip(expected, tape.gradient(score, model.trainable_variables)):
+                e += weight * g.numpy()
+
+        result = compiledTDGradients(model)(states, weights)
+        for a, b in zip(result, expected):
+            np.testing.assert_allclose(a.numpy(), b, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,51 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from benchmarks.suite import Benchmark, SUITES, compare, runSuites, samplePositions, uncached
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+
+class BenchmarkSuiteTestCase(unittest.TestCase):
+    def test_resultsAreJson(self):
+        results = runSuites(["games", "search"], repeats=1, nameFilter="tictactoe", verbose=False)
+        results = json.loads(json.dumps(results))
+        names = [result["name"] for result in results["results"]]
+        self.assertIn("tictactoe/next_moves", names)
+        self.assertIn("tictactoe/PruningAgent depth 8", names)
+        for result in results["results"]:
+            self.assertGreater(result["count"], 0)
+            self.assertGreater(result["rate"], 0)
+
+        slower = json.loads(json.dumps(results))
+        for result in slower["results"]:
+            result["rate"] /= 2
+        self.assertEqual(compare(results, results), [])
+        self.assertEqual(compare(slower, results), names)
+        self.assertEqual(results["errors"], [])
+
+    def test_failuresAreReported(self):
+        def brokenGame():
+            raise ImportError("no engine")
+        def brokenRun(inputs):
+            raise ValueError("bad position")
+        broken = {
+            "broken game": brokenGame,
+            "broken run": lambda: [Benchmark("tictactoe/broken", "calls", lambda: None, brokenRun)],
+        }
+        with patch.dict(SUITES, {"broken": broken}):
+            results = runSuites(["broken", "games"], repeats=1, nameFilter="tictactoe", verbose=False)
+        self.assertEqual(results["errors"], [
+            {"name": "broken/broken game", "error": "ImportError: no engine"},
+            {"name": "tictactoe/broken", "error": "ValueError: bad position"},
+        ])
+        self.assertIn("tictactoe/next_moves", [result["name"] for result in results["results"]])
+
+    def test_uncachedPositionsAreEvaluatedAgain(self):
+        positions = samplePositions(NgoGameState(None, None, NgoGameRunner(2, 4, True)), 1)
+        gameState = positions[len(positions)//2]
+        gameState.next_moves
+        fresh = uncached(gameState)
+        self.assertNotIn("next_moves", fresh.__dict__)
+        self.assertNotIn("_winInfo", fresh.__dict__)
+        self.assertIsNot(fresh.savedScores, gameState.savedScores)
+        self.assertTrue(fresh == gameState)
@@ -0,0 +1,119 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gridGamesAi.agents import RandomAgent
+from gridGamesAi.game import Game
+from gridGamesAi.gameLog import GameLogReader, GameLogWriter, GameRecorder, endScore
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+
+def randomGame(runner, rng):
+    movesSequence = [NgoGameState.fairVariant(runner)]
+    agent = RandomAgent(rng)
+    while not movesSequence[-1].isEnd:
+        movesSequence.append(agent.move(movesSequence[-1]))
+    return movesSequence
+
+class GameLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "games.gamelog"
+        self.runner = NgoGameRunner(2, 4, True)
+        rng = np.random.default_rng(0)
+        self.games = [randomGame(self.runner, rng) for _ in range(5)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writeGames(self, games):
+        with GameLogWriter(self.path, 34, {"game": "ngo"}) as writer:
+            for version, movesSequence in enumerate(games):
+                writer.appendMovesSequence(movesSequence, version)
+
+    def test_gamesAreReadBack(self):
+        self.writeGames(self.games)
+        reader = GameLogReader(self.path)
+        self.assertEqual(reader.metadata, {"game": "ngo"})
+        self.assertEqual(len(reader), 5)
+        for version, (record, movesSequence) in enumerate(zip(reader, self.games)):
+            np.testing.assert_array_equal(
+                record.states, np.stack([gameState.asNumpy() for gameState in movesSequence])
+            )
+            self.assertEqual(record.end_score, endScore(movesSequence[-1]))
+            self.assertEqual(record.total_moves, movesSequence[-1].turnTracker.total_moves)
+            self.assertEqual(record.model_version, version)
+        # 34 values packed into 5 bytes per position
+        plies = sum(len(movesSequence) for movesSequence in self.games)
+        self.assertEqual(Path(str(self.path) + ".plies").stat().st_size, plies * 5)
+        self.assertIsInstance(reader.plies, np.memmap)
+
+    def test_appendingReopensTheLog(self):
+        self.writeGames(self.games[:2])
+        self.writeGames(self.games[2:])
+        reader = GameLogReader(self.path)
+        self.assertEqual(len(reader), 5)
+        self.assertEqual([record.model_version for record in reader], [0, 1, 0, 1, 2])
+        with self.assertRaises(ValueError):
+            GameLogWriter(self.path, 36)
+
+    def test_cutOffGamesAreDropped(self):
+        self.writeGames(self.games[:3])
+        # As if writing the last game's positions was interrupted
+        pliesPath = Path(str(self.path) + ".plies")
+        with open(pliesPath, "r+b") as f:
+            f.truncate(pliesPath.stat().st_size - 7)
+        self.assertEqual(len(GameLogReader(self.path)), 2)
+
+        self.writeGames(self.games[3:])
+        reader = GameLogReader(self.path)
+        self.assertEqual(len(reader), 4)
+        np.testing.assert_array_equal(
+            reader[2].states, np.stack([gameState.asNumpy() for gameState in self.games[3]])
+        )
+
+    def test_duplicateGamesAreFound(self):
+        self.writeGames([self.games[0], self.games[1], self.games[0], self.games[2], self.games[1]])
+        np.testing.assert_array_equal(GameLogReader(self.path).uniqueGames(), [0, 1, 3])
+
+    def test_onlyBinaryPositionsAreLogged(self):
+        with GameLogWriter(self.path, 3) as writer:
+            with self.assertRaises(ValueError):
+                writer.append(np.array([[0, 2, 1]]), 0.0, 1)
+            with self.assertRaises(ValueError):
+                writer.append(np.array([[0, 1]]), 0.0, 1)
+
+    def test_recorderLogsGamesAsTheyEnd(self):
+        states = []
+        with GameLogWriter(self.path, 34) as writer:
+            start = NgoGameState.fairVariant(self.runner)
+            game = Game(
+                [RandomAgent(np.random.default_rng(1)), RandomAgent(np.random.default_rng(2))],
+                start, GameRecorder(writer, start, 7, states.append),
+            )
+            while not game.current_game_state.isEnd:
+                game.moveWithCurrentPlayer()
+        reader = GameLogReader(self.path)
+        self.assertEqual(len(reader), 1)
+        self.assertEqual(len(reader[0].states), len(states) + 1)
+        self.assertEqual(reader[0].model_version, 7)
+        self.assertEqual(reader[0].end_score, endScore(game.current_game_state))
+
+    def test_trainingLogsSelfPlayGames(self):
+        from gridGamesAi.ngo.modelManager import ModelManager
+        model = ModelManager(Path(self.directory.name) / "model", self.runner)
+        model.new_model()
+        model.open_game_log()
+        model.ml_agent.train_td_from_game(NgoGameState.fairVariant(self.runner))
+        model.ml_agent.gameLog.close()
+
+        reader = GameLogReader(model.base_path / "selfPlay.gamelog")
+        self.assertEqual(reader.metadata["size_quadrant"], 2)
+        self.assertEqual(len(reader), 1)
+        self.assertEqual(reader[0].total_moves, model.ml_agent.trainingCall_totalMoves[-1][1])
+        # Logged games can be trained on again
+        model.ml_agent.gameLog = None
+        model.ml_agent.train_td_from_self_play_game(reader[0])
+        self.assertEqual(model.ml_agent.training_calls, 2)
+        self.assertEqual(model.get_sorted_model_paths(), [])
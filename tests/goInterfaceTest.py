@@ -1,7 +1,7 @@
 from time import time
 import unittest
 
-from gridGamesAi.pentago.go_interface import goMinimaxMove, goSelfPlay
+from gridGamesAi.pentago.go_interface import goMinimaxMove, goMinimaxMoveBatched, goSelfPlay, goSelfPlayBatched
 from gridGamesAi.paths import PENTAGO_MODELS_DIR
 from gridGamesAi.pentago.gameState import PentagoGameState
 from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
@@ -19,6 +19,18 @@ class goInterfaceTestCase(unittest.TestCase):
             print(g2)
             self.assertTrue(False)
 
+    def test_c_interface_batched(self):
+        agent = PentagoNaiveScoringAgent()
+        g = PentagoGameState.fairVariant()
+        g1 = goMinimaxMoveBatched(g, 0, agent.score_arrays)
+        g2 = goMinimaxMove(g, 0, agent.score)
+        self.assertEqual(agent.score(g1), agent.score(g2))
+
+    def test_selfPlayBatched(self):
+        scoreAgent = Pentago_TD_Agent(PENTAGO_MODELS_DIR / "test_model_2000")
+        moves = goSelfPlayBatched(PentagoGameState.fairVariant(), 0, scoreAgent.score_arrays)
+        self.assertTrue(moves[-1].isEnd)
+
     def test_selfPlay(self):
         scoreAgent = Pentago_TD_Agent(PENTAGO_MODELS_DIR / "test_model_2000")
         score = scoreAgent.score
@@ -0,0 +1,21 @@
+import unittest
+from unittest.mock import patch
+
+from benchmarks.importTime import LIGHTWEIGHT_MODULES, measureImport
+from gridGamesAi.pentago import go_interface
+
+class ImportTimeTestCase(unittest.TestCase):
+    def test_lightweightModulesSkipHeavyImports(self):
+        # Import times depend on the machine's load, see benchmarks/importTime.py
+        for module in LIGHTWEIGHT_MODULES:
+            with self.subTest(module=module):
+                _, heavy, nativeLoaded = measureImport(module)
+                self.assertEqual(heavy, [])
+                self.assertFalse(nativeLoaded)
+
+    def test_outdatedGoLibraryIsUnavailable(self):
+        # A library without the batched functions fails when their argtypes are set
+        with patch.object(go_interface, "loadLibrary", side_effect=AttributeError("C_Minimax_Move_Batched")):
+            self.assertFalse(go_interface.libraryAvailable.__wrapped__())
+        with patch.object(go_interface, "loadLibrary", side_effect=OSError("_goPentago.so")):
+            self.assertFalse(go_interface.libraryAvailable.__wrapped__())
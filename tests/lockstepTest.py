@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from gridGamesAi.game import Game
+from gridGamesAi.lockstep import LockstepGames, greedyScoringAgent
+from gridGamesAi.minimax import MinimaxAgent
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.scoringAgent import NgoNaiveScoringAgent
+from gridGamesAi.numpyInference import DenseNetwork, NumpyTDScoringAgent
+
+class LockstepGamesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.runner = NgoGameRunner(2, 4, True)
+        rng = np.random.default_rng(0)
+        self.startingPositions = [
+            NgoGameState.init_with_n_random_placements(2, self.runner, rng) for _ in range(12)
+        ]
+        network = DenseNetwork(
+            [rng.normal(size=(34, 8)), rng.normal(size=(8, 1))],
+            [rng.normal(size=8), rng.normal(size=1)],
+            ["relu", "tanh"],
+        )
+        self.agents = [NgoNaiveScoringAgent(), NumpyTDScoringAgent(network, "ngo")]
+
+    def playedSequentially(self, players):
+        finalStates = []
+        for startingPosition, pair in zip(self.startingPositions, players):
+            game = Game([MinimaxAgent(agent, 0) for agent in pair], startingPosition)
+            while not game.current_game_state.isEnd:
+                game.moveWithCurrentPlayer()
+            finalStates.append(game.current_game_state)
+        return finalStates
+
+    def test_matchesSequentialGames(self):
+        players = [
+            [self.agents[i % 2], self.agents[(i // 2) % 2]]
+            for i in range(len(self.startingPositions))
+        ]
+        games = LockstepGames(self.startingPositions, players)
+        finalStates = games.run()
+        for lockstepState, sequentialState in zip(finalStates, self.playedSequentially(players)):
+            self.assertTrue(lockstepState == sequentialState)
+            self.assertTrue(lockstepState.isEnd)
+
+    def test_batchesAcrossGames(self):
+        players = [[self.agents[1], self.agents[1]] for _ in self.startingPositions]
+        games = LockstepGames(self.startingPositions, players)
+        games.run()
+        # One score_many call per step, rather than per move of each game
+        self.assertEqual(games.scoreCalls, max(games.moves))
+        self.assertLess(games.scoreCalls * 2, sum(games.moves))
+
+    def test_greedyAgentsOnly(self):
+        self.assertIs(greedyScoringAgent(MinimaxAgent(self.agents[0], 0)), self.agents[0])
+        self.assertIsNone(greedyScoringAgent(MinimaxAgent(self.agents[0], 1)))
+        with self.assertRaises(ValueError):
+            LockstepGames(
+                self.startingPositions[:1], [[MinimaxAgent(self.agents[0], 1), self.agents[0]]]
+            )
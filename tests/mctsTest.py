@@ -0,0 +1,95 @@
+import math
+import unittest
+
+import numpy as np
+
+from gridGamesAi.game import Game
+from gridGamesAi.mcts import MCTSAgent, NodeStore
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.scoringAgent import NgoNaiveScoringAgent
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
+from gridGamesAi.tictactoe.gameState import TicTacToeGameState
+from gridGamesAi.tictactoe.scoringAgent import TicTacToeManualScoringAgent
+
+class MCTSTestCase(unittest.TestCase):
+    def setUp(self):
+        self.runner = NgoGameRunner(2, 4, True)
+        self.ngoState = NgoGameState.init_with_n_random_placements(
+            2, self.runner, np.random.default_rng(0)
+        )
+
+    def test_takesWinningMove(self):
+        gs = TicTacToeGameState().place((0,0)).place((1,0)).place((0,1)).place((1,1))
+        nextState = MCTSAgent(TicTacToeManualScoringAgent(), 50).move(gs)
+        self.assertTrue(nextState.isWin)
+        self.assertEqual(nextState.winPlayer, 0)
+
+    def test_blocksOpponentWin(self):
+        gs = TicTacToeGameState().place((0,0)).place((1,0)).place((2,2)).place((1,1))
+        nextState = MCTSAgent(TicTacToeManualScoringAgent(), 400).move(gs)
+        self.assertEqual(nextState.grid_0[1,2], 1)
+
+    def test_leavesAreScoredInBatches(self):
+        agent = MCTSAgent(NgoNaiveScoringAgent(), 160, batchSize=16)
+        agent.move(self.ngoState)
+        self.assertEqual(agent.simulationsRun, 160)
+        # The root's expansion, then its next moves' and one call for each batch
+        batches = math.ceil((160 - len(self.ngoState.next_moves)) / 16)
+        self.assertEqual(agent.scoreCalls, 2 + batches)
+
+    def test_subtreeIsReused(self):
+        agent = MCTSAgent(NgoNaiveScoringAgent(), 200)
+        nextState = agent.move(self.ngoState)
+        reply = nextState.next_moves[0]
+        node = agent.store.find(reply.zobristHash, reply.current_player)
+        self.assertIsNotNone(node)
+        visits = agent.store.visits[node]
+
+        agent.move(reply)
+        self.assertEqual(agent.store.visits[0], visits + 200)
+        self.assertEqual(agent.store.parent[0], -1)
+        for child in agent.store.children(0):
+            self.assertEqual(agent.store.parent[child], 0)
+
+        agent.reuseTree = False
+        agent.move(reply)
+        self.assertEqual(agent.store.visits[0], 200)
+
+    def test_subtreeKeepsStatistics(self):
+        agent = MCTSAgent(NgoNaiveScoringAgent(), 100)
+        agent.move(self.ngoState)
+        store = agent.store
+        child = max(store.children(0), key=lambda node: store.visits[node])
+        subtree = store.subtree(child)
+        self.assertEqual(subtree.visits[0], store.visits[child])
+        self.assertEqual(
+            [subtree.score[node] for node in subtree.children(0)],
+            [store.score[node] for node in store.children(child)],
+        )
+        self.assertEqual(set(subtree.states), {
+            node for node in range(subtree.size)
+            if subtree.firstChild[node] < 0 and not subtree.terminal[node]
+        })
+
+    def test_storeGrows(self):
+        store = NodeStore(2)
+        store.add([self.ngoState])
+        store.add(self.ngoState.next_moves, 0)
+        self.assertEqual(store.size, 1 + len(self.ngoState.next_moves))
+        self.assertTrue(np.all(store.parent[1:store.size] == 0))
+
+    def test_playsGamesWithMultiStepTurns(self):
+        for gs, scoringAgent in [
+            (self.ngoState, NgoNaiveScoringAgent()),
+            (PentagoGameState.init_with_n_random_moves(4), PentagoNaiveScoringAgent()),
+        ]:
+            game = Game([MCTSAgent(scoringAgent, 32), MCTSAgent(scoringAgent, 32)], gs)
+            for _ in range(12):
+                if game.current_game_state.isEnd:
+                    break
+                before = game.current_game_state
+                game.moveWithCurrentPlayer()
+                self.assertTrue(any(
+                    game.current_game_state == nextState for nextState in before.next_moves
+                ))
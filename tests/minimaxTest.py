@@ -0,0 +1,219 @@
+import unittest
+
+import numpy as np
+
+from gridGamesAi.minimax import MinimaxAgent, PruningAgent
+from gridGamesAi.moveOrdering import MoveOrdering
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.scoringAgent import NgoNaiveScoringAgent
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
+from gridGamesAi.search import NegamaxSearch
+from gridGamesAi.tictactoe.gameState import TicTacToeGameState
+from gridGamesAi.tictactoe.scoringAgent import TicTacToeManualScoringAgent
+from gridGamesAi.transpositionTable import TranspositionTable, EXACT, LOWER_BOUND
+
+class ZobristHashTestCase(unittest.TestCase):
+    def test_pentagoIncrementalHashMatchesFullHash(self):
+        gs = PentagoGameState.init_with_n_random_moves(6)
+        for child in gs.next_moves + [gs.skipMove()]:
+            fresh = PentagoGameState(child.board_0, child.board_1, child.turn)
+            self.assertEqual(child.zobristHash, fresh.zobristHash)
+            for grandchild in child.next_moves[:10]:
+                fresh = PentagoGameState(grandchild.board_0, grandchild.board_1, grandchild.turn)
+                self.assertEqual(grandchild.zobristHash, fresh.zobristHash)
+
+    def test_ngoIncrementalHashMatchesFullHash(self):
+        runner = NgoGameRunner(2, 4, True)
+        gs = NgoGameState.init_with_n_random_placements(3, runner)
+        for child in gs.next_moves + [gs.skipMove(), gs.rotate("00cw")]:
+            fresh = NgoGameState(child.turnTracker, child.grid, runner)
+            self.assertEqual(child.zobristHash, fresh.zobristHash)
+            for grandchild in child.next_moves:
+                fresh = NgoGameState(grandchild.turnTracker, grandchild.grid, runner)
+                self.assertEqual(grandchild.zobristHash, fresh.zobristHash)
+
+    def test_hashDependsOnTurn(self):
+        gs = PentagoGameState.init_with_n_random_moves(2)
+        self.assertNotEqual(gs.zobristHash, gs.skipMove().zobristHash)
+
+class TranspositionTableTestCase(unittest.TestCase):
+    def test_probeRequiresMatchingKey(self):
+        table = TranspositionTable(8)
+        table.store(3, 2, 0.5, EXACT, 1)
+        self.assertIsNone(table.probe(11))
+        entry = table.probe(3)
+        self.assertEqual((entry.depth, entry.value, entry.bound, entry.bestChildIndex), (2, 0.5, EXACT, 1))
+
+    def test_replacementPolicy(self):
+        table = TranspositionTable(8)
+        table.store(3, 4, 0.5, EXACT)
+        # shallower result for a different position in the same search is discarded
+        table.store(11, 2, 0.1, EXACT)
+        self.assertIsNotNone(table.probe(3))
+        # same position is always replaced
+        table.store(3, 1, 0.2, LOWER_BOUND)
+        self.assertEqual(table.probe(3).value, 0.2)
+        # entries from an earlier search are replaced
+        table.newSearch()
+        table.store(11, 0, 0.1, EXACT)
+        self.assertIsNone(table.probe(3))
+        self.assertIsNotNone(table.probe(11))
+
+class PruningAgentTestCase(unittest.TestCase):
+    def test_ticTacToeValueMatchesWithoutTable(self):
+        gs = TicTacToeGameState().place((1, 1))
+        scoringAgent = TicTacToeManualScoringAgent()
+        withTable = PruningAgent(scoringAgent, 8)
+        withoutTable = PruningAgent(scoringAgent, 8, None)
+        self.assertEqual(
+            withTable.alphabeta(gs, 8, -1, 1),
+            withoutTable.alphabeta(gs, 8, -1, 1)
+        )
+
+    def test_ngoValueMatchesWithoutTable(self):
+        runner = NgoGameRunner(2, 4, True)
+        gs = NgoGameState.init_with_n_random_placements(4, runner)
+        scoringAgent = NgoNaiveScoringAgent()
+        withTable = PruningAgent(scoringAgent, 3)
+        withoutTable = PruningAgent(scoringAgent, 3, None)
+        self.assertAlmostEqual(
+            withTable.alphabeta(gs, 3, -1, 1),
+            withoutTable.alphabeta(gs, 3, -1, 1)
+        )
+
+    def test_moveWhenAllMovesLose(self):
+        # player 1 cannot block both of player 0's lines
+        gs = TicTacToeGameState()
+        for index in [(0, 0), (2, 2), (0, 2), (1, 1), (2, 0)]:
+            gs = gs.place(index)
+        nextMove = PruningAgent(TicTacToeManualScoringAgent(), 4).move(gs)
+        self.assertTrue(any(nextMove is child for child in gs.next_moves))
+
+    def test_iterativeDeepeningStopsAtDeadline(self):
+        gs = PentagoGameState.init_with_n_random_moves(4)
+        agent = PruningAgent(PentagoNaiveScoringAgent(), 6, max_seconds=0)
+        nextMove = agent.move(gs)
+        self.assertEqual(agent.completedDepth, 0)
+        self.assertTrue(any(nextMove is child for child in gs.next_moves))
+
+    def test_iterativeDeepeningReachesMaxDepth(self):
+        gs = TicTacToeGameState().place((1, 1))
+        scoringAgent = TicTacToeManualScoringAgent()
+        timed = PruningAgent(scoringAgent, 2, max_seconds=60)
+        fixed = PruningAgent(scoringAgent, 2)
+        timedMove = timed.move(gs)
+        self.assertEqual(timed.completedDepth, 2)
+        np.testing.assert_array_equal(timedMove.grid_0, fixed.move(gs).grid_0)
+        np.testing.assert_array_equal(timedMove.grid_1, fixed.move(gs).grid_1)
+
+    def test_retrainedScorerClearsTableAndOrdering(self):
+        gs = TicTacToeGameState().place((1, 1))
+        scoringAgent = TicTacToeManualScoringAgent()
+        scoringAgent.training_calls = 0
+        agent = PruningAgent(scoringAgent, 2)
+        child = gs.next_moves[0]
+        agent.move(gs)
+        self.assertIsNotNone(agent.search.probe(child))
+
+        agent.move(gs)
+        self.assertIsNotNone(agent.search.probe(child))
+
+        scoringAgent.training_calls += 1
+        agent.moveOrdering.history[0] = 100
+        agent.alphabeta(child, 0, -1, 1)
+        self.assertIsNone(agent.search.probe(child))
+        self.assertEqual(agent.moveOrdering.history, {})
+
+class CountingScoringAgent(TicTacToeManualScoringAgent):
+    def __init__(self):
+        self.calls = 0
+
+    def score_many(self, gameStates):
+        self.calls += 1
+        return super().score_many(gameStates)
+
+class MoveOrderingTestCase(unittest.TestCase):
+    def test_scoresOnlyAfterFirstMoves(self):
+        gs = TicTacToeGameState()
+        scoringAgent = CountingScoringAgent()
+        ordering = MoveOrdering()
+        order = ordering.orderedIndices(gs, scoringAgent, 3, firstIndex=4)
+        self.assertEqual(next(order), 4)
+        self.assertEqual(scoringAgent.calls, 0)
+        rest = list(order)
+        self.assertEqual(sorted(rest), [0, 1, 2, 3, 5, 6, 7, 8])
+        self.assertEqual(scoringAgent.calls, 1)
+        # Order is cached for the position
+        list(ordering.orderedIndices(gs, scoringAgent, 3))
+        self.assertEqual(scoringAgent.calls, 1)
+
+    def test_bestScoredMovesFirst(self):
+        scoringAgent = TicTacToeManualScoringAgent()
+        ordering = MoveOrdering()
+        for gs in [TicTacToeGameState(), TicTacToeGameState().place((0, 1))]:
+            order = list(ordering.orderedIndices(gs, scoringAgent, 1))
+            scores = scoringAgent.score_many([gs.next_moves[i] for i in order])
+            if gs.current_player == 1:
+                scores = [-score for score in scores]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_killerMovesTriedAfterFirstIndex(self):
+        scoringAgent = TicTacToeManualScoringAgent()
+        ordering = MoveOrdering()
+        sibling = TicTacToeGameState().place((0, 0)).place((0, 1))
+        # placing on (2, 1) is the move at index 5 of sibling
+        ordering.recordCutoff(sibling, 5, 2)
+        gs = TicTacToeGameState().place((0, 0)).place((0, 2))
+        killerIndex = [i for i, child in enumerate(gs.next_moves) if child.grid_0[2, 1]][0]
+        order = list(ordering.orderedIndices(gs, scoringAgent, 2, firstIndex=0))
+        self.assertEqual(order[:2], [0, killerIndex])
+        self.assertEqual(ordering.history, {ordering._nodeOrder(sibling).moveKeys[5]: 4})
+
+def referenceMinimax(gameState, depth, scoringAgent):
+    """Plain minimax score (positive favours player 0) without pruning"""
+    if gameState.isEnd or depth == 0:
+        return scoringAgent.score(gameState)
+    scores = [referenceMinimax(child, depth-1, scoringAgent) for child in gameState.next_moves]
+    return max(scores) if gameState.current_player == 0 else min(scores)
+
+class NegamaxSearchTestCase(unittest.TestCase):
+    def test_pentagoTurnStepsMatchReference(self):
+        # placement and rotation by the same player are consecutive plies
+        scoringAgent = PentagoNaiveScoringAgent()
+        for n in [3, 4]:
+            gs = PentagoGameState.init_with_n_random_moves(n)
+            search = NegamaxSearch(scoringAgent, moveOrdering=MoveOrdering())
+            sign = 1 if gs.current_player == 0 else -1
+            self.assertAlmostEqual(
+                sign * search.value(gs, 2), referenceMinimax(gs, 2, scoringAgent)
+            )
+
+    def test_minimaxAgentMatchesReference(self):
+        scoringAgent = TicTacToeManualScoringAgent()
+        gs = TicTacToeGameState().place((0, 0)).place((1, 1))
+        agent = MinimaxAgent(scoringAgent, 3)
+        # minimax scores from the perspective of the last player to move
+        self.assertAlmostEqual(agent.minimax(gs, 3), -referenceMinimax(gs, 3, scoringAgent))
+        # player 0 to move
+        scores = [referenceMinimax(child, 3, scoringAgent) for child in gs.next_moves]
+        self.assertIs(agent.move(gs), gs.next_moves[int(np.argmax(scores))])
+
+    def test_counters(self):
+        scoringAgent = TicTacToeManualScoringAgent()
+        gs = TicTacToeGameState().place((1, 1))
+        pruned = NegamaxSearch(scoringAgent, TranspositionTable(2**12), MoveOrdering())
+        plain = NegamaxSearch(scoringAgent)
+        self.assertEqual(pruned.value(gs, 7), plain.value(gs, 7))
+        self.assertLess(pruned.nodes, plain.nodes)
+        self.assertGreater(pruned.cutoffs, 0)
+        self.assertGreater(pruned.transpositionHits, 0)
+        self.assertEqual(plain.transpositionHits, 0)
+        pruned.resetCounters()
+        self.assertEqual((pruned.nodes, pruned.cutoffs, pruned.transpositionHits), (0, 0, 0))
+
+    def test_valuesArePythonFloats(self):
+        runner = NgoGameRunner(2, 4, True)
+        gs = NgoGameState.init_with_n_random_placements(3, runner)
+        search = NegamaxSearch(NgoNaiveScoringAgent(), batchHorizon=True)
+        self.assertIs(type(search.value(gs, 2)), float)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import numpy.testing as np_test
+
+from gridGamesAi.modelRegistry import ModelRegistry, flatWeightsPath
+from gridGamesAi.ngo.gameState import NgoGameRunner
+from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent
+from gridGamesAi.numpyInference import NumpyTDScoringAgent, exportTDAgent
+
+class ModelRegistryTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.paths = [Path(cls.directory.name) / str(i) for i in (1000, 2000)]
+        cls.agents = []
+        for path in cls.paths:
+            agent = Ngo_TD_Agent(None, NgoGameRunner(2, 4, True))
+            agent.save(path)
+            cls.agents.append(agent)
+        cls.states = np.random.default_rng(0).integers(0, 2, size=(6, 34))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_flatWeightsAreMemoryMapped(self):
+        path = Path(self.directory.name) / "flat.weights.npy"
+        exportTDAgent(self.agents[0], path)
+        agent = NumpyTDScoringAgent.loadFlat(path)
+        self.assertIsInstance(agent.network.kernels[0].base, np.memmap)
+        np_test.assert_allclose(
+            agent.model_score_arrays(self.states),
+            self.agents[0].model_score_arrays(self.states),
+            atol=1e-5
+        )
+
+    def test_agentsAreExportedOnceAndCached(self):
+        for path in self.paths:
+            flatWeightsPath(path).unlink(missing_ok=True)
+        registry = ModelRegistry(Ngo_TD_Agent, maxLoaded=1)
+        agent = registry.agent(self.paths[0])
+        self.assertTrue(flatWeightsPath(self.paths[0]).exists())
+        self.assertIs(registry.agent(self.paths[0]), agent)
+        np_test.assert_allclose(
+            agent.model_score_arrays(self.states),
+            self.agents[0].model_score_arrays(self.states),
+            atol=1e-5
+        )
+
+        registry.agent(self.paths[1])
+        self.assertEqual(len(registry), 1)
+        self.assertNotIn(self.paths[0], registry)
+        self.assertIsNot(registry.agent(self.paths[0]), agent)
+        self.assertEqual((registry.exports, registry.loads), (2, 3))
+
+        fresh = ModelRegistry(Ngo_TD_Agent)
+        fresh.agent(self.paths[0])
+        self.assertEqual((fresh.exports, fresh.loads), (0, 1))
+
+    def test_resavedCheckpointIsExportedAgain(self):
+        registry = ModelRegistry(Ngo_TD_Agent)
+        registry.agent(self.paths[1])
+        savedModel = self.paths[1] / "saved_model.pb"
+        modified = flatWeightsPath(self.paths[1]).stat().st_mtime + 10
+        os.utime(savedModel, (modified, modified))
+        exports = registry.exports
+        registry.agent(self.paths[1])
+        self.assertEqual(registry.exports, exports + 1)
+
+    def test_meanSquareErrorsMatchEachAgent(self):
+        registry = ModelRegistry(Ngo_TD_Agent)
+        expected = np.linspace(-1, 1, len(self.states))
+        errors = registry.meanSquareErrors(self.paths, self.states, expected)
+        self.assertEqual(list(errors), self.paths)
+        for path, agent in zip(self.paths, self.agents):
+            self.assertAlmostEqual(
+                errors[path],
+                float(np.mean((agent.model_score_arrays(self.states) - expected) ** 2)),
+                places=5,
+            )
+        self.assertEqual(registry.meanSquareErrors(self.paths, self.states, expected, n_workers=2), errors)
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import numpy.testing as np_test
+
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.runnerBackends import ROTATION_KEYS
+
+class NgoRunnerBackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.numpyRunner = NgoGameRunner(2, 4, True)
+        self.tensorflowRunner = NgoGameRunner(2, 4, True, backend="tensorflow")
+
+    def test_rotationAndWinTensorsMatch(self):
+        for key, rotation in self.tensorflowRunner.rotations.items():
+            np_test.assert_array_equal(self.numpyRunner.rotations[key], rotation.numpy())
+        np_test.assert_array_equal(self.numpyRunner.win, self.tensorflowRunner.win.numpy())
+
+    def test_gameRulesMatch(self):
+        rng = np.random.default_rng(0)
+        gs_np = NgoGameState(None, None, self.numpyRunner)
+        gs_tf = NgoGameState(None, None, self.tensorflowRunner)
+        while not gs_np.isEnd:
+            next_np, next_tf = gs_np.next_moves, gs_tf.next_moves
+            self.assertEqual(len(next_np), len(next_tf))
+            for a, b in zip(next_np, next_tf):
+                np_test.assert_array_equal(a.asNumpy(), b.asNumpy())
+                self.assertEqual(
+                    self.numpyRunner.naiveScore(a.grid), 
+                    self.tensorflowRunner.naiveScore(b.grid)
+                )
+            i = rng.integers(len(next_np))
+            gs_np, gs_tf = next_np[i], next_tf[i]
+            self.assertEqual(gs_np.isWin, gs_tf.isWin)
+            self.assertEqual(gs_np.winPlayer, gs_tf.winPlayer)
+            self.assertEqual(gs_np.isDraw, gs_tf.isDraw)
+
+    def test_invalidPlacementRaises(self):
+        gs = NgoGameState.fairVariant(self.numpyRunner)
+        self.assertRaises(Exception, gs.skipMove().skipMove().place, (0,0))
+
+    def test_batchedNextGridsMatchSingleMoves(self):
+        gs = NgoGameState.init_with_n_random_placements(3, self.numpyRunner)
+        placements = gs.next_grids
+        self.assertEqual(placements.shape, (len(gs.next_moves), 2, 4, 4))
+        for child, (i, j) in zip(gs.next_moves, np.argwhere(np.sum(gs.grid, axis=0) == 0)):
+            np_test.assert_array_equal(child.grid, gs.place((i, j)).grid)
+
+        gs = gs.place(tuple(np.argwhere(np.sum(gs.grid, axis=0) == 0)[0]))
+        rotations = gs.next_grids
+        self.assertEqual(rotations.shape, (8, 2, 4, 4))
+        for child, key in zip(gs.next_moves, ROTATION_KEYS):
+            np_test.assert_array_equal(child.grid, gs.rotate(key).grid)
+
+    def test_batchEvaluationMatchesSingleBoards(self):
+        gs = NgoGameState.init_with_n_random_placements(4, self.numpyRunner)
+        for runner in (self.numpyRunner, self.tensorflowRunner):
+            grids = np.stack([child.grid for child in gs.next_moves])
+            is_win, win_player, naive_score = runner.evaluateBatch(
+                runner.gridFromNumpy(grids), gs.current_player
+            )
+            for i, child in enumerate(gs.next_moves):
+                self.assertEqual(naive_score[i], self.numpyRunner.naiveScore(child.grid))
+                has_winning_line = self.numpyRunner.hasWinningLine(child.grid)
+                self.assertEqual(is_win[i], has_winning_line[0] or has_winning_line[1])
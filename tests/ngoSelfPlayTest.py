@@ -0,0 +1,41 @@
+import unittest
+
+import numpy.testing as np_test
+
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.selfPlayPool import SelfPlayJob, SelfPlayPool
+from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent, SelfPlayGame
+
+class NgoSelfPlayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.runner = NgoGameRunner(2, 4, True)
+        self.agent = Ngo_TD_Agent(None, self.runner)
+
+    def test_selfPlayGameScoresMatchGameStates(self):
+        gs = NgoGameState.fairVariant(self.runner)
+        movesSequence = [gs]
+        while not movesSequence[-1].isEnd:
+            movesSequence.append(movesSequence[-1].n_random_moves(1))
+        game = SelfPlayGame.fromMovesSequence(movesSequence)
+
+        self.assertEqual(game.states.shape, (len(movesSequence), 34))
+        self.assertEqual(game.end_score, self.agent.score(movesSequence[-1]))
+        np_test.assert_allclose(
+            self.agent.model_score_arrays(game.states[:-1]),
+            self.agent.score_many(movesSequence[:-1]),
+            rtol=1e-6
+        )
+
+    def test_poolPlaysSubmittedGames(self):
+        with SelfPlayPool(self.agent, self.runner, 1) as pool:
+            pool.submit(SelfPlayJob(0, 2))
+            pool.submit(SelfPlayJob(1, 0))
+            for _ in range(2):
+                game = pool.next_game()
+                self.agent.train_td_from_self_play_game(game)
+                pool.broadcast_weights()
+                self.assertIn(game.end_score, (-1.0, 0.0, 1.0))
+                self.assertEqual(game.states.shape[1], 34)
+            self.assertEqual(pool.pending, 0)
+        self.assertEqual(self.agent.training_calls, 2)
+        self.assertGreater(self.agent.trainingCall_totalMoves[-1][1], 0)
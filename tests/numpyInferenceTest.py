@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import numpy.testing as np_test
+import tensorflow as tf
+
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent
+from gridGamesAi.numpyInference import NumpyTDScoringAgent, exportTDAgent
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.pentago.temporal_difference_model import Pentago_TD_Agent
+
+def _randomGameStates(gameState, n_next_moves: int = 3):
+    """The first few next moves of each position of a random game, and its end"""
+    rng = np.random.default_rng(0)
+    gameStates = []
+    while not gameState.isEnd:
+        next_moves = gameState.next_moves
+        gameStates += next_moves[:n_next_moves]
+        gameState = next_moves[rng.integers(len(next_moves))]
+    return gameStates + [gameState]
+
+class NumpyInferenceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "model.npz"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ngoScoresMatchTDAgent(self):
+        runner = NgoGameRunner(2, 4, True)
+        agent = Ngo_TD_Agent(None, runner)
+        exportTDAgent(agent, self.path)
+        numpyAgent = NumpyTDScoringAgent.load(self.path)
+        gameStates = _randomGameStates(NgoGameState.fairVariant(runner))
+        np_test.assert_allclose(
+            numpyAgent.score_many(gameStates), agent.score_many(gameStates), atol=1e-5
+        )
+        self.assertAlmostEqual(numpyAgent.score(gameStates[0]), agent.score(gameStates[0]), 5)
+
+    def test_pentagoScoresMatchTDAgent(self):
+        # Same layers as Pentago_TD_Agent.create_td_model, without constructing a
+        # functional TD_model, which keras then can't construct without layers
+        inputs = tf.keras.Input(shape=(74,))
+        hidden = tf.keras.layers.Dense(100, activation="relu")(inputs)
+        hidden = tf.keras.layers.Dense(100, activation="relu")(hidden)
+        agent = Pentago_TD_Agent()
+        agent.td_model = tf.keras.Model(
+            inputs, tf.keras.layers.Dense(1, activation="sigmoid")(hidden)
+        )
+        agent.compile_td_model()
+        exportTDAgent(agent, self.path)
+        numpyAgent = NumpyTDScoringAgent.load(self.path)
+        self.assertEqual(numpyAgent.inputEncoding, "pentago")
+        gameStates = _randomGameStates(PentagoGameState())
+        np_test.assert_allclose(
+            numpyAgent.score_many(gameStates), agent.score_many(gameStates), atol=1e-5
+        )
+
+    def test_scoresWithoutTensorflow(self):
+        agent = Ngo_TD_Agent(None, NgoGameRunner(2, 4, True))
+        exportTDAgent(agent, self.path)
+        states = np.random.default_rng(0).integers(0, 2, size=(5, 34))
+        script = (
+            "import json, sys, numpy as np\n"
+            "from gridGamesAi.numpyInference import NumpyTDScoringAgent\n"
+            f"agent = NumpyTDScoringAgent.load({str(self.path)!r})\n"
+            f"print(json.dumps(agent.model_score_arrays(np.array({states.tolist()})).tolist()))\n"
+            "assert 'tensorflow' not in sys.modules\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True,
+            cwd=Path(__file__).parent.parent, env={**os.environ, "PYTHONPATH": "."}
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        np_test.assert_allclose(
+            json.loads(result.stdout), agent.model_score_arrays(states), atol=1e-5
+        )
@@ -6,7 +6,14 @@ from unittest.mock import patch
 import numpy as np
 import numpy.testing as np_test
 
-from gridGamesAi.pentago.gameState import _gridOccupancy, PentagoGameState
+from gridGamesAi.pentago.gameState import (
+    _gridOccupancy, _gridsOccupancy, _gridInWinState, _evaluateGrids, _evaluateArrays, 
+    PentagoGameState
+)
+from gridGamesAi.pentago.rotations import rotations, rotationsKeys
+from gridGamesAi.pentago import bitboard
+from gridGamesAi.turnTracker import TurnTracker
+from gridGamesAi.twoPlayerGridState import flipCenterOfMassToUpperLeftBelowDiagonalBatch
 from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
 from tests.patchInspector import PatchInspector
 
@@ -104,11 +111,59 @@ class pentagoGameStateTestCase(unittest.TestCase):
         gs.gridState.assert_unoccupied((1,2))
         self.assertRaises(ValueError, gs.gridState.assert_unoccupied, (2,2))
 
+class PentagoBitboardTestCase(unittest.TestCase):
+
+    def test_rotationMatchesIndexLists(self):
+        grid = np.random.default_rng(0).integers(0, 2, 36)
+        board = bitboard.gridToBoard(grid)
+        for key in rotationsKeys:
+            np_test.assert_allclose(
+                bitboard.boardToGrid(bitboard.rotateBoard(board, key)).flatten(),
+                grid[rotations[key]]
+            )
+
+    def test_winMasksMatchGridOccupancy(self):
+        rng = np.random.default_rng(1)
+        for _ in range(200):
+            grid = rng.integers(0, 2, (6,6))
+            self.assertEqual(
+                bitboard.boardIsWin(bitboard.gridToBoard(grid)),
+                _gridInWinState(grid)
+            )
+
+    def test_packedTurnMatchesTurnTracker(self):
+        tt = TurnTracker(2,2)
+        turn = bitboard.packTurn()
+        for _ in range(5):
+            tt = tt.getIncremented()
+            turn = bitboard.incrementTurn(turn)
+            self.assertEqual(bitboard.turnCurrentPlayer(turn), tt.current_player)
+            self.assertEqual(bitboard.turnStep(turn), tt.current_turn_step)
+            self.assertEqual(bitboard.turnTotalMoves(turn), tt.total_moves)
+            self.assertEqual(bitboard.turnLastPlayer(turn), tt.last_player_to_move)
+
+    def test_batchEvaluationMatchesGameStates(self):
+        # Rotating the top right quadrant anti-clockwise gives both players 5 in a row
+        gs = prep_game([
+            (0,0), (1,0), (0,1), (1,1), (0,2), (1,2), (0,5), (0,4), (1,5), (1,4)
+        ], False)
+        self.assertEqual(gs.rotate('tr_ac').winPlayer, 0)
+        is_win, win_player, _ = _evaluateGrids(
+            np.stack([child.grids for child in gs.next_moves]), gs.current_player
+        )
+        for i, child in enumerate(gs.next_moves):
+            self.assertEqual(is_win[i], child.isWin)
+            self.assertEqual(win_player[i] if is_win[i] else None, child.winPlayer)
+
+    def test_placeOnOccupiedRaises(self):
+        gs = prep_game([(2,2)])
+        self.assertRaises(ValueError, gs.place, (2,2))
+
 class PentagoNaiveScoreTestCase(unittest.TestCase):
     def patchInspector_gridOccupancy(self):
         return PatchInspector(
-                patch('gridGamesAi.pentago.scoringAgent._gridOccupancy'),
-                _gridOccupancy
+                patch('gridGamesAi.pentago.scoringAgent._gridsOccupancy'),
+                _gridsOccupancy
         )
 
     def test_returnsCorrectScore(self):
@@ -133,9 +188,9 @@ class PentagoNaiveScoreTestCase(unittest.TestCase):
             score = agent.unsquished_score(prep_game([(2,2), (0,0)], False))
             score = agent.unsquished_score(prep_game([(2,2), (0,0)], False))
 
-            # _gridOccupancy is called twice by unsquished_score.
-            # If 6 calls are made, then caching is not functioning.
-            mock_gridOccupancy.assertCalledTimes(4)
+            # _gridsOccupancy is called once by unsquished_score.
+            # If 3 calls are made, then caching is not functioning.
+            mock_gridOccupancy.assertCalledTimes(2)
 
     def test_cacheCanBeReset(self):
         agent = PentagoNaiveScoringAgent()
@@ -148,4 +203,57 @@ class PentagoNaiveScoreTestCase(unittest.TestCase):
             agent.resetCache()
             score = agent.unsquished_score(prep_game([(2,2)]))
 
-            mock_gridOccupancy.assertCalledTimes(4)
+            mock_gridOccupancy.assertCalledTimes(2)
+
+    def test_batchScoresMatchSingleScores(self):
+        agent = PentagoNaiveScoringAgent()
+        gameStates = prep_game([(2,2), (0,0), (3,4)], False).next_moves
+        np_test.assert_allclose(
+            agent.unsquished_scores(gameStates),
+            [agent.unsquished_score(gs) for gs in gameStates]
+        )
+
+def _randomPositions(n_games: int) -> List[PentagoGameState]:
+    """Positions and some of their next moves along random games, up to the end"""
+    rng = np.random.default_rng(0)
+    gameStates = []
+    for _ in range(n_games):
+        gs = PentagoGameState()
+        while not gs.isEnd:
+            gameStates += [gs] + gs.next_moves[:2]
+            gs = gs.next_moves[rng.integers(len(gs.next_moves))]
+        gameStates.append(gs)
+    return gameStates
+
+class PentagoArrayScoringTestCase(unittest.TestCase):
+    """Scoring of positions in the asNumpy layout, used by the batched go callback"""
+
+    def setUp(self):
+        self.gameStates = _randomPositions(5)
+        self.arrays = np.stack([gs.asNumpy() for gs in self.gameStates]).astype(np.int32)
+
+    def test_endEvaluationMatchesGameStates(self):
+        is_end, end_score = _evaluateArrays(self.arrays)
+        for gs, end, score in zip(self.gameStates, is_end, end_score):
+            self.assertEqual(end, gs.isEnd)
+            if gs.isEnd:
+                self.assertEqual(score, {0: 1.0, 1: -1.0, None: 0.0}[gs.winPlayer])
+
+    def test_naiveScoresMatchGameStates(self):
+        agent = PentagoNaiveScoringAgent()
+        np_test.assert_allclose(
+            agent.score_arrays(self.arrays), agent.score_many(self.gameStates)
+        )
+
+    def test_canonicalTransformsMatchBitboards(self):
+        transforms = bitboard.canonicalTransformsOfGrids(self.arrays[:, 2:])
+        for gs, transform in zip(self.gameStates, transforms):
+            self.assertEqual(transform, gs.canonicalKey[1])
+
+    def test_batchCenterMassFlipMatchesGridState(self):
+        grids = np.stack([gs.grids for gs in self.gameStates])
+        flipped = flipCenterOfMassToUpperLeftBelowDiagonalBatch(grids)
+        for gs, flippedGrids in zip(self.gameStates, flipped):
+            gridState = gs.gridState.flipCenterOfMassToUpperLeftBelowDiagonal()
+            np_test.assert_array_equal(flippedGrids[0], gridState.grid_0)
+            np_test.assert_array_equal(flippedGrids[1], gridState.grid_1)
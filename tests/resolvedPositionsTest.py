@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.resolvedPositions import ResolvedPositions, winning_grids
+
+class ResolvedPositionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.runner = NgoGameRunner(2, 4, True)
+
+    def test_winningGridsAreWonByPlayer(self):
+        for player in (0, 1):
+            grids = winning_grids(self.runner, 500, player, 2, np.random.default_rng(player))
+            self.assertEqual(grids.shape, (500, 2, 4, 4))
+            self.assertTrue(np.all(grids[:, 0] + grids[:, 1] <= 1))
+            hasWinningLine = self.runner.hasWinningLineBatch(grids)
+            self.assertTrue(np.all(hasWinningLine[:, player]))
+            self.assertFalse(np.any(hasWinningLine[:, 1 - player]))
+            # The other player gets win_line_length more pieces than the extra moves
+            counts = np.sum(grids, axis=(2, 3))
+            self.assertTrue(np.all(counts[:, 0] == counts[:, 1]))
+            self.assertTrue(set(counts[:, player].tolist()) <= {6, 7})
+
+    def test_positionsMatchSingleGeneration(self):
+        for player in (0, 1):
+            gs = NgoGameState.init_as_winning_position(self.runner, player, 2)
+            positions = ResolvedPositions(self.runner)
+            positions.add_winning_positions(10, player, 2, seed=0)
+            self.assertEqual(len(positions.positions), 10)
+            for position, value in positions.positions:
+                self.assertEqual(value, 1.0 if player == 0 else -1.0)
+                self.assertEqual(position.current_player, gs.current_player)
+                self.assertEqual(position.turn_step, gs.turn_step)
+                self.assertTrue(position.isWin)
+                self.assertEqual(position.winPlayer, player)
+
+    def test_tooManyExtraMovesRaise(self):
+        with self.assertRaises(ValueError):
+            winning_grids(self.runner, 1, 0, 5, np.random.default_rng(0))
+
+    def test_cachedPositionsAreReloaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = ResolvedPositions(self.runner)
+            first.add_winning_positions(50, 0, 3, seed=4, cache_dir=directory)
+            paths = list(Path(directory).glob("*.npz"))
+            self.assertEqual(len(paths), 1)
+
+            # The cache is read rather than regenerated
+            with np.load(paths[0]) as data:
+                grids = data["grids"].copy()
+            grids[:, :, 0, 0] = 0
+            np.savez(paths[0], grids=grids, version=1)
+            second = ResolvedPositions(self.runner)
+            second.add_winning_positions(50, 0, 3, seed=4, cache_dir=directory)
+            self.assertTrue(np.array_equal(
+                np.stack([position.grid for position, _ in second.positions]), grids
+            ))
+
+            # Unless it is from another version
+            np.savez(paths[0], grids=grids, version=0)
+            third = ResolvedPositions(self.runner)
+            third.add_winning_positions(50, 0, 3, seed=4, cache_dir=directory)
+            self.assertTrue(np.array_equal(
+                np.stack([position.grid for position, _ in third.positions]),
+                np.stack([position.grid for position, _ in first.positions]),
+            ))
+
+    def test_encodingIsReusedUntilPositionsAreAdded(self):
+        positions = ResolvedPositions(self.runner)
+        positions.add_winning_positions(20, 0, 1, seed=0)
+        arrays, expected = positions.encoded()
+        self.assertEqual(arrays.shape, (20, 34))
+        self.assertIs(positions.encoded()[0], arrays)
+        positions.add_winning_positions(5, 1, 1, seed=0)
+        arrays, expected = positions.encoded()
+        self.assertEqual(arrays.shape, (25, 34))
+        self.assertEqual(expected.tolist(), [1.0] * 20 + [-1.0] * 5)
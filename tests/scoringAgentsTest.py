@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from gridGamesAi.minimax import MinimaxAgent
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.scoringAgent import NgoNaiveScoringAgent
+from gridGamesAi.ngo.temporalDifferenceModel import Ngo_TD_Agent
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.pentago.scoringAgent import PentagoNaiveScoringAgent
+
+class ScoreManyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.runner = NgoGameRunner(2, 4, True)
+
+    def test_ngoNaiveScoreManyMatchesScore(self):
+        gs = NgoGameState.init_with_n_random_placements(3, self.runner)
+        batchAgent, singleAgent = NgoNaiveScoringAgent(), NgoNaiveScoringAgent()
+        np.testing.assert_allclose(
+            batchAgent.score_many(gs.next_moves),
+            [singleAgent.score(child) for child in gs.next_moves]
+        )
+
+    def test_pentagoNaiveScoreManyMatchesScore(self):
+        gs = PentagoGameState.init_with_n_random_moves(4)
+        agent = PentagoNaiveScoringAgent()
+        np.testing.assert_allclose(
+            agent.score_many(gs.next_moves),
+            [agent.score(child) for child in gs.next_moves]
+        )
+
+    def test_pentagoNaiveScoreManyUsesCache(self):
+        gs = PentagoGameState.init_with_n_random_moves(4)
+        agent = PentagoNaiveScoringAgent()
+        agent.score(gs.next_moves[0])
+        batches = []
+        unsquished_scores = agent.unsquished_scores
+        def recording_unsquished_scores(gameStates):
+            batches.append(gameStates)
+            return unsquished_scores(gameStates)
+        agent.unsquished_scores = recording_unsquished_scores
+
+        scores = agent.score_many(gs.next_moves)
+        self.assertEqual(scores, agent.score_many(gs.next_moves))
+        self.assertEqual(len(batches), 1)
+        self.assertNotIn(gs.next_moves[0], batches[0])
+
+    def test_tdScoreManyMatchesModelScore(self):
+        agent = Ngo_TD_Agent(None, self.runner)
+        gs = NgoGameState.init_with_n_random_placements(3, self.runner)
+        scores = agent.score_many(gs.next_moves)
+        for child, score in zip(gs.next_moves, scores):
+            self.assertAlmostEqual(score, agent.model_score(child), places=5)
+            self.assertEqual(child.savedScores[agent.serialNumber], score)
+
+    def test_minimaxScoresLeavesInOneBatch(self):
+        agent = NgoNaiveScoringAgent()
+        batch_sizes = []
+        score_many = agent.score_many
+        def recording_score_many(gameStates):
+            batch_sizes.append(len(gameStates))
+            return score_many(gameStates)
+        agent.score_many = recording_score_many
+
+        gs = NgoGameState.init_with_n_random_placements(3, self.runner)
+        MinimaxAgent(agent, 0).move(gs)
+        self.assertEqual(batch_sizes, [len(gs.next_moves)])
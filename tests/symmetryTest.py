@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+import numpy.testing as np_test
+
+from gridGamesAi import symmetry
+from gridGamesAi.minimax import PruningAgent
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.pentago import bitboard
+from gridGamesAi.pentago.gameState import PentagoGameState
+from gridGamesAi.tictactoe.gameState import TicTacToeGameState
+from gridGamesAi.tictactoe.scoringAgent import TicTacToeManualScoringAgent
+from gridGamesAi.twoPlayerGridState import TwoPlayerGridState
+
+class SymmetryTestCase(unittest.TestCase):
+    def test_inverseTransforms(self):
+        grid = np.arange(36).reshape((6, 6))
+        for t in range(symmetry.N_TRANSFORMS):
+            transformed = symmetry.transformGrid(grid, t)
+            np_test.assert_array_equal(
+                symmetry.transformGrid(transformed, symmetry.INVERSE_TRANSFORMS[t]), grid
+            )
+            np_test.assert_array_equal(
+                transformed.flatten(), grid.flatten()[symmetry.dihedralPermutations(6)[t]]
+            )
+
+    def test_bitboardTransformMatchesGridTransform(self):
+        gs = PentagoGameState.init_with_n_random_moves(10)
+        for t in range(symmetry.N_TRANSFORMS):
+            np_test.assert_array_equal(
+                bitboard.boardToGrid(bitboard.transformBoard(gs.board_0, t)),
+                symmetry.transformGrid(gs.grid_0, t)
+            )
+
+    def test_pentagoSymmetricPositionsShareKey(self):
+        gs = PentagoGameState.init_with_n_random_moves(8)
+        canonical = gs.canonical()
+        for t in range(symmetry.N_TRANSFORMS):
+            transformed = PentagoGameState(
+                bitboard.transformBoard(gs.board_0, t),
+                bitboard.transformBoard(gs.board_1, t),
+                gs.turn
+            )
+            self.assertEqual(transformed.canonicalKey[0], gs.canonicalKey[0])
+            self.assertEqual(transformed.canonicalZobristHash, gs.canonicalZobristHash)
+            self.assertEqual(transformed.canonical(), canonical)
+        self.assertNotEqual(gs.canonicalKey[0], gs.skipMove().canonicalKey[0])
+
+    def test_ngoSymmetricPositionsShareKey(self):
+        runner = NgoGameRunner(2, 4, True)
+        gs = NgoGameState.init_with_n_random_placements(5, runner)
+        for t in range(symmetry.N_TRANSFORMS):
+            transformed = NgoGameState(
+                gs.turnTracker, symmetry.transformGrid(gs.grid, t).copy(), runner
+            )
+            self.assertEqual(transformed.canonicalKey[0], gs.canonicalKey[0])
+            self.assertEqual(transformed.canonicalZobristHash, gs.canonicalZobristHash)
+
+    def test_canonicalKeyDistinguishesAsymmetricPositions(self):
+        a = TicTacToeGameState().place((0, 0)).place((0, 1))
+        b = TicTacToeGameState().place((0, 0)).place((1, 1))
+        self.assertNotEqual(a.canonicalKey[0], b.canonicalKey[0])
+
+    def test_canonicalResolvesCentreOfMassTies(self):
+        # Centre of mass is at the centre, so flipping leaves the grids unchanged
+        grid_0, grid_1 = np.zeros((6, 6)), np.zeros((6, 6))
+        grid_0[0, 1] = grid_0[5, 4] = 1
+        gs = PentagoGameState.fromGridState(TwoPlayerGridState(grid_0, grid_1), bitboard.packTurn())
+        rotated = PentagoGameState(bitboard.transformBoard(gs.board_0, 1), 0, gs.turn)
+        self.assertNotEqual(
+            gs.flipCenterOfMassToUpperLeftBelowDiagonal(),
+            rotated.flipCenterOfMassToUpperLeftBelowDiagonal()
+        )
+        self.assertEqual(gs.canonical(), rotated.canonical())
+
+    def test_pruningValueMatchesWithSymmetry(self):
+        gs = TicTacToeGameState().place((0, 0))
+        scoringAgent = TicTacToeManualScoringAgent()
+        symmetric = PruningAgent(scoringAgent, 7, useSymmetry=True)
+        plain = PruningAgent(scoringAgent, 7)
+        self.assertEqual(
+            symmetric.alphabeta(gs, 7, -1, 1), plain.alphabeta(gs, 7, -1, 1)
+        )
+        # the empty board has 3 distinct first moves up to symmetry
+        self.assertEqual(len(symmetric.search.rootIndices(TicTacToeGameState())), 3)
@@ -0,0 +1,113 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gridGamesAi.agents import RandomAgent
+from gridGamesAi.game import Game
+from gridGamesAi.minimax import MinimaxAgent
+from gridGamesAi.ngo.gameState import NgoGameRunner, NgoGameState
+from gridGamesAi.ngo.resolvedPositions import ResolvedPositions
+from gridGamesAi.tablebase import GridRules, Tablebase, TablebaseScoringAgent
+from gridGamesAi.tictactoe.gameState import TicTacToeGameState
+from gridGamesAi.turnTracker import TurnTracker
+from gridGamesAi.twoPlayerGridState import TwoPlayerGridState
+
+def solveByRecursion(gameState, results):
+    """(outcome, moves to the end) for the player to move, by exhaustive search"""
+    key = (
+        np.asarray(gameState.grid_0).tobytes(), np.asarray(gameState.grid_1).tobytes(),
+        gameState.turn_step, gameState.current_player,
+    )
+    if key in results:
+        return results[key][1]
+    if gameState.isWin:
+        result = (1 if gameState.winPlayer == gameState.current_player else -1, 0)
+    elif gameState.isEnd:
+        result = (0, 0)
+    else:
+        best = None
+        for nextState in gameState.next_moves:
+            outcome, moves = solveByRecursion(nextState, results)
+            if nextState.current_player != gameState.current_player:
+                outcome = -outcome
+            # Fastest wins and slowest losses
+            preference = (outcome, -outcome * (moves + 1))
+            if best is None or preference > best[0]:
+                best = (preference, (outcome, moves + 1))
+        result = best[1]
+    results[key] = (gameState, result)
+    return result
+
+class TablebaseTestCase(unittest.TestCase):
+    def assertMatchesRecursion(self, tablebase, start):
+        results = {}
+        solveByRecursion(start, results)
+        for gameState, (outcome, moves) in results.values():
+            self.assertEqual(tablebase.result(gameState), (outcome, moves))
+
+    def test_ticTacToeMatchesExhaustiveSearch(self):
+        tablebase = Tablebase.solve(GridRules.ticTacToe())
+        self.assertEqual(tablebase.result(TicTacToeGameState()), (0, 9))
+        self.assertMatchesRecursion(tablebase, TicTacToeGameState())
+
+    def test_ngoMatchesExhaustiveSearch(self):
+        for rotation_enabled in (True, False):
+            runner = NgoGameRunner(1, 2, rotation_enabled)
+            tablebase = Tablebase.solve(GridRules.fromNgoRunner(runner))
+            self.assertMatchesRecursion(tablebase, NgoGameState(None, None, runner))
+
+    def test_perfectHashIsABijection(self):
+        tablebase = Tablebase(GridRules.ticTacToe(), np.zeros(0))
+        for (step, k), (offset, size) in tablebase.layers.items():
+            ranks = np.concatenate([tablebase._ranks(grids, k) for grids in tablebase._layerGrids(k)])
+            self.assertEqual(sorted(ranks.tolist()), list(range(size)))
+
+    def test_savedTablebaseIsMemoryMapped(self):
+        rules = GridRules.ticTacToe()
+        tablebase = Tablebase.solve(rules)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "tictactoe.tablebase.npy"
+            loaded = Tablebase.loadOrSolve(rules, path)
+            self.assertIsInstance(loaded.values, np.memmap)
+            self.assertTrue(np.array_equal(loaded.values, tablebase.values))
+            self.assertEqual(loaded.rules, rules)
+            del loaded
+
+    def test_rejectsPositionsOfOtherGames(self):
+        tablebase = Tablebase.solve(GridRules.ticTacToe())
+        # Player 1 has more pieces than player 0
+        grid_1 = np.zeros((3,3))
+        grid_1[2,1:] = 1
+        gs = TicTacToeGameState(TurnTracker(2,1), TwoPlayerGridState(np.zeros((3,3)), grid_1))
+        with self.assertRaises(ValueError):
+            tablebase.result(gs)
+
+    def test_minimaxWithTablebaseNeverLoses(self):
+        tablebase = Tablebase.solve(GridRules.ticTacToe())
+        perfect = MinimaxAgent(TablebaseScoringAgent(tablebase), 0)
+        rng = np.random.default_rng(0)
+        for game in range(10):
+            start = TicTacToeGameState()
+            expected = tablebase.scores([start])[0]
+            players = [perfect, RandomAgent(rng)] if game % 2 == 0 else [RandomAgent(rng), perfect]
+            g = Game(players, start)
+            while not g.current_game_state.isEnd:
+                g.moveWithCurrentPlayer()
+            final = g.current_game_state
+            score = 0 if not final.isWin else (1 if final.winPlayer == 0 else -1)
+            perfectSign = 1 if game % 2 == 0 else -1
+            self.assertGreaterEqual(perfectSign * score, perfectSign * expected)
+
+    def test_resolvedPositionsAreLabelledExactly(self):
+        runner = NgoGameRunner(1, 2, True)
+        tablebase = Tablebase.solve(GridRules.fromNgoRunner(runner))
+        positions = ResolvedPositions(runner)
+        positions.add_tablebase_positions(tablebase, 20, np.random.default_rng(0))
+        self.assertEqual(len(positions.positions), 20)
+        results = {}
+        for gameState, expected in positions.positions:
+            self.assertFalse(gameState.isEnd)
+            outcome, _ = solveByRecursion(gameState, results)
+            self.assertEqual(expected, outcome if gameState.current_player == 0 else -outcome)
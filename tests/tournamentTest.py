@@ -0,0 +1,134 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gridGamesAi.agents import RandomAgent
+from gridGamesAi.minimax import MinimaxAgent
+from gridGamesAi.ngo.scoringAgent import NgoNaiveScoringAgent
+from gridGamesAi.tournament import (
+    Entrant, GameResult, NgoOpenings, Tournament, bradleyTerry, ratings
+)
+
+def randomAgent():
+    return RandomAgent()
+
+def greedyNaiveAgent():
+    return MinimaxAgent(NgoNaiveScoringAgent(), 0)
+
+def naiveMinimaxAgent():
+    return MinimaxAgent(NgoNaiveScoringAgent(), 1)
+
+class TournamentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.openings = NgoOpenings(2, 4, True, 2, seed=1)
+        self.entrants = [
+            Entrant("random", randomAgent),
+            Entrant("naive", naiveMinimaxAgent),
+            Entrant("random2", randomAgent),
+        ]
+        self.directory = tempfile.TemporaryDirectory()
+        self.resultsPath = Path(self.directory.name) / "results.jsonl"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_openingsAreSeeded(self):
+        self.assertTrue(self.openings(3) == NgoOpenings(2, 4, True, 2, seed=1)(3))
+        self.assertFalse(self.openings(3) == self.openings(4))
+
+    def test_bradleyTerryRanksStrongerPlayers(self):
+        results = []
+        for opening in range(20):
+            results.append(GameResult("a", "b", opening, 1.0 if opening < 15 else 0.0, 10))
+            results.append(GameResult("b", "c", opening, 1.0 if opening < 15 else 0.5, 10))
+        theta, stderr = bradleyTerry(results, ["a", "b", "c"])
+        self.assertGreater(theta[0], theta[1])
+        self.assertGreater(theta[1], theta[2])
+        self.assertTrue(all(stderr > 0))
+
+        table = ratings(results, ["c", "b", "a"])
+        self.assertEqual([rating.name for rating in table], ["a", "b", "c"])
+        self.assertEqual(table[1].games, 40)
+        for rating in table:
+            self.assertLess(rating.lower, rating.elo)
+            self.assertLess(rating.elo, rating.upper)
+
+    def test_undefeatedPlayerHasFiniteRating(self):
+        results = [GameResult("a", "b", opening, 1.0, 10) for opening in range(10)]
+        table = ratings(results, ["a", "b"])
+        self.assertTrue(all(abs(rating.elo) < 2000 for rating in table))
+
+    def test_roundRobinResumes(self):
+        tournament = Tournament(self.entrants, self.openings, 2, self.resultsPath, n_workers=0)
+        tournament.play(tournament.pairingGames("random", "naive"))
+        with open(self.resultsPath) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+        # An interrupted write leaves a partial line, which is ignored
+        with open(self.resultsPath, "a") as f:
+            f.write('{"first":"random2","sec')
+
+        resumed = Tournament(self.entrants, self.openings, 2, self.resultsPath, n_workers=0)
+        played = []
+        resumed.onResult = played.append
+        table = resumed.roundRobin()
+        self.assertEqual(len(played), 8)
+        self.assertEqual(len(resumed.results), 12)
+        self.assertTrue(all(rating.games == 8 for rating in table))
+        for result in played:
+            self.assertNotEqual({result.first, result.second}, {"random", "naive"})
+
+    def test_swissAvoidsRematches(self):
+        entrants = self.entrants + [Entrant("naive2", naiveMinimaxAgent)]
+        tournament = Tournament(entrants, self.openings, 1, self.resultsPath, n_workers=0)
+        tournament.swiss(3)
+        pairs = [
+            frozenset((result.first, result.second))
+            for result in tournament.results.values() if result.first < result.second
+        ]
+        self.assertEqual(len(pairs), 6)
+        self.assertEqual(len(set(pairs)), 6)
+
+        resumed = Tournament(entrants, self.openings, 1, self.resultsPath, n_workers=0)
+        played = []
+        resumed.onResult = played.append
+        resumed.swiss(3)
+        self.assertEqual(played, [])
+
+    def test_swissResumesInterruptedRound(self):
+        entrants = self.entrants + [Entrant("naive2", naiveMinimaxAgent)]
+        tournament = Tournament(entrants, self.openings, 1, self.resultsPath, n_workers=0)
+
+        def stopAfterFifthResult(result):
+            if len(tournament.results) == 5:
+                raise KeyboardInterrupt
+        tournament.onResult = stopAfterFifthResult
+        with self.assertRaises(KeyboardInterrupt):
+            tournament.swiss(2)
+
+        resumed = Tournament(entrants, self.openings, 1, self.resultsPath, n_workers=0)
+        played = []
+        resumed.onResult = played.append
+        resumed.swiss(2)
+        self.assertEqual(len(played), 3)
+        secondRound = [result for result in resumed.results.values() if result.round == 2]
+        self.assertEqual(len(secondRound), 4)
+        self.assertEqual(
+            {name for result in secondRound for name in (result.first, result.second)},
+            {entrant.name for entrant in entrants},
+        )
+
+    def test_poolPlaysGames(self):
+        tournament = Tournament(self.entrants[:2], self.openings, 2, n_workers=1)
+        table = tournament.roundRobin()
+        self.assertEqual(len(tournament.results), 4)
+        self.assertEqual(sum(rating.score for rating in table), 4)
+        self.assertTrue(all(result.moves > 0 for result in tournament.results.values()))
+
+    def test_lockstepTasksMatchSingleGames(self):
+        entrants = [Entrant("naive", greedyNaiveAgent), Entrant("naive2", greedyNaiveAgent)]
+        single = Tournament(entrants, self.openings, 4, n_workers=0, gamesPerTask=1)
+        single.roundRobin()
+        lockstep = Tournament(entrants, self.openings, 4, n_workers=0)
+        lockstep.roundRobin()
+        self.assertEqual(single.results, lockstep.results)